@@ -1,22 +1,51 @@
 from tkinter import *
-from tkinter import ttk, filedialog, messagebox, colorchooser
+from tkinter import ttk, filedialog, messagebox, colorchooser, simpledialog
 from pathlib import Path
 import webbrowser
 import configparser
 import sys
-from typing import Optional, Tuple
+from typing import Optional, Tuple, NamedTuple, Iterator
+from collections import OrderedDict
+from html import escape as html_escape
 import base64, mimetypes  # NEW
+import hashlib, json, time, re, shutil, linecache, dis
+import urllib.request
+import urllib.parse
+import http.server
+import threading, heapq, os, queue
+from contextlib import contextmanager
+import csv, argparse, tempfile, tracemalloc, statistics, platform, random, math, zipfile
+from concurrent.futures import ThreadPoolExecutor
+import select, struct, ctypes, ctypes.util, ipaddress
+import sqlite3
+from datetime import datetime
+
+try:  # optional: real font metadata + WOFF2 conversion
+    from fontTools.ttLib import TTFont
+except ImportError:
+    TTFont = None
+try:  # optional: per-name glyph subsetting
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+try:  # optional: WOFF2 needs brotli, WOFF (zlib) is used otherwise
+    import brotli  # noqa: F401
+    SUBSET_FLAVOR = "woff2"
+except ImportError:
+    SUBSET_FLAVOR = "woff"
+
+from partyroom.util import (FONT_STORE_DIRNAME, VIDEO_OPTIONS, PageBudgetError, existing_or_url, looks_like_url,
+                            page_text, replace_text, size_text, state_bool, state_int)
+from partyroom.caches import (MediaCache, configure_media_cache, local_asset, local_media, media_publish_name,
+                              media_source, pin_party_media, prefetch_room_assets, room_asset_urls, room_videos)
+from partyroom.store import STORE_FILENAME, PartyStore
+from partyroom.daemon import DAEMON_ADDRESS, BuildDaemon, daemon_address, daemon_build, daemon_fallbacks, daemon_roots
+from partyroom.sync import (EXPORT_VIDEO_EXTS, export_bundle_files, export_line, sync_line, sync_output, sync_targets,
+                            zip_stream)
 
 # -----------------------------
 # Utility logic (CSS/video/color)
 # -----------------------------
-VIDEO_OPTIONS = {
-    1: ("movie.mp4",   "Fireworks"),
-    2: ("fortnite.mp4","Fortnite"),
-    3: ("harry.mp4",   "Harry Potter"),
-    4: ("pokemon.mp4", "Pokemon"),
-    5: ("minecraft.mp4","Minecraft"),
-}
 COLORS = ["Blue", "Red", "Yellow", "Orange"]
 
 # Responsive font size presets -> (min_px, vw, max_px)
@@ -40,6 +69,43 @@ FANCY_FONTS = {
     "Brush Script (local only)": ("'Brush Script MT', 'Brush Script Std', cursive", None),
 }
 
+# Local font store (offline mirror of the FANCY_FONTS Google families), kept in the output folder
+FONT_FILE_EXTS = ("ttf", "otf", "woff", "woff2")
+FONT_WEIGHT_NAMES = {
+    "thin": 100, "extralight": 200, "ultralight": 200, "light": 300, "regular": 400, "book": 400,
+    "normal": 400, "medium": 500, "semibold": 600, "demibold": 600, "bold": 700,
+    "extrabold": 800, "ultrabold": 800, "black": 900, "heavy": 900,
+}
+FONT_SUBSET_DIRNAME = "subsets"          # <output>/fonts/subsets/<font hash>-<glyph hash>.woff2
+FONT_INLINE_MAX_BYTES = 48 * 1024          # subsets up to this size are inlined as data: URIs
+FONT_MIME = {"woff2": "font/woff2", "woff": "font/woff", "ttf": "font/ttf", "otf": "font/otf"}
+# Metric-matched fallbacks: system font used while the guest font loads, sized to the same box.
+# (unitsPerEm, ascent, descent, lineGap, xWidthAvg) as published by capsize, used when the
+# system font file itself can't be found on this machine.
+FALLBACK_FONT_METRICS = {
+    "Arial": (2048, 1854, -434, 67, 904),
+    "Times New Roman": (2048, 1825, -443, 87, 819),
+}
+SYSTEM_FONT_FILES = {
+    "Arial": ("arial.ttf", "Arial.ttf"),
+    "Times New Roman": ("times.ttf", "Times New Roman.ttf"),
+}
+SYSTEM_FONT_DIRS = ("C:/Windows/Fonts", "/Library/Fonts", "/System/Library/Fonts/Supplemental")
+# Build-time text fitting: the guest name may use this fraction of the space around its anchor
+FIT_WIDTH_FRACTION = 0.92
+FIT_FALLBACK_EM_PER_CHAR = 0.68   # conservative caps width when the font file isn't available
+
+# URL-parameterized pages: guest text is unknown at build time, so subset/measure this set
+PARAM_PAGE_GLYPHS = "".join(chr(c) for c in range(0x20, 0x7F)) + "".join(chr(c) for c in range(0xC0, 0x100))
+
+# English letter frequencies (per 100 chars, space included) for the average glyph width
+LETTER_FREQ = {
+    " ": 18.0, "e": 10.4, "t": 7.5, "a": 6.7, "o": 6.2, "i": 5.7, "n": 5.5, "s": 5.2, "h": 5.0,
+    "r": 4.9, "d": 3.5, "l": 3.3, "c": 2.3, "u": 2.3, "m": 2.0, "w": 2.0, "f": 1.8, "g": 1.6,
+    "y": 1.6, "p": 1.5, "b": 1.2, "v": 0.8, "k": 0.6, "j": 0.1, "x": 0.1, "q": 0.1, "z": 0.1,
+}
+GOOGLE_FONTS_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
 # 9-point position presets for inner text
 INNER_POS_PRESETS = [
     "Top Left","Top Center","Top Right",
@@ -52,6 +118,29 @@ POS_TO_PCT = {
     "Bottom Left": (10, 88), "Bottom Center": (50, 88), "Bottom Right": (90, 88),
 }
 
+# Encoded data: URIs kept in memory between builds (characters, ~bytes)
+DATA_URI_CACHE_CHARS = 64 * 1024 * 1024
+
+# Page size budgets (per room, KB; 0 = off): warn in the build report / refuse to write the page.
+# Refusing is opt-in ([roomN] budget_block_kb or Advanced), so pages that built before keep building.
+PAGE_BUDGET_WARN_KB = 2048
+PAGE_BUDGET_BLOCK_KB = 0
+PAGE_COMPONENTS = ("logo", "background", "other_images", "inline_css", "font_css", "js", "markup")
+INLINE_BG_SUGGEST_KB = 256      # inline background above this: suggest a file reference / smaller image
+INLINE_LOGO_SUGGEST_KB = 48     # per copy; the logo is inlined once per <img>
+FONT_CSS_SUGGEST_KB = 256
+
+# Optional in-page playback telemetry, batch-posted by the room PCs to `App3.py collect`
+TELEMETRY_ADDRESS = "127.0.0.1:47616"   # [general] telemetry or PARTYROOM_TELEMETRY = host:port override it
+TELEMETRY_SAMPLE_MS = 10000             # getVideoPlaybackQuality sampling interval
+TELEMETRY_FLUSH_MS = 15000              # batch window before posting
+
+# Next-party preload: start warming the next party's assets this long before auto-stop
+PRELOAD_LEAD_MINUTES = 5
+
+# Kiosk shell: one long-lived page per room that swaps party pages into itself
+SHELL_POLL_MS = 2000
+
 def get_css(color: str, video_filename: str) -> str:
     if color == "Blue" and video_filename != "movie.mp4":
         return "Stylea.css"
@@ -70,10 +159,6 @@ def get_css(color: str, video_filename: str) -> str:
     else:
         return "Style3.css"
 
-def looks_like_url(path_str: str) -> bool:
-    s = (path_str or "").lower().strip()
-    return s.startswith("http://") or s.startswith("https://")
-
 def hex_to_rgb_tuple(hex_color: str) -> Tuple[int,int,int]:
     hc = hex_color.strip().lstrip('#')
     if len(hc) == 3:
@@ -103,46 +188,439 @@ def to_file_uri_if_exists(path_str: str, out_dir: Path) -> str:
         pass
     return path_str
 
+def preload_src(path_str: str, out_dir: Path) -> Optional[str]:
+    """URL as-is, existing local file as file:/// URI, anything else None (nothing to warm)."""
+    path_str = (path_str or "").strip()
+    if not path_str:
+        return None
+    if looks_like_url(path_str):
+        return path_str
+    uri = to_file_uri_if_exists(path_str, out_dir)
+    return uri if uri != path_str else None
+
+def js_json(obj) -> str:
+    """JSON safe to drop inside an inline <script>."""
+    return json.dumps(obj).replace("</", "<\\/")
+
 # Inline local images as data URIs (bullet-proof logo/bg)
+_data_uris: OrderedDict = OrderedDict()  # (path, mtime_ns, size) -> data URI, LRU by total length
+
 def path_to_data_uri(path_str: str, out_dir: Path) -> Optional[str]:
     """
     If path_str points to a local file (absolute or relative to out_dir),
     return a data: URI. Otherwise return None.
+    Encoded URIs are reused across builds (batch imports share logos/backgrounds).
     """
     try:
         p = Path(path_str)
         if not p.is_absolute():
             p = (out_dir / path_str)
         if p.exists() and p.is_file():
+            st = p.stat()
+            key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+            uri = _data_uris.get(key)
+            if uri is not None:
+                _data_uris.move_to_end(key)
+                return uri
             mime, _ = mimetypes.guess_type(str(p))
             mime = mime or "application/octet-stream"
             b = p.read_bytes()
             b64 = base64.b64encode(b).decode("ascii")
-            return f"data:{mime};base64,{b64}"
+            uri = f"data:{mime};base64,{b64}"
+            _data_uris[key] = uri
+            total = sum(len(u) for u in _data_uris.values())
+            while total > DATA_URI_CACHE_CHARS and len(_data_uris) > 1:
+                total -= len(_data_uris.popitem(last=False)[1])
+            return uri
     except Exception:
         pass
     return None
 
+# ---------- Local font store ----------
+def norm_family(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+def google_family_faces(google_family: str) -> Tuple[str, list]:
+    """'Playfair+Display:ital,wght@0,900;1,900' -> ('Playfair Display', [('normal', 900), ('italic', 900)])"""
+    name, _, axes = google_family.partition(":")
+    family = name.replace("+", " ")
+    if not axes:
+        return family, [("normal", 400)]
+    keys, _, values = axes.partition("@")
+    keys = keys.split(",")
+    faces = []
+    for tup in values.split(";"):
+        vals = dict(zip(keys, tup.split(",")))
+        style = "italic" if vals.get("ital") == "1" else "normal"
+        faces.append((style, int(vals.get("wght", "400"))))
+    return family, faces
+
+def font_face_info(path: Path) -> Tuple[str, int, str]:
+    """(family, weight, style) from the font's name/OS2 tables, or from the file name without fontTools."""
+    if TTFont is not None:
+        try:
+            f = TTFont(str(path), lazy=True)
+            names = f["name"]
+            family = str(names.getDebugName(16) or names.getDebugName(1) or path.stem)
+            weight = int(f["OS/2"].usWeightClass) if "OS/2" in f else 400
+            italic = bool(f["OS/2"].fsSelection & 1) if "OS/2" in f else False
+            f.close()
+            return family, weight, "italic" if italic else "normal"
+        except Exception:
+            pass
+    stem = path.stem
+    family, _, variant = stem.partition("-")
+    v = variant.lower()
+    style = "italic" if "italic" in v else "normal"
+    v = v.replace("italic", "")
+    weight = FONT_WEIGHT_NAMES.get(v, 400)
+    return family, weight, style
+
+class FontStore:
+    """
+    Folder of web fonts + fonts.json manifest, generated once (Import Fonts / Mirror
+    Google Fonts) and referenced by pages with relative url()s, so room pages never
+    wait on fonts.googleapis.com and keep working when the venue is offline.
+    """
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.manifest_path = self.root / "fonts.json"
+        self.faces: list = []
+        if self.manifest_path.exists():
+            try:
+                self.faces = json.loads(self.manifest_path.read_text(encoding="utf-8")).get("faces", [])
+            except Exception:
+                self.faces = []
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.write_text(json.dumps({"faces": self.faces}, indent=2), encoding="utf-8")
+        (self.root / "fonts.css").write_text(self.face_css(None, url_prefix=""), encoding="utf-8")
+
+    def _add(self, entry: dict):
+        key = (norm_family(entry["family"]), entry["weight"], entry["style"], entry.get("unicode_range", ""))
+        self.faces = [f for f in self.faces
+                      if (norm_family(f["family"]), f["weight"], f["style"], f.get("unicode_range", "")) != key]
+        self.faces.append(entry)
+
+    def import_folder(self, src_dir: Path) -> Tuple[list, list]:
+        """Copy every font in src_dir into the store, converting to WOFF2 when fontTools + brotli are available."""
+        imported, errors = [], []
+        self.root.mkdir(parents=True, exist_ok=True)
+        for src in sorted(Path(src_dir).iterdir()):
+            ext = src.suffix.lower().lstrip(".")
+            if not src.is_file() or ext not in FONT_FILE_EXTS:
+                continue
+            try:
+                family, weight, style = font_face_info(src)
+                base = f"{norm_family(family)}-{weight}-{style}"
+                dest, fmt = self.root / f"{base}.woff2", "woff2"
+                converted = False
+                if ext != "woff2" and TTFont is not None:
+                    try:
+                        f = TTFont(str(src))
+                        f.flavor = "woff2"
+                        f.save(str(dest))
+                        converted = True
+                    except Exception:
+                        converted = False  # brotli missing / exotic font: keep original format
+                if not converted:
+                    fmt = {"ttf": "truetype", "otf": "opentype"}.get(ext, ext)
+                    dest = self.root / f"{base}.{ext}"
+                    shutil.copyfile(src, dest)
+                self._add({"family": family, "weight": weight, "style": style,
+                           "file": dest.name, "format": fmt})
+                imported.append(f"{family} {weight} {style} ({fmt})")
+            except Exception as e:
+                errors.append(f"{src.name}: {e}")
+        self.save()
+        return imported, errors
+
+    def mirror_google(self, google_families=None) -> Tuple[list, list]:
+        """Download the WOFF2 files behind the FANCY_FONTS Google CSS (all unicode-range subsets)."""
+        if google_families is None:
+            google_families = [g for _, g in FANCY_FONTS.values() if g]
+        mirrored, errors = [], []
+        self.root.mkdir(parents=True, exist_ok=True)
+        for gf in google_families:
+            url = f"https://fonts.googleapis.com/css2?family={gf}&display=swap"
+            try:
+                req = urllib.request.Request(url, headers={"User-Agent": GOOGLE_FONTS_UA})
+                with urllib.request.urlopen(req, timeout=20) as resp:
+                    css = resp.read().decode("utf-8")
+                for subset, block in re.findall(r"(?:/\*\s*([\w-]+)\s*\*/\s*)?@font-face\s*{([^}]*)}", css):
+                    fam = re.search(r"font-family:\s*'([^']+)'", block).group(1)
+                    style = re.search(r"font-style:\s*(\w+)", block).group(1)
+                    weight = int(re.search(r"font-weight:\s*(\d+)", block).group(1))
+                    src_url = re.search(r"url\(([^)]+)\)", block).group(1).strip("'\"")
+                    rng = re.search(r"unicode-range:\s*([^;]+);", block)
+                    name = f"{norm_family(fam)}-{weight}-{style}-{subset or 'all'}.woff2"
+                    with urllib.request.urlopen(src_url, timeout=60) as r, (self.root / name).open("wb") as out:
+                        shutil.copyfileobj(r, out)
+                    self._add({"family": fam, "weight": weight, "style": style, "file": name,
+                               "format": "woff2", "unicode_range": rng.group(1).strip() if rng else ""})
+                mirrored.append(gf.split(":")[0].replace("+", " "))
+            except Exception as e:
+                errors.append(f"{gf}: {e}")
+        self.save()
+        return mirrored, errors
+
+    def faces_for(self, family: str, wanted: list) -> list:
+        """Stored faces of family matching the wanted (style, weight) pairs, nearest weight if not exact."""
+        fam = norm_family(family)
+        have = [f for f in self.faces if norm_family(f["family"]) == fam and (self.root / f["file"]).exists()]
+        chosen = []
+        for style, weight in wanted:
+            pool = [f for f in have if f["style"] == style] or have
+            if not pool:
+                continue
+            best = min(abs(f["weight"] - weight) for f in pool)
+            chosen.extend(f for f in pool if abs(f["weight"] - weight) == best and f not in chosen)
+        return chosen
+
+    @staticmethod
+    def latin_face(faces: list) -> dict:
+        """The face that renders A-Z: mirrored Google fonts list cyrillic-ext etc. before latin."""
+        def covers(rng: str) -> bool:
+            if not rng:
+                return True  # whole font, no subset split
+            for part in rng.split(","):
+                part = part.strip().upper().removeprefix("U+")
+                lo, _, hi = part.partition("-")
+                try:
+                    lo_cp = int(lo.replace("?", "0"), 16)
+                    hi_cp = int(hi, 16) if hi else int(lo.replace("?", "F"), 16)
+                except ValueError:
+                    continue
+                if lo_cp <= 0x41 and hi_cp >= 0x5A:
+                    return True
+            return False
+        return next((f for f in faces if covers(f.get("unicode_range", ""))), faces[0])
+
+    def face_css(self, faces, url_prefix: str = FONT_STORE_DIRNAME + "/", family: Optional[str] = None) -> str:
+        """@font-face rules for faces (all when None); family renames them to the name the page asks for."""
+        rules = []
+        for f in (self.faces if faces is None else faces):
+            rng = f"\n  unicode-range: {f['unicode_range']};" if f.get("unicode_range") else ""
+            rules.append(f"""@font-face {{
+  font-family: '{family or f['family']}';
+  font-style: {f['style']};
+  font-weight: {f['weight']};
+  src: url('{f.get('src') or url_prefix + f['file']}') format('{f['format']}');
+  font-display: swap;{rng}
+}}""")
+        return "\n".join(rules) + "\n"
+
+# ---------- Glyph subsetting ----------
+_font_hashes: dict = {}
+
+def font_file_hash(path: Path) -> str:
+    """sha1 of the font bytes, memoized on (path, mtime, size)."""
+    st = path.stat()
+    key = (str(path.resolve()), st.st_mtime_ns, st.st_size)
+    h = _font_hashes.get(key)
+    if h is None:
+        h = hashlib.sha1(path.read_bytes()).hexdigest()
+        _font_hashes[key] = h
+    return h
+
+def subset_font(font_path: Path, text: str, cache_dir: Path) -> Optional[Path]:
+    """
+    Subset font_path to the glyphs of text as rendered (the page uppercases it) and
+    compress it, cached by (font hash, glyph set). None when fontTools is unavailable
+    or the font can't be subset.
+    """
+    if font_subset is None or TTFont is None:
+        return None
+    try:
+        chars = "".join(sorted(set(text.upper() + " ")))
+        key = f"{font_file_hash(font_path)[:16]}-{hashlib.sha1(chars.encode('utf-8')).hexdigest()[:12]}"
+        out = cache_dir / f"{key}.{SUBSET_FLAVOR}"
+        if out.exists():
+            return out
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        options = font_subset.Options()
+        options.flavor = SUBSET_FLAVOR
+        options.layout_features = ["*"]
+        font = TTFont(str(font_path))
+        subsetter = font_subset.Subsetter(options)
+        subsetter.populate(text=chars)
+        subsetter.subset(font)
+        tmp = out.with_suffix(out.suffix + ".tmp")
+        font.flavor = SUBSET_FLAVOR
+        font.save(str(tmp))
+        font.close()
+        tmp.replace(out)
+        return out
+    except Exception:
+        return None
+
+def subset_font_src(font_path: Path, text: str, out_dir: Path) -> Optional[Tuple[str, str]]:
+    """(url, format) for a subset of font_path: data: URI when tiny, else a relative sidecar file."""
+    sub = subset_font(font_path, text, out_dir / FONT_STORE_DIRNAME / FONT_SUBSET_DIRNAME)
+    if sub is None:
+        return None
+    fmt = SUBSET_FLAVOR
+    if sub.stat().st_size <= FONT_INLINE_MAX_BYTES:
+        b64 = base64.b64encode(sub.read_bytes()).decode("ascii")
+        return f"data:{FONT_MIME[fmt]};base64,{b64}", fmt
+    return f"{FONT_STORE_DIRNAME}/{FONT_SUBSET_DIRNAME}/{sub.name}", fmt
+
+# ---------- Font metrics / metric-matched fallbacks ----------
+_font_metrics: dict = {}
+
+def font_metrics(path: Path) -> Optional[dict]:
+    """upm/ascent/descent/line_gap + per-char advances from hhea/hmtx/cmap (fontTools), memoized by content hash."""
+    if TTFont is None:
+        return None
+    try:
+        key = font_file_hash(path)
+        if key not in _font_metrics:
+            f = TTFont(str(path), lazy=True)
+            hhea, hmtx, cmap = f["hhea"], f["hmtx"], f.getBestCmap() or {}
+            advances = {chr(cp): hmtx[g][0] for cp, g in cmap.items() if g in hmtx.metrics}
+            _font_metrics[key] = {
+                "upm": f["head"].unitsPerEm,
+                "ascent": hhea.ascent, "descent": hhea.descent, "line_gap": hhea.lineGap,
+                "advances": advances,
+            }
+            f.close()
+        return _font_metrics[key]
+    except Exception:
+        return None
+
+def avg_char_width(m: dict) -> float:
+    """Frequency-weighted average advance in em (the capsize xWidthAvg measure)."""
+    if "x_width_avg" in m:
+        return m["x_width_avg"] / m["upm"]
+    adv = m["advances"]
+    fallback = sum(adv.values()) / max(1, len(adv))
+    total = sum(LETTER_FREQ.values())
+    return sum(adv.get(c, fallback) * w for c, w in LETTER_FREQ.items()) / total / m["upm"]
+
+def system_font_metrics(name: str) -> dict:
+    for d in SYSTEM_FONT_DIRS:
+        for fn in SYSTEM_FONT_FILES.get(name, ()):
+            p = Path(d) / fn
+            if p.is_file():
+                m = font_metrics(p)
+                if m:
+                    return m
+    upm, asc, desc, gap, xavg = FALLBACK_FONT_METRICS[name]
+    return {"upm": upm, "ascent": asc, "descent": desc, "line_gap": gap, "x_width_avg": xavg}
+
+def fallback_face_css(family: str, font_path: Path, serif: bool = False) -> Optional[str]:
+    """
+    @font-face '<family> Fallback' over a local system font with size-adjust and
+    ascent/descent/line-gap overrides from font_path's metrics, so the swap from
+    fallback to real font keeps the text box the same size.
+    """
+    web = font_metrics(font_path)
+    if not web:
+        return None
+    base = "Times New Roman" if serif else "Arial"
+    sys_m = system_font_metrics(base)
+    size_adjust = avg_char_width(web) / avg_char_width(sys_m)
+    if size_adjust <= 0:
+        return None
+    upm = web["upm"] * size_adjust
+    return f"""
+@font-face {{
+  font-family: '{family} Fallback';
+  src: local('{base}');
+  size-adjust: {size_adjust * 100:.2f}%;
+  ascent-override: {web['ascent'] / upm * 100:.2f}%;
+  descent-override: {abs(web['descent']) / upm * 100:.2f}%;
+  line-gap-override: {web['line_gap'] / upm * 100:.2f}%;
+}}
+"""
+
+def with_fallback_family(font_stack: str, family: str) -> str:
+    """Insert '<family> Fallback' right after the first family of a CSS font stack."""
+    first, sep, rest = font_stack.partition(",")
+    return f"{first}, '{family} Fallback'" + (f",{rest}" if sep else "")
+
+def text_width_em(text: str, metrics: Optional[dict]) -> float:
+    """Advance width of text as rendered (uppercased) in em, from hmtx; estimated when no metrics."""
+    t = text.upper()
+    if not metrics:
+        return len(t) * FIT_FALLBACK_EM_PER_CHAR
+    adv = metrics["advances"]
+    avg = sum(adv.values()) / max(1, len(adv))
+    return sum(adv.get(c, avg) for c in t) / metrics["upm"]
+
 # ---------- Font includes / resolution ----------
-def resolve_inner_font(font_choice: str, local_font_path: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+def inner_font_file(font_choice: str, local_font_path: str,
+                    font_store: Optional[FontStore] = None, out_dir: Optional[Path] = None) -> Optional[Path]:
+    """The font file the guest name will render with, if we have one on disk (local font or font store)."""
+    if local_font_path and local_font_path.split(".")[-1].lower() in FONT_FILE_EXTS:
+        fp = Path(local_font_path)
+        if out_dir is not None and not fp.is_absolute():
+            fp = out_dir / local_font_path
+        return fp if fp.is_file() else None
+    _, google_family = FANCY_FONTS.get(font_choice, (None, None))
+    if google_family and font_store is not None:
+        faces = font_store.faces_for(*google_family_faces(google_family))
+        if faces:
+            return font_store.root / font_store.latin_face(faces)["file"]
+    return None
+
+def resolve_inner_font(font_choice: str, local_font_path: str,
+                       font_store: Optional[FontStore] = None,
+                       text: str = "", out_dir: Optional[Path] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    (inner font-family, Google <link> or None, @font-face CSS or None).
+    With text + out_dir, local/imported fonts are subset to just those glyphs.
+    """
     google_link_tag = None
     local_face_css = None
     inner_font_family = None
     if local_font_path:
         ext = local_font_path.split(".")[-1].lower()
-        if ext in ("ttf", "otf", "woff", "woff2"):
+        if ext in FONT_FILE_EXTS:
             inner_font_family = "CustomInner"
+            src, fmt = local_font_path, {"ttf": "truetype", "otf": "opentype"}.get(ext, ext)
+            fp = inner_font_file(font_choice, local_font_path, None, out_dir) or Path(local_font_path)
+            if out_dir is not None:
+                sub = subset_font_src(fp, text, out_dir) if text and fp.is_file() else None
+                if sub:
+                    src, fmt = sub
+                else:
+                    src = to_file_uri_if_exists(local_font_path, out_dir)
             local_face_css = f"""
 @font-face {{
   font-family: 'CustomInner';
-  src: url('{local_font_path}');
+  src: url('{src}') format('{fmt}');
   font-display: swap;
 }}
 """
+            fallback_css = fallback_face_css("CustomInner", fp) if fp.is_file() else None
+            if fallback_css:
+                inner_font_family = with_fallback_family("'CustomInner'", "CustomInner")
+                local_face_css += fallback_css
             return inner_font_family, google_link_tag, local_face_css
     if font_choice in FANCY_FONTS:
         inner_font_family, google_family = FANCY_FONTS[font_choice]
         if google_family:
+            # Prefer the local store; only fall back to Google when the family was never mirrored
+            if font_store is not None:
+                family, wanted = google_family_faces(google_family)
+                faces = font_store.faces_for(family, wanted)
+                if faces:
+                    if text and out_dir is not None:
+                        # whole imported fonts (no unicode-range split) get subset like local fonts
+                        subbed = []
+                        for f in faces:
+                            sub = None if f.get("unicode_range") else subset_font_src(font_store.root / f["file"], text, out_dir)
+                            subbed.append(dict(f, src=sub[0], format=sub[1]) if sub else f)
+                        faces = subbed
+                    face_css = font_store.face_css(faces, family=family)
+                    serif = "serif" in inner_font_family and "sans-serif" not in inner_font_family
+                    fallback_css = fallback_face_css(family, font_store.root / font_store.latin_face(faces)["file"], serif=serif)
+                    if fallback_css:
+                        inner_font_family = with_fallback_family(inner_font_family, family)
+                        face_css += fallback_css
+                    return inner_font_family, None, face_css
             google_link_tag = f"<link href='https://fonts.googleapis.com/css2?family={google_family}&display=swap' rel='stylesheet'>"
     return inner_font_family, google_link_tag, local_face_css
 
@@ -283,102 +761,2122 @@ h1 {{
 }}
 """)
 
-    if opts.get("pill_panel"):
-        parts.append("""
-.innertext {
-  background: rgba(0,0,0,.55);
-  padding: .35em .7em;
-  border-radius: 12px;
-  box-shadow: 0 6px 20px rgba(0,0,0,.35);
-  -webkit-backdrop-filter: blur(2px);
-  backdrop-filter: blur(2px);
-}
-""")
+    if opts.get("pill_panel"):
+        parts.append("""
+.innertext {
+  background: rgba(0,0,0,.55);
+  padding: .35em .7em;
+  border-radius: 12px;
+  box-shadow: 0 6px 20px rgba(0,0,0,.35);
+  -webkit-backdrop-filter: blur(2px);
+  backdrop-filter: blur(2px);
+}
+""")
+
+    if opts.get("overlay"):
+        parts.append("""
+.overlay {
+  position: fixed; inset: 0; pointer-events: none; z-index: 1;
+  background:
+    linear-gradient(to bottom, rgba(0,0,0,.55), rgba(0,0,0,0) 40%),
+    linear-gradient(to top,    rgba(0,0,0,.45), rgba(0,0,0,0) 45%);
+}
+body > * { position: relative; z-index: 2; }
+""")
+
+    if opts.get("dim_video"):
+        parts.append("""
+#myVideo { filter: brightness(.85) contrast(1.05) saturate(1.05); }
+""")
+
+    return "<style>\n" + "\n".join(parts) + "\n</style>"
+
+def inner_fit_css(opts: dict, width_em: float, chars: int) -> str:
+    """Precomputed fit: cap .innertext so the measured name fits the width around its anchor."""
+    if not width_em:
+        return ""
+    h_min, h_vw, h_max = HEADLINE_SIZES.get(opts.get("headline_size","Medium"), HEADLINE_SIZES["Medium"])
+    x_pct, _ = POS_TO_PCT.get(opts.get("inner_pos", "Center"), (50, 50))
+    room_vw = 2 * min(x_pct, 100 - x_pct) * FIT_WIDTH_FRACTION
+    pad_em = 1.4 if opts.get("pill_panel") else 0.0  # .7em padding each side
+    spacing_px = int(chars)                          # letter-spacing: 1px per char
+    return f"""<style>
+.innertext {{
+  font-size: min(clamp({h_min}px, {h_vw}vw, {h_max}px), calc(({room_vw:.2f}vw - {spacing_px}px) / {width_em + pad_em:.4f}));
+  white-space: nowrap;
+}}
+</style>"""
+
+def param_fit_table(opts: dict, metrics: Optional[dict]) -> dict:
+    """Data for the URL-parameter page's runtime fit: same formula as inner_fit_css, advances per glyph."""
+    h_min, h_vw, h_max = HEADLINE_SIZES.get(opts.get("headline_size","Medium"), HEADLINE_SIZES["Medium"])
+    x_pct, _ = POS_TO_PCT.get(opts.get("inner_pos", "Center"), (50, 50))
+    if metrics:
+        adv = metrics["advances"]
+        upm = metrics["upm"]
+        avg = sum(adv.values()) / max(1, len(adv))
+        table = {c: adv[c] for c in set(PARAM_PAGE_GLYPHS.upper()) if c in adv}
+    else:
+        upm, avg, table = 1000, FIT_FALLBACK_EM_PER_CHAR * 1000, {}
+    return {
+        "adv": table, "upm": upm, "avg": round(avg, 1),
+        "room": round(2 * min(x_pct, 100 - x_pct) * FIT_WIDTH_FRACTION, 2),
+        "pad": 1.4 if opts.get("pill_panel") else 0.0,
+        "clamp": f"clamp({h_min}px, {h_vw}vw, {h_max}px)",
+    }
+
+def build_html(title_text: str, inner_text: str, css_file: str,
+               bg_src: Optional[str], video_file: str,
+               logo_src: str,
+               style_opts: dict, font_head_extra: str,
+               inner_font_family: Optional[str],
+               local_face_css: Optional[str],
+               room_number: int,
+               stop_minutes: int = 0,
+               next_party: Optional[dict] = None,
+               fit_css: str = "",
+               url_params: bool = False,
+               param_fit: Optional[dict] = None,
+               telemetry: Optional[dict] = None) -> str:
+    overlay_div = "<div class='overlay'></div>\n" if style_opts.get("overlay") else ""
+    bg_tag = f"  <img id='bgImage' src='{bg_src}' alt='background'>\n" if bg_src else ""
+    with trace_span("css"):
+        inline_css = make_inline_css(style_opts, inner_font_family, local_face_css)
+    logo_img = logo_src or "lte.gif"
+
+    # Inline JS for auto-stop: pause video, show logo overlay, then idle (unload
+    # video source / optional bg so the decoder, buffers and GPU surfaces are freed).
+    # partyRoom.start() restores everything; overlay click/key or a postMessage
+    # {partyRoom: 'start'} from the kiosk shell triggers it.
+    stop_ms = max(0, int(stop_minutes)) * 60 * 1000
+    unload_bg = "true" if style_opts.get("idle_unload_bg") else "false"
+    timer_script = f"""
+<script>
+(function() {{
+  var stopMs = {stop_ms};
+  var unloadBg = {unload_bg};
+  var timer = null, idle = false, saved = {{ video: [], bg: null }};
+
+  function goIdle() {{
+    if (idle) return;
+    idle = true;
+    var ov = document.getElementById('endOverlay');
+    if (ov) {{
+      ov.style.display = 'flex';
+    }}
+    try {{
+      var v = document.getElementById('myVideo');
+      if (v) {{
+        v.pause();
+        v.muted = true;
+        var srcs = v.getElementsByTagName('source');
+        saved.video = [];
+        while (srcs.length) {{
+          saved.video.push(srcs[0].cloneNode(false));
+          v.removeChild(srcs[0]);
+        }}
+        v.removeAttribute('src');
+        v.load();  // drops decoder + buffers
+      }}
+      var bg = document.getElementById('bgImage');
+      if (unloadBg && bg && bg.getAttribute('src')) {{
+        saved.bg = bg.getAttribute('src');
+        bg.removeAttribute('src');
+      }}
+    }} catch(e) {{}}
+  }}
+
+  function start() {{
+    if (timer) {{ clearTimeout(timer); timer = null; }}
+    try {{
+      if (idle) {{
+        var v = document.getElementById('myVideo');
+        if (v && saved.video.length) {{
+          for (var i = 0; i < saved.video.length; i++) v.appendChild(saved.video[i]);
+          saved.video = [];
+          v.load();
+        }}
+        var bg = document.getElementById('bgImage');
+        if (bg && saved.bg) {{
+          bg.setAttribute('src', saved.bg);
+          saved.bg = null;
+        }}
+        if (v) {{
+          v.currentTime = 0;
+          var p = v.play();
+          if (p && p.catch) p.catch(function() {{}});
+        }}
+      }}
+    }} catch(e) {{}}
+    idle = false;
+    var ov = document.getElementById('endOverlay');
+    if (ov) {{
+      ov.style.display = 'none';
+    }}
+    if (stopMs > 0) timer = setTimeout(goIdle, stopMs);
+  }}
+
+  function setStop(ms) {{
+    stopMs = ms;
+    if (timer) {{ clearTimeout(timer); timer = null; }}
+    if (!idle && stopMs > 0) timer = setTimeout(goIdle, stopMs);
+  }}
+
+  window.partyRoom = {{ start: start, idle: goIdle, setStop: setStop }};
+  var ov = document.getElementById('endOverlay');
+  if (ov) ov.addEventListener('click', function() {{ if (idle) start(); }});
+  document.addEventListener('keydown', function(e) {{
+    if (idle && (e.key === 'Enter' || e.key === ' ')) start();
+  }});
+  window.addEventListener('message', function(e) {{
+    if (e.data && e.data.partyRoom === 'start') start();
+    else if (e.data && e.data.partyRoom === 'idle') goIdle();
+  }});
+  if (stopMs > 0) timer = setTimeout(goIdle, stopMs);
+}})();
+</script>
+""".strip()
+
+    # Warm the next party's assets during this party's last minutes
+    preload_script = ""
+    if next_party:
+        lead_ms = PRELOAD_LEAD_MINUTES * 60 * 1000
+        preload_script = f"""
+<script>
+(function() {{
+  var next = {js_json(next_party)};
+  var stopMs = {stop_ms}, leadMs = {lead_ms};
+  var keep = [];
+  function hint(href, as) {{
+    var l = document.createElement('link');
+    l.rel = 'preload'; l.as = as; l.href = href;
+    if (as === 'font') l.crossOrigin = 'anonymous';
+    document.head.appendChild(l);
+  }}
+  function warm() {{
+    try {{
+      if (next.video) {{
+        var v = document.createElement('video');
+        v.preload = 'auto'; v.muted = true; v.src = next.video;
+        v.setAttribute('aria-hidden', 'true');
+        v.style.cssText = 'position:fixed;width:1px;height:1px;opacity:0;pointer-events:none;left:0;top:0;';
+        document.body.appendChild(v);
+        v.load();
+        keep.push(v);
+      }}
+      (next.images || []).forEach(function(src) {{
+        hint(src, 'image');
+        var im = new Image();
+        im.src = src;
+        if (im.decode) im.decode().catch(function() {{}});
+        keep.push(im);
+      }});
+      (next.fonts || []).forEach(function(f) {{
+        (f.files || []).forEach(function(href) {{ hint(href, 'font'); }});
+        if (!f.css) return;
+        hint(f.css, 'style');
+        var l = document.createElement('link');
+        l.rel = 'stylesheet'; l.href = f.css;
+        l.onload = function() {{
+          if (document.fonts && document.fonts.load) document.fonts.load(f.weight + ' 1em ' + f.family).catch(function() {{}});
+        }};
+        document.head.appendChild(l);
+      }});
+    }} catch(e) {{}}
+  }}
+  var delay = stopMs > 0 ? Math.max(0, stopMs - leadMs) : 60000;
+  setTimeout(warm, delay);
+}})();
+</script>
+""".strip()
+
+    # Reusable page: title / inner / stop (minutes) from ?query or #fragment, set via textContent.
+    # Guest-name fit uses the embedded advance table -- plain arithmetic, no layout reads.
+    param_script = ""
+    if url_params:
+        param_script = f"""
+<script>
+(function() {{
+  var q = new URLSearchParams(location.search);
+  var h = new URLSearchParams(location.hash.replace(/^#/, ''));
+  function get(k) {{ return h.has(k) ? h.get(k) : q.get(k); }}
+  var fit = {js_json(param_fit)};
+  var title = get('title'), inner = get('inner'), stop = get('stop');
+  if (title !== null) {{
+    document.title = title;
+    var h1 = document.querySelector('h1');
+    if (h1) h1.textContent = title;
+  }}
+  if (inner !== null) {{
+    var el = document.querySelector('.innertext');
+    if (el) {{
+      el.textContent = inner;
+      if (fit && inner) {{
+        var chars = Array.from(inner.toUpperCase()), w = 0;
+        for (var i = 0; i < chars.length; i++) {{
+          var a = fit.adv[chars[i]];
+          w += (a === undefined ? fit.avg : a);
+        }}
+        w = w / fit.upm + fit.pad;
+        el.style.fontSize = 'min(' + fit.clamp + ', calc((' + fit.room + 'vw - ' + chars.length + 'px) / ' + w.toFixed(4) + '))';
+        el.style.whiteSpace = 'nowrap';
+      }}
+    }}
+  }}
+  if (stop !== null && window.partyRoom) {{
+    var m = parseFloat(stop);
+    if (!isNaN(m) && m >= 0) window.partyRoom.setStop(Math.round(m * 60000));
+  }}
+}})();
+</script>
+""".strip()
+
+    # Playback telemetry (opt-in): in <head> so the capture-phase error listener sees every asset
+    telemetry_script = ""
+    if telemetry:
+        telemetry_script = f"""
+<script>
+(function() {{
+  var cfg = {js_json(telemetry)}, batch = [], flushTimer = null;
+  function add(m, v, x) {{
+    batch.push({{ m: m, v: Math.round(v * 10) / 10, x: x || '', t: Date.now() }});
+    if (!flushTimer) flushTimer = setTimeout(flush, cfg.flush_ms);
+  }}
+  function flush() {{
+    if (flushTimer) {{ clearTimeout(flushTimer); flushTimer = null; }}
+    if (!batch.length) return;
+    var body = JSON.stringify({{ room: cfg.room, combo: cfg.combo, events: batch,
+      display: screen.width + 'x' + screen.height + '@' + (window.devicePixelRatio || 1) }});
+    batch = [];
+    try {{ if (navigator.sendBeacon && navigator.sendBeacon(cfg.url, body)) return; }} catch (e) {{}}
+    try {{ fetch(cfg.url, {{ method: 'POST', mode: 'no-cors', keepalive: true, body: body }}); }} catch (e) {{}}
+  }}
+  function srcOf(el) {{
+    return String(el.currentSrc || el.src || el.href || '').replace(/^(data:[^;,]*).*/, '$1').slice(0, 300);
+  }}
+  window.addEventListener('error', function(e) {{
+    var el = e.target;
+    if (el && el !== window && el.tagName) add('asset_error', 1, el.tagName.toLowerCase() + ' ' + srcOf(el));
+  }}, true);
+  if (document.fonts && document.fonts.ready) {{
+    document.fonts.ready.then(function() {{ add('font_load_ms', performance.now()); }});
+  }}
+  document.addEventListener('DOMContentLoaded', function() {{
+    var v = document.getElementById('myVideo');
+    if (!v) return;
+    var first = function() {{ add('ttff_ms', performance.now()); }};
+    if (v.requestVideoFrameCallback) v.requestVideoFrameCallback(first);
+    else v.addEventListener('playing', first, {{ once: true }});
+    v.addEventListener('canplaythrough', function() {{ add('canplaythrough_ms', performance.now()); }}, {{ once: true }});
+    var last = {{ dropped: 0, total: 0 }};
+    setInterval(function() {{
+      if (!v.getVideoPlaybackQuality || v.paused) return;
+      var q = v.getVideoPlaybackQuality();
+      if (q.totalVideoFrames < last.total) last = {{ dropped: 0, total: 0 }};  // source was reloaded
+      add('decoded_frames', q.totalVideoFrames - last.total);
+      add('dropped_frames', q.droppedVideoFrames - last.dropped);
+      last = {{ dropped: q.droppedVideoFrames, total: q.totalVideoFrames }};
+    }}, cfg.sample_ms);
+  }});
+  window.addEventListener('pagehide', flush);
+}})();
+</script>
+""".strip()
+
+    return f"""<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8" />
+  <title>{title_text}</title>
+  {telemetry_script}
+  <link rel='stylesheet' href='{css_file}'>
+  {font_head_extra}
+  {inline_css}
+  {fit_css}
+</head>
+<body>
+{overlay_div}{bg_tag}  <h1>{title_text}</h1>
+  <video autoplay muted loop id='myVideo'>
+    <source src="{video_file}" type='video/mp4'>Video not found
+  </video>
+  <div class='innertext'>{inner_text}</div>
+  <img class='brand-logo' src="{logo_img}" alt="LTE logo"
+       onerror="console.warn('Bottom logo failed to load:', this.src)" />
+  <div id="endOverlay">
+    <div class="end-wrap">
+      <img class="end-brand" src="{logo_img}" alt="LTE logo"
+           onerror="console.warn('End logo failed to load:', this.src)" />
+      <div class="end-room-text">Party Room {room_number}</div>
+    </div>
+  </div>
+{timer_script}
+{param_script}
+{preload_script}
+</body>
+</html>"""
+
+# ---------- Kiosk shell (one persistent tab per room) ----------
+def shell_filename(room_number: int) -> str:
+    return f"partyroom{room_number}_kiosk.html"
+
+def beacon_filename(room_number: int) -> str:
+    return f"partyroom{room_number}_kiosk.js"
+
+def build_kiosk_shell(room_number: int, token: str = "") -> str:
+    """
+    Shell page that stays open on the room display. It polls its beacon script
+    (plain <script src>, so it works from file:///) and loads the current party
+    page into an iframe. The previous iframe is blanked and removed once the new
+    one has loaded, which drops its video decoder and images.
+    The launch token is written into the shell file itself (Windows drops the query
+    string of file:// URLs it opens); a shell whose token no longer matches the
+    beacon retires itself, so only the most recently launched shell keeps a page alive.
+    """
+    return f"""<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8" />
+  <title>Party Room {room_number}</title>
+  <style>
+html, body {{ margin: 0; padding: 0; width: 100%; height: 100%; overflow: hidden; background: #000; }}
+iframe {{ position: fixed; inset: 0; width: 100%; height: 100%; border: 0; background: #000; }}
+iframe.loading {{ visibility: hidden; }}
+  </style>
+</head>
+<body>
+<script>
+(function() {{
+  var beaconSrc = '{beacon_filename(room_number)}';
+  var pollMs = {SHELL_POLL_MS};
+  var token = {json.dumps(token)};
+  var current = null, pending = null, lastKey = '', lastReload = '', retired = false;
+
+  function teardown(frame) {{
+    if (!frame) return;
+    try {{
+      var doc = frame.contentDocument;
+      if (doc) {{
+        var vids = doc.getElementsByTagName('video');
+        for (var i = 0; i < vids.length; i++) {{
+          vids[i].pause(); vids[i].removeAttribute('src');
+          while (vids[i].firstChild) vids[i].removeChild(vids[i].firstChild);
+          vids[i].load();
+        }}
+      }}
+    }} catch(e) {{}}  // cross-origin under file:/// -- blanking below still frees it
+    try {{ frame.src = 'about:blank'; }} catch(e) {{}}
+    if (frame.parentNode) frame.parentNode.removeChild(frame);
+  }}
+
+  function load(url) {{
+    if (pending) teardown(pending);
+    var f = document.createElement('iframe');
+    f.className = 'loading';
+    f.setAttribute('allow', 'autoplay; fullscreen');
+    f.onload = function() {{
+      if (f !== pending) return;
+      f.className = '';
+      var old = current;
+      current = f; pending = null;
+      teardown(old);
+    }};
+    pending = f;
+    f.src = url;
+    document.body.appendChild(f);
+  }}
+
+  window.partyShellBeacon = function(b) {{
+    if (retired || !b) return;
+    if (b.shell && token && b.shell !== token) {{
+      retired = true;
+      teardown(pending); teardown(current);
+      document.title = 'Party Room {room_number} (closed)';
+      return;
+    }}
+    var key = b.page + '#' + b.version;
+    if (key !== lastKey || (b.reload && b.reload !== lastReload)) {{
+      lastKey = key;
+      lastReload = b.reload || '';
+      load(b.page + (b.page.indexOf('?') < 0 ? '?' : '&') + 'v=' + encodeURIComponent(b.version + '.' + lastReload));
+    }}
+  }};
+
+  function poll() {{
+    if (retired) return;
+    var s = document.createElement('script');
+    s.src = beaconSrc + '?t=' + Date.now();
+    s.onload = s.onerror = function() {{ if (s.parentNode) s.parentNode.removeChild(s); }};
+    document.head.appendChild(s);
+    setTimeout(poll, pollMs);
+  }}
+  poll();
+}})();
+</script>
+</body>
+</html>"""
+
+def write_shell_beacon(out_dir: Path, room_number: int, page_name: str, version: str,
+                       shell_token: str = "", reload: str = "") -> Path:
+    """Point the room's kiosk shell at page_name; a new version or reload nonce makes it reload."""
+    beacon = {"page": page_name, "version": version, "shell": shell_token, "reload": reload}
+    path = out_dir / beacon_filename(room_number)
+    path.write_text(f"window.partyShellBeacon && window.partyShellBeacon({json.dumps(beacon)});\n",
+                    encoding="utf-8")
+    return path
+
+def read_shell_beacon(out_dir: Path, room_number: int) -> dict:
+    try:
+        text = (out_dir / beacon_filename(room_number)).read_text(encoding="utf-8")
+        return json.loads(text[text.index("(", text.index("partyShellBeacon(")) + 1:text.rindex(")")])
+    except Exception:
+        return {}
+
+def ensure_kiosk_shell(out_dir: Path, room_number: int, token: Optional[str] = None) -> Path:
+    """Write the room's shell file; token=None keeps the launch token of the running shell."""
+    if token is None:
+        token = read_shell_beacon(out_dir, room_number).get("shell", "")
+    path = out_dir / shell_filename(room_number)
+    html = build_kiosk_shell(room_number, token)
+    if not path.exists() or path.read_text(encoding="utf-8") != html:
+        path.write_text(html, encoding="utf-8")
+    return path
+
+# ---------- Build tracing (per-stage spans, one JSON trace per room) ----------
+TRACE_DIRNAME = ".traces"          # <output>/.traces/room<N>.json, overwritten by each build
+MEMORY_PROFILE_FRAMES = 12         # traceback depth kept per allocation while profiling
+MEMORY_PROFILE_TOP = 8             # allocation sites listed per room
+_trace_local = threading.local()
+
+def trace_path(out_dir: Path, room_number: int) -> Path:
+    return out_dir / TRACE_DIRNAME / f"room{room_number}.json"
+
+@contextmanager
+def trace_span(stage: str, **info):
+    """Time a build stage inside the active BuildTrace (no-op outside one). Yields a dict for extra
+    fields such as byte counts."""
+    trace = getattr(_trace_local, "trace", None)
+    if trace is None:
+        yield info
+        return
+    trace.stack.append(stage)
+    name = ".".join(trace.stack)
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        trace.stack.pop()
+        trace.spans.append({"stage": name, "start_ms": round((t0 - trace.t0) * 1000, 3),
+                            "ms": round((time.perf_counter() - t0) * 1000, 3), **info})
+        if trace.memory is not None:
+            trace.memory.checkpoint()
+
+_code_ranges: list = []  # (first line, last line, qualname) of every function in this module
+
+def _module_code_ranges() -> list:
+    """Line span + qualified name of each code object in this module, nested functions included."""
+    if not _code_ranges:
+        seen, stack = set(), []
+        for obj in list(globals().values()):
+            members = vars(obj).values() if isinstance(obj, type) else (obj,)
+            for member in members:
+                func = getattr(member, "__func__", getattr(member, "fget", member))
+                while hasattr(func, "__wrapped__"):  # @contextmanager, functools.wraps
+                    func = func.__wrapped__
+                code = getattr(func, "__code__", None)
+                if code is not None and code.co_filename == __file__:
+                    stack.append(code)
+        while stack:
+            code = stack.pop()
+            if code in seen:
+                continue
+            seen.add(code)
+            lines = [line for _, line in dis.findlinestarts(code) if line is not None]  # co_lines(): 3.10+
+            if lines:
+                name = getattr(code, "co_qualname", code.co_name)  # co_qualname: Python 3.11+
+                _code_ranges.append((min(lines + [code.co_firstlineno]), max(lines), name))
+            stack.extend(c for c in code.co_consts if isinstance(c, type(code)))
+    return _code_ranges
+
+def _enclosing_def(filename: str, lineno: int) -> str:
+    """'RoomShell.render' / 'path_to_data_uri' for a source line (the innermost code object around it)."""
+    if filename != __file__:
+        return ""
+    spans = [r for r in _module_code_ranges() if r[0] <= lineno <= r[1]]
+    return min(spans, key=lambda r: r[1] - r[0])[2].replace(".<locals>", "") if spans else ""
+
+class MemoryProfile:
+    """
+    tracemalloc over one build: peak above where the build started, plus the allocation sites
+    still holding memory at the build's high-water mark (checked after every trace span), each
+    charged to the innermost App3.py line so base64/str work lands on path_to_data_uri, build_html...
+    The build's peak is its own high-water mark; tracemalloc's peak counter belongs to session(),
+    so concurrent builds never reset each other's numbers.
+    """
+    _lock = threading.Lock()
+    _users = 0
+    _sessions = 0
+    _started = False  # we started tracemalloc (bench may already be tracing)
+
+    @classmethod
+    def _acquire(cls):
+        with cls._lock:
+            if cls._users == 0:
+                cls._started = not tracemalloc.is_tracing()
+                if cls._started:
+                    tracemalloc.start(MEMORY_PROFILE_FRAMES)
+            cls._users += 1
+
+    @classmethod
+    def _release(cls):
+        with cls._lock:
+            cls._users -= 1
+            if cls._users == 0 and cls._started:
+                tracemalloc.stop()
+
+    @classmethod
+    @contextmanager
+    def session(cls, enabled: bool = True):
+        """One tracing session around a whole Create / rebuild call; yields a dict that gets
+        'peak_kb', the traced peak over the call. Only the first open session resets the peak."""
+        result: dict = {}
+        if not enabled:
+            yield result
+            return
+        cls._acquire()
+        with cls._lock:
+            cls._sessions += 1
+            if cls._sessions == 1:
+                tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        try:
+            yield result
+        finally:
+            result["peak_kb"] = round((tracemalloc.get_traced_memory()[1] - base) / 1024, 1)
+            with cls._lock:
+                cls._sessions -= 1
+            cls._release()
+
+    def __init__(self):
+        MemoryProfile._acquire()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.baseline = tracemalloc.take_snapshot()
+        self.high, self.high_snapshot = self.base, None
+
+    def checkpoint(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.high:
+            self.high, self.high_snapshot = current, tracemalloc.take_snapshot()
+
+    def finish(self) -> dict:
+        self.checkpoint()
+        current = tracemalloc.get_traced_memory()[0]
+        snapshot = self.high_snapshot or tracemalloc.take_snapshot()
+        MemoryProfile._release()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        sites: dict = {}
+        for stat in snapshot.filter_traces(ignore).compare_to(self.baseline.filter_traces(ignore), "traceback"):
+            if stat.size_diff <= 0:
+                continue
+            frames = list(stat.traceback)  # oldest first
+            frame = next((f for f in reversed(frames) if f.filename == __file__), frames[-1])
+            site = sites.setdefault((frame.filename, frame.lineno), [0, 0])
+            site[0] += stat.size_diff
+            site[1] += max(0, stat.count_diff)
+        top = sorted(sites.items(), key=lambda kv: -kv[1][0])[:MEMORY_PROFILE_TOP]
+        return {"peak_kb": round((self.high - self.base) / 1024, 1),
+                "retained_kb": round((current - self.base) / 1024, 1),
+                "top": [{"site": f"{Path(fn).name}:{line}", "function": _enclosing_def(fn, line),
+                         "code": linecache.getline(fn, line).strip()[:120],
+                         "kb": round(size / 1024, 1), "blocks": count}
+                        for (fn, line), (size, count) in top]}
+
+class BuildTrace:
+    """Timed stages of one room build (shell lookup/compile, fonts, data: URIs, HTML, write, ...)."""
+    profile_memory = bool(os.environ.get("PARTYROOM_PROFILE_MEMORY"))  # also --profile-memory / the GUI checkbox
+
+    def __init__(self, room_number: int, filename: str):
+        self.room_number = room_number
+        self.filename = filename
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.total_ms = 0.0
+        self.spans: list = []
+        self.stack: list = []
+        self.memory: Optional[MemoryProfile] = None
+        self.memory_report: Optional[dict] = None
+
+    @contextmanager
+    def active(self):
+        previous = getattr(_trace_local, "trace", None)
+        _trace_local.trace = self
+        if self.profile_memory:
+            self.memory = MemoryProfile()
+        try:
+            yield self
+        finally:
+            _trace_local.trace = previous
+            if self.memory is not None:
+                self.memory_report, self.memory = self.memory.finish(), None
+            self.total_ms = round((time.perf_counter() - self.t0) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        data = {"room": self.room_number, "page": self.filename, "started": self.started,
+                "total_ms": self.total_ms, "spans": sorted(self.spans, key=lambda sp: sp["start_ms"])}
+        if self.memory_report:
+            data["memory"] = self.memory_report
+        return data
+
+    def save(self, out_dir: Path) -> Path:
+        path = trace_path(out_dir, self.room_number)
+        path.parent.mkdir(exist_ok=True)
+        replace_text(path, json.dumps(self.to_dict(), indent=1))
+        return path
+
+def read_build_trace(out_dir: Path, room_number: int) -> dict:
+    try:
+        return json.loads(trace_path(out_dir, room_number).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def trace_budget(trace: dict) -> dict:
+    """The page size breakdown + budget verdict recorded by render_room_page ({} if none)."""
+    return next((sp for sp in trace.get("spans", []) if sp["stage"] == "budget"), {})
+
+def trace_summary(trace: dict) -> str:
+    """'12.3 ms: shell 8.0 (compile: fonts 3.1, data_uri 1.5, html 0.7), text 0.4, write 1.2 (1.3 MB)'"""
+    def size(sp):
+        n = sp.get("bytes")
+        return "" if not n else f" ({n / 1024 / 1024:.1f} MB)" if n >= 1024 * 1024 else f" ({n / 1024:.0f} KB)"
+    spans = trace.get("spans", [])
+    parts = []
+    for sp in spans:
+        if "." in sp["stage"]:
+            continue
+        kids = [k for k in spans if k["stage"].startswith("shell.compile.") and k["stage"].count(".") == 2]
+        detail = (" (compile: " + ", ".join(f"{k['stage'].split('.')[-1]} {k['ms']:.1f}{size(k)}" for k in kids) + ")"
+                  if sp["stage"] == "shell" and kids else " (cached)" if sp["stage"] == "shell" else "")
+        parts.append(f"{sp['stage']} {sp['ms']:.1f}{size(sp)}{detail}")
+    text = f"{trace.get('total_ms', 0):.1f} ms: " + ", ".join(parts)
+    memory = trace.get("memory")
+    if memory:
+        top = memory["top"][0] if memory["top"] else None
+        text += f"; peak {size_text(memory['peak_kb'] * 1024)}" + (
+            f" (most at {top['site']} {top['function']}: {size_text(top['kb'] * 1024)})" if top else "")
+    return text
+
+# ---------- Page size budget ----------
+_script_block_re = re.compile(r"<script\b[^>]*>.*?</script>", re.S | re.I)
+_style_block_re = re.compile(r"<style\b[^>]*>.*?</style>", re.S | re.I)
+_font_face_re = re.compile(r"@font-face\s*\{[^}]*\}", re.S)
+_img_tag_re = re.compile(r"<img\b[^>]*>", re.I)
+_data_src_re = re.compile(r"""src=(["'])(data:[^"']*)\1""")
+_id_class_re = re.compile(r"""\s(?:id|class)\s*=\s*(["'])([^"']*)\1""", re.I)
+
+def utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+def page_size_breakdown(html: str) -> dict:
+    """Bytes per component: inlined logo (every copy) / background / other images, inline CSS,
+    @font-face CSS, JS and the remaining markup."""
+    sizes = dict.fromkeys(PAGE_COMPONENTS, 0)
+    sizes["logo_count"] = 0
+    for m in _script_block_re.finditer(html):
+        sizes["js"] += utf8_len(m.group(0))
+    for m in _style_block_re.finditer(html):
+        faces = sum(utf8_len(f.group(0)) for f in _font_face_re.finditer(m.group(0)))
+        sizes["font_css"] += faces
+        sizes["inline_css"] += utf8_len(m.group(0)) - faces
+    for m in _img_tag_re.finditer(html):
+        data = _data_src_re.search(m.group(0))
+        if not data:
+            continue
+        # classify by id/class only: alt text or the base64 payload can contain anything
+        names = " ".join(a.group(2) for a in _id_class_re.finditer(m.group(0).replace(data.group(0), "")))
+        if "bgImage" in names:
+            sizes["background"] += len(data.group(2))
+        elif "logo" in names or "brand" in names:
+            sizes["logo"] += len(data.group(2))
+            sizes["logo_count"] += 1
+        else:
+            sizes["other_images"] += len(data.group(2))
+    sizes["total"] = utf8_len(html)
+    sizes["markup"] = sizes["total"] - sum(sizes[k] for k in PAGE_COMPONENTS if k != "markup")
+    return sizes
+
+def page_budget(sizes: dict, state: dict) -> dict:
+    """Budget verdict for one page: status ok / warn / block, plus what would make it cheaper."""
+    warn = max(0, state_int(state.get("budget_warn_kb", PAGE_BUDGET_WARN_KB), PAGE_BUDGET_WARN_KB)) * 1024
+    block = max(0, state_int(state.get("budget_block_kb", PAGE_BUDGET_BLOCK_KB), PAGE_BUDGET_BLOCK_KB)) * 1024
+    total = sizes["total"]
+    status = "block" if block and total > block else "warn" if warn and total > warn else "ok"
+    suggestions = []
+    if sizes["background"] > INLINE_BG_SUGGEST_KB * 1024:
+        suggestions.append(f"background is {size_text(sizes['background'])} inlined: untick 'Inline logo/background' "
+                           f"to reference the file instead, or re-save it as a <=1920px JPEG/WebP")
+    per_logo = sizes["logo"] // max(1, sizes["logo_count"])
+    if per_logo > INLINE_LOGO_SUGGEST_KB * 1024:
+        suggestions.append(f"logo is inlined {sizes['logo_count']}x at {size_text(per_logo)} each: "
+                           f"reference the file, or use a smaller PNG/WebP")
+    if sizes["font_css"] > FONT_CSS_SUGGEST_KB * 1024:
+        suggestions.append(f"guest font CSS is {size_text(sizes['font_css'])}: install fontTools to subset it, "
+                           f"or import the font into the font store")
+    return {"status": status, "total": total, "warn": warn, "block": block, "sizes": sizes,
+            "suggestions": suggestions if status != "ok" else []}
+
+def budget_text(budget: dict) -> str:
+    sizes = budget["sizes"]
+    parts = [f"{k.replace('_', ' ')} {size_text(sizes[k])}" + (f" ({sizes['logo_count']} copies)" if k == "logo" and sizes["logo_count"] > 1 else "")
+             for k in sorted(PAGE_COMPONENTS, key=lambda k: -sizes[k]) if sizes[k]]
+    limit = budget["block"] if budget["status"] == "block" else budget["warn"]
+    text = f"{size_text(budget['total'])} (budget {size_text(limit)}): " + ", ".join(parts)
+    return text + "".join(f"\n  - {tip}" for tip in budget["suggestions"])
+
+# ---------- Two-phase build: cached room shells + name injection ----------
+# Everything except the title/guest text depends only on style + assets, so it is compiled
+# once into a RoomShell with slots; a name change only splices text into the cached shell.
+SLOT_TITLE = "\x00title\x00"
+SLOT_INNER = "\x00inner\x00"
+SLOT_FACE = "\x00face\x00"
+SLOT_FIT = "\x00fit\x00"
+SHELL_CACHE_SIZE = 16      # floor; [general] shell_cache overrides, else SHELL_CACHE_PER_ROOM per room
+SHELL_CACHE_PER_ROOM = 8   # a room's current style plus the scheduled parties queued for it
+_slot_re = re.compile("(" + "|".join(re.escape(x) for x in (SLOT_TITLE, SLOT_INNER, SLOT_FACE, SLOT_FIT)) + ")")
+
+def input_stamp(path_str: str, out_dir: Path):
+    """(mtime_ns, size) of a local input so edited assets invalidate cached shells."""
+    path_str = (path_str or "").strip()
+    if not path_str or looks_like_url(path_str):
+        return None
+    for p in (Path(path_str), out_dir / path_str):
+        try:
+            st = p.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            continue
+    return None
+
+def room_input_files(state: dict, out_dir: Path) -> list:
+    """Local files a room page depends on, as written in the state (absolute or relative to out_dir)."""
+    override = (state.get("video_override") or "").strip()
+    video = existing_or_url(override, out_dir) or VIDEO_OPTIONS.get(state_int(state.get("video", 1), 1), ("movie.mp4", ""))[0]
+    css = get_css(state.get("color", "Blue"), video if looks_like_url(video) else Path(video).name)
+    files = [override, video, css, state.get("bg", ""), state.get("logo_path", "") or "lte.gif",
+             state.get("inner_font_local", ""), state.get("next_video", ""), state.get("next_bg", ""),
+             state.get("next_logo", ""), str(out_dir / FONT_STORE_DIRNAME / "fonts.json")]
+    files = [local_asset(f.strip(), state, out_dir, pin=False) for f in files if f and f.strip()]  # cached URLs count as files
+    media = MediaCache.active
+    copies = [str(media.peek(str(src))) for src in (media_source(v, out_dir) for v in room_videos(state, out_dir))
+              if src and media.peek(str(src))] if media else []
+    return [f for f in files if not looks_like_url(f)] + copies  # a copy landing changes the shell key
+
+def shell_key(state: dict, out_dir: Path, room_number: int) -> str:
+    style = {k: v for k, v in state.items() if k not in ("title", "inner", "enabled", "start_at")}
+    stamps = [input_stamp(f, out_dir) for f in room_input_files(state, out_dir)]
+    if state_bool(state.get("telemetry")):
+        stamps.append(telemetry_url())  # baked into the page
+    raw = json.dumps([style, stamps, str(out_dir.resolve()), room_number], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class RoomShell:
+    """A compiled room page with slots for title, guest text, guest font face and fit CSS."""
+    def __init__(self, key: str, template: str, style_opts: dict, font_args: tuple,
+                 base_face_css: str, metrics: Optional[dict], subsettable: bool):
+        self.key = key
+        self.segments = _slot_re.split(template)  # text, slot, text, slot, ...
+        self.style_opts = style_opts
+        self.font_args = font_args                # (font_choice, local_font, font_store, out_dir)
+        self.base_face_css = base_face_css
+        self.metrics = metrics
+        self.subsettable = subsettable
+        self._faces: dict = {}
+        self.sizes = page_size_breakdown("".join(self.segments[::2]))  # everything but the slots
+        self.slot_counts = {slot: self.segments[1::2].count(slot) for slot in (SLOT_TITLE, SLOT_INNER, SLOT_FACE, SLOT_FIT)}
+
+    def face_css(self, inner: str) -> str:
+        if not self.subsettable or not inner:
+            return self.base_face_css
+        glyphs = "".join(sorted(set(inner.upper())))
+        css = self._faces.get(glyphs)
+        if css is None:
+            choice, local, store, out_dir = self.font_args
+            css = resolve_inner_font(choice, local, store, text=inner, out_dir=out_dir)[2] or ""
+            self._faces[glyphs] = css
+        return css
+
+    def slot_values(self, title: str, inner: str) -> dict:
+        return {
+            SLOT_TITLE: html_escape(title, quote=False),
+            SLOT_INNER: html_escape(inner, quote=False),
+            SLOT_FACE: self.face_css(inner),
+            SLOT_FIT: inner_fit_css(self.style_opts, text_width_em(inner, self.metrics), len(inner)) if inner else "",
+        }
+
+    def render(self, title: str, inner: str) -> str:
+        values = self.slot_values(title, inner)
+        return "".join(values.get(seg, seg) if i % 2 else seg for i, seg in enumerate(self.segments))
+
+    def page_sizes(self, title: str, inner: str) -> dict:
+        """page_size_breakdown of render(title, inner) without re-scanning the page."""
+        values = self.slot_values(title, inner)
+        sizes = dict(self.sizes)
+        n = self.slot_counts
+        sizes["markup"] += utf8_len(values[SLOT_TITLE]) * n[SLOT_TITLE] + utf8_len(values[SLOT_INNER]) * n[SLOT_INNER]
+        sizes["font_css"] += utf8_len(values[SLOT_FACE]) * n[SLOT_FACE]
+        sizes["inline_css"] += utf8_len(values[SLOT_FIT]) * n[SLOT_FIT]
+        sizes["total"] = sum(sizes[k] for k in PAGE_COMPONENTS)
+        return sizes
+
+_telemetry_address = ""  # [general] telemetry, set by configure_telemetry
+
+def configure_telemetry(config: Optional[configparser.ConfigParser] = None) -> str:
+    global _telemetry_address
+    _telemetry_address = (config.get("general", "telemetry", fallback="") if config else "").strip()
+    return telemetry_address()
+
+def telemetry_address() -> str:
+    """host:port the pages post to; room PCs must reach it, so it is the collector PC's address."""
+    return os.environ.get("PARTYROOM_TELEMETRY") or _telemetry_address or TELEMETRY_ADDRESS
+
+def telemetry_is_loopback(address: str) -> bool:
+    host = address.rpartition(":")[0].strip("[]") or "127.0.0.1"
+    if host.lower() == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def telemetry_url() -> str:
+    return f"http://{telemetry_address()}/t"
+
+def telemetry_config(state: dict, room_number: int, video_file: str) -> Optional[dict]:
+    """What the page's telemetry script reports under: room + the video/effects/font combination."""
+    if not state_bool(state.get("telemetry")):
+        return None
+    effects = "+".join(k for k in ("headline_outline", "neon_glow", "readable_shadow", "pill_panel",
+                                   "overlay", "dim_video") if state_bool(state.get(k)))
+    combo = (f"{urllib.parse.unquote(video_file.rsplit('/', 1)[-1])} | {effects or 'plain'} | "
+             f"{state.get('headline_size', 'Medium')} | {state.get('inner_font_choice', '')}")
+    return {"url": telemetry_url(), "room": room_number, "combo": combo,
+            "sample_ms": TELEMETRY_SAMPLE_MS, "flush_ms": TELEMETRY_FLUSH_MS}
+
+def compile_room_shell(state: dict, out_dir: Path, room_number: int, key: str = "") -> RoomShell:
+    """Phase 1: asset resolution, data-URI inlining, font + CSS generation for one style/asset config."""
+    with trace_span("assets"):
+        # Resolve video
+        video_file = existing_or_url(state.get("video_override", ""), out_dir)
+        if not video_file:
+            video_file = VIDEO_OPTIONS.get(state_int(state.get("video", 1), 1), ("movie.mp4", ""))[0]
+
+        css_file = get_css(state.get("color", "Blue"), Path(video_file).name if not looks_like_url(video_file) else video_file)
+        video_name = video_file  # telemetry reports the video the room asked for, not the cache file
+
+        # Background image (optional) / logo (optional override)
+        bg_src = existing_or_url(state.get("bg", ""), out_dir)
+        logo_src = existing_or_url(state.get("logo_path", ""), out_dir) or "lte.gif"
+
+        # URL assets: the prefetched local copy when there is one; videos on a share: the local media copy
+        video_file, bg_src, logo_src = (local_asset(u, state, out_dir) for u in (video_file, bg_src, logo_src))
+        video_file = local_media(video_file, out_dir)
+
+    with trace_span("fonts"):
+        # Fancy font for inner name
+        font_choice = state.get("inner_font_choice", "Pacifico")
+        local_font = state.get("inner_font_local", "")
+        font_store = FontStore(out_dir / FONT_STORE_DIRNAME)
+        inner_font_family, google_link_tag, base_face_css = resolve_inner_font(
+            font_choice, local_font, font_store, out_dir=out_dir)
+        font_file = inner_font_file(font_choice, local_font, font_store, out_dir)
+        inner_metrics = font_metrics(font_file) if font_file else None
+        # Per-name subsets only for whole fonts; mirrored Google faces are already unicode-range split
+        subsettable = font_subset is not None and font_file is not None
+        if subsettable and not local_font:
+            google_family = FANCY_FONTS.get(font_choice, (None, None))[1]
+            faces = font_store.faces_for(*google_family_faces(google_family)) if google_family else []
+            subsettable = not any(f.get("unicode_range") for f in faces)
+        url_params = state_bool(state.get("url_params"))
+        if url_params and subsettable:
+            # Name arrives in the URL: one subset covering every glyph the page may be asked to show
+            base_face_css = resolve_inner_font(font_choice, local_font, font_store,
+                                               text=PARAM_PAGE_GLYPHS, out_dir=out_dir)[2]
+            subsettable = False
+        font_head_extra = google_link_tag or ""
+
+    # Style + colors (link enforced)
+    title_color = state.get("title_color", "#FFFFFF")
+    inner_color = state.get("inner_color", "#FFFFFF")
+    if state_bool(state.get("link_colors", "True")):
+        title_color = inner_color
+
+    style_opts = {
+        "headline_outline": state_bool(state.get("headline_outline")),
+        "neon_glow": state_bool(state.get("neon_glow")),
+        "readable_shadow": state_bool(state.get("readable_shadow")),
+        "pill_panel": state_bool(state.get("pill_panel")),
+        "overlay": state_bool(state.get("overlay")),
+        "dim_video": state_bool(state.get("dim_video")),
+        "idle_unload_bg": state_bool(state.get("idle_unload_bg")),
+        "headline_size": state.get("headline_size", "Medium"),
+        "title_color": title_color,
+        "inner_color": inner_color,
+        "inner_pos": state.get("inner_pos", "Center"),
+        "inner_offset_x": state_int(state.get("inner_offset_x", 0)),
+        "inner_offset_y": state_int(state.get("inner_offset_y", 0)),
+    }
+    stop_mins = max(0, state_int(state.get("stop_minutes", 0)))
+
+    # ---- Make assets robust ----
+    with trace_span("data_uri") as span:
+        # Background: try inline image first (if local), else file:/// fallback; leave URLs as-is
+        inline = state_bool(state.get("inline_assets", True))
+        if bg_src and not looks_like_url(bg_src):
+            bg_src = (inline and path_to_data_uri(bg_src, out_dir)) or to_file_uri_if_exists(bg_src, out_dir)
+
+        # Video: cannot inline; just ensure file:/// if local
+        if video_file and not looks_like_url(video_file):
+            video_file = to_file_uri_if_exists(video_file, out_dir)
+
+        # Logo: prefer inline image (guaranteed to show), else file:/// fallback
+        if logo_src and not looks_like_url(logo_src):
+            logo_src = (inline and path_to_data_uri(logo_src, out_dir)) or to_file_uri_if_exists(logo_src, out_dir)
+        span["bytes"] = sum(len(u) for u in (bg_src, logo_src) if u and u.startswith("data:"))
+
+    # Next party descriptor (only what is set and reachable gets warmed)
+    next_party = {}
+    next_video = preload_src(local_media(local_asset(state.get("next_video", ""), state, out_dir), out_dir), out_dir)
+    if next_video:
+        next_party["video"] = next_video
+    next_images = [u for u in (preload_src(local_asset(state.get("next_bg", ""), state, out_dir), out_dir),
+                               preload_src(local_asset(state.get("next_logo", ""), state, out_dir), out_dir)) if u]
+    if next_images:
+        next_party["images"] = next_images
+    next_family, next_google = FANCY_FONTS.get(state.get("next_font_choice", ""), (None, None))
+    if next_google:
+        store_family, wanted = google_family_faces(next_google)
+        stored = font_store.faces_for(store_family, wanted)
+        next_party["fonts"] = [{
+            "css": None if stored else f"https://fonts.googleapis.com/css2?family={next_google}&display=swap",
+            "files": [f"{FONT_STORE_DIRNAME}/{f['file']}" for f in stored],
+            "family": next_family.split(",")[0].strip(),
+            "weight": str(wanted[0][1]),
+        }]
+
+    with trace_span("html") as span:
+        template = build_html(SLOT_TITLE, SLOT_INNER, css_file, bg_src, video_file,
+                              logo_src, style_opts, font_head_extra, inner_font_family, SLOT_FACE,
+                              room_number=room_number,
+                              stop_minutes=stop_mins,
+                              next_party=next_party or None,
+                              fit_css=SLOT_FIT,
+                              url_params=url_params,
+                              param_fit=param_fit_table(style_opts, inner_metrics) if url_params else None,
+                              telemetry=telemetry_config(state, room_number, video_name))
+        span["bytes"] = len(template)
+    return RoomShell(key or shell_key(state, out_dir, room_number), template, style_opts,
+                     (font_choice, local_font, font_store, out_dir), base_face_css or "",
+                     inner_metrics, subsettable)
+
+class ShellCache:
+    """LRU of compiled RoomShells keyed by shell_key (style state + asset stamps)."""
+    def __init__(self, size: int = SHELL_CACHE_SIZE):
+        self.size = size
+        self.shells: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()  # the scheduler builds from a background thread
+        self.compiling: dict = {}     # key -> lock held while that shell compiles
+
+    def get(self, state: dict, out_dir: Path, room_number: int) -> RoomShell:
+        with trace_span("key"):
+            key = shell_key(state, out_dir, room_number)
+        with self.lock:
+            shell = self.shells.get(key)
+            if shell is not None:
+                self.shells.move_to_end(key)
+                return shell
+            guard = self.compiling.setdefault(key, threading.Lock())
+        # Compile outside the cache lock so other rooms' hits don't wait; the guard stops
+        # two threads compiling the same shell.
+        with guard:
+            with self.lock:
+                shell = self.shells.get(key)
+            if shell is not None:
+                return shell
+            try:
+                with trace_span("compile"):
+                    shell = compile_room_shell(state, out_dir, room_number, key)
+                with self.lock:
+                    self.shells[key] = shell
+                    self._trim()
+            finally:
+                with self.lock:
+                    self.compiling.pop(key, None)
+            return shell
+
+    def resize(self, size: int):
+        with self.lock:
+            self.size = max(1, size)
+            self._trim()
+
+    def _trim(self):
+        while len(self.shells) > self.size:
+            self.shells.popitem(last=False)
+
+ROOM_SHELLS = ShellCache()
+
+def configure_shell_cache(config: Optional[configparser.ConfigParser] = None) -> int:
+    """Size ROOM_SHELLS from [general] shell_cache, else from the number of [roomN] sections."""
+    rooms = sum(1 for sect in config.sections() if re.fullmatch(r"room\d+", sect)) if config else 0
+    size = max(SHELL_CACHE_SIZE, rooms * SHELL_CACHE_PER_ROOM)
+    if config:
+        size = state_int(config.get("general", "shell_cache", fallback=""), size)
+    ROOM_SHELLS.resize(size)
+    return ROOM_SHELLS.size
+
+def room_page_ref(state: dict, filename: str) -> str:
+    """What to load for a room: the page itself, or for URL-parameter pages the page plus ?title&inner&stop."""
+    if not state_bool(state.get("url_params")):
+        return filename
+    title, inner = page_text(state)
+    query = {"title": title, "inner": inner, "stop": str(max(0, state_int(state.get("stop_minutes", 0))))}
+    return f"{filename}?{urllib.parse.urlencode(query, quote_via=urllib.parse.quote)}"
+
+def render_room_page(state: dict, out_dir: Path, filename: str, room_number: int,
+                     shells: Optional[ShellCache] = None) -> Tuple[str, str, str]:
+    """(html, page_ref, version) for one room; URL-parameter pages are rendered without guest text."""
+    if room_asset_urls(state):
+        with trace_span("prefetch"):
+            prefetch_room_assets([state], out_dir)
+    with trace_span("shell"):
+        shell = (shells or ROOM_SHELLS).get(state, out_dir, room_number)
+    title, inner = page_text(state)
+    page_ref = room_page_ref(state, filename)
+    page_inner = inner if page_ref == filename else ""
+    with trace_span("text") as span:
+        html = shell.render(title, page_inner)
+        span["bytes"] = len(html)
+    with trace_span("budget") as span:
+        budget = page_budget(shell.page_sizes(title, page_inner), state)
+        span.update(budget)
+    if budget["status"] == "block":
+        raise PageBudgetError(f"Room {room_number} page not written, {budget_text(budget)}")
+    version = hashlib.sha1(f"{shell.key}\x00{title}\x00{inner}".encode("utf-8")).hexdigest()[:12]
+    return html, page_ref, version
+
+def publish_to_shell(out_dir: Path, room_number: int, page_ref: str, version: str):
+    """Point the room's kiosk shell at page_ref (keeps its launch token and reload nonce)."""
+    prev = read_shell_beacon(out_dir, room_number)
+    ensure_kiosk_shell(out_dir, room_number, prev.get("shell", ""))
+    write_shell_beacon(out_dir, room_number, page_ref, version,
+                       shell_token=prev.get("shell", ""), reload=prev.get("reload", ""))
+
+_written_pages: dict = {}  # page path -> (html hash, mtime_ns) of URL-parameter pages we wrote
+
+def build_room_page(state: dict, out_dir: Path, filename: str, room_number: int,
+                    shells: Optional[ShellCache] = None) -> Optional[Path]:
+    """Build one room page from a RoomFrame state dict (see get_state) and hand it to the kiosk shell."""
+    if not state_bool(state.get("enabled", "True")):
+        return None
+    trace = BuildTrace(room_number, filename)
+    with trace.active():
+        try:
+            html, page_ref, version = render_room_page(state, out_dir, filename, room_number, shells)
+        except PageBudgetError:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            trace.save(out_dir)  # keep the size breakdown for the report
+            raise
+        out_dir.mkdir(parents=True, exist_ok=True)
+        file_path = out_dir / filename
+
+        with trace_span("write") as span:
+            if page_ref != filename:
+                # Reusable page: guest text comes from the URL, so the file only changes with style/assets/title
+                stamp = hashlib.sha1(html.encode("utf-8")).hexdigest()
+                try:
+                    current = file_path.stat().st_mtime_ns
+                except OSError:
+                    current = None
+                if _written_pages.get(str(file_path)) != (stamp, current):
+                    replace_text(file_path, html)
+                    _written_pages[str(file_path)] = (stamp, file_path.stat().st_mtime_ns)
+                else:
+                    span["skipped"] = True
+            else:
+                replace_text(file_path, html)
+            span["bytes"] = 0 if span.get("skipped") else file_path.stat().st_size
+
+        with trace_span("publish"):
+            publish_to_shell(out_dir, room_number, page_ref, version)
+    trace.save(out_dir)
+    return file_path
+
+# ---------- Scheduled pre-build queue ----------
+PREBUILD_LEAD_MINUTES = 10
+PREBUILD_MEDIA_RECHECK_SECONDS = 5   # how often a page staged against a still-copying video checks the media cache
+STAGING_DIRNAME = ".staging"
+
+def parse_start_time(text: str, now: Optional[datetime] = None, allow_past: bool = False) -> float:
+    """
+    'HH:MM' (today) or 'YYYY-MM-DD HH:MM' -> epoch seconds. Times before the current
+    minute raise ValueError unless allow_past (booking imports name past rows too).
+    """
+    text = (text or "").strip()
+    now = now or datetime.now()
+    start = None
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            start = datetime.strptime(text, fmt)
+            break
+        except ValueError:
+            pass
+    if start is None:
+        try:
+            t = datetime.strptime(text, "%H:%M")
+        except ValueError:
+            raise ValueError(f"can't read start time {text!r} (use HH:MM)") from None
+        start = now.replace(hour=t.hour, minute=t.minute, second=0, microsecond=0)
+    if not allow_past and start < now.replace(second=0, microsecond=0):
+        raise ValueError(f"start time {text!r} has already passed")
+    return start.timestamp()
+
+class ScheduledParty:
+    def __init__(self, room_number: int, start: float, state: dict, filename: str):
+        self.room_number = room_number
+        self.start = start
+        self.state = dict(state)
+        self.filename = filename
+        self.seq = 0                       # set by PartyScheduler.add; keeps staging files apart
+        self.staged: Optional[Path] = None
+        self.stage_failed = False
+        self.media_local = True            # False: staged while a video was still being copied to the media cache
+        self.media_checked = 0.0
+        self.build_ms = 0.0
+        self.page_ref = filename
+        self.version = ""
+
+    def label(self) -> str:
+        name = page_text(self.state)[1] or "(no name)"
+        return f"Room {self.room_number} {datetime.fromtimestamp(self.start):%H:%M} {name}"
+
+class PartyScheduler:
+    """
+    Upcoming parties per room in a heap keyed by start time. A background thread
+    pre-builds each page into <output>/.staging PREBUILD_LEAD_MINUTES ahead, then at
+    the start time os.replace()s it over partyroomN.html and repoints the kiosk shell.
+    A page staged while its video was still being copied to the local media cache is
+    restaged once the copy has landed.
+    """
+    def __init__(self, out_dir: Path, lead_seconds: float = PREBUILD_LEAD_MINUTES * 60,
+                 shells: Optional[ShellCache] = None, store: Optional["PartyStore"] = None):
+        self.out_dir = Path(out_dir)
+        self.lead = lead_seconds
+        self.shells = shells or ROOM_SHELLS
+        self.store = store  # each party is recorded in the build history when it goes live
+        self.rooms: dict = {}              # room -> heap of (start, seq, ScheduledParty)
+        self.events: queue.Queue = queue.Queue()  # (kind, message) for the UI to poll
+        self.live: dict = {}               # room -> when a scheduled party last went live there
+        self._seq = 0
+        self._cv = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, room_number: int, start: float, state: dict, filename: Optional[str] = None,
+            staged: Optional[Path] = None, page_ref: str = "", version: str = "",
+            build_ms: float = 0.0) -> ScheduledParty:
+        party = ScheduledParty(room_number, start, state, filename or f"partyroom{room_number}.html")
+        party.media_local = pin_party_media(state, self.out_dir, start)
+        if staged is not None and party.media_local:  # already built (booking import); else staged at the lead time
+            party.staged, party.page_ref, party.version = staged, page_ref or party.filename, version
+            party.build_ms = build_ms
+        with self._cv:
+            self._seq += 1
+            party.seq = self._seq
+            heapq.heappush(self.rooms.setdefault(room_number, []), (start, self._seq, party))
+            self._cv.notify()
+        return party
+
+    def upcoming(self) -> list:
+        with self._cv:
+            return sorted((p for heap in self.rooms.values() for _, _, p in heap), key=lambda p: p.start)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="party-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)  # let a swap in progress finish recording before the store closes
+
+    def _stage(self, party: ScheduledParty):
+        party.media_local = pin_party_media(party.state, self.out_dir, party.start)
+        party.media_checked = time.time()
+        staging = self.out_dir / STAGING_DIRNAME
+        staging.mkdir(parents=True, exist_ok=True)
+        t0 = time.perf_counter()
+        html, party.page_ref, party.version = render_room_page(
+            party.state, self.out_dir, party.filename, party.room_number, self.shells)
+        party.build_ms = (time.perf_counter() - t0) * 1000
+        path = staging / f"{Path(party.filename).stem}-{int(party.start)}-{party.seq}.html"
+        path.write_text(html, encoding="utf-8")
+        party.staged = path
+        self.events.put(("staged", party.label()))
+
+    def _restage(self, party: ScheduledParty):
+        """Rebuild a staged page against the local video copy once the media cache has it."""
+        party.media_checked = time.time()
+        if pin_party_media(party.state, self.out_dir, party.start):
+            self._stage(party)
+
+    def _swap(self, party: ScheduledParty):
+        if party.staged is None or not party.staged.exists():
+            self._stage(party)  # late add / lost staging file: build now
+        os.replace(party.staged, self.out_dir / party.filename)
+        self.live[party.room_number] = time.time()
+        publish_to_shell(self.out_dir, party.room_number, party.page_ref, party.version)
+        if self.store is not None:
+            self.store.record_build(party.room_number, party.state, self.out_dir / party.filename, party.build_ms)
+        self.events.put(("live", party.label()))
+
+    def _due(self, now: float) -> Tuple[list, Optional[float]]:
+        """(actions due now, next wake-up time) -- called with the lock held."""
+        actions, wake = [], None
+        for heap in self.rooms.values():
+            while heap:
+                start, _, party = heap[0]
+                if now >= start:
+                    heapq.heappop(heap)
+                    actions.append(("swap", party))
+                    continue
+                pending = party.staged is None and not party.stage_failed
+                copying = party.staged is not None and not party.media_local and not party.stage_failed
+                recheck = party.media_checked + PREBUILD_MEDIA_RECHECK_SECONDS
+                if pending and now >= start - self.lead:
+                    actions.append(("stage", party))
+                    t = start
+                elif copying and now >= recheck:
+                    actions.append(("restage", party))
+                    t = start
+                else:
+                    t = start - self.lead if pending else (min(start, recheck) if copying else start)
+                wake = t if wake is None else min(wake, t)
+                break
+        actions.sort(key=lambda a: a[1].start)
+        return actions, wake
+
+    def _run(self):
+        while True:
+            with self._cv:
+                if self._stop:
+                    return
+                actions, wake = self._due(time.time())
+                if not actions:
+                    self._cv.wait(None if wake is None else max(0.05, wake - time.time()))
+                    continue
+            for kind, party in actions:
+                try:
+                    {"swap": self._swap, "stage": self._stage, "restage": self._restage}[kind](party)
+                except Exception as e:
+                    if kind != "swap":
+                        party.stage_failed = True  # don't retry every loop; _swap rebuilds or uses the staged page
+                    self.events.put(("error", f"{party.label()}: {e}"))
+
+# ---------- Room state schema ----------
+class RoomField(NamedTuple):
+    kind: str              # "bool" | "int" | "choice" | "color" | "text"
+    default: object
+    choices: tuple = ()    # allowed values (matched case-insensitively for "choice")
+    minimum: Optional[int] = None
+
+ROOM_SCHEMA = {
+    "enabled": RoomField("bool", True),
+    "title": RoomField("text", "Happy Birthday"),
+    "inner": RoomField("text", ""),
+    "color": RoomField("choice", "Blue", tuple(COLORS)),
+    "video": RoomField("int", 1, tuple(VIDEO_OPTIONS)),
+    "bg": RoomField("text", ""),
+    "video_override": RoomField("text", ""),
+    "logo_path": RoomField("text", "lte.gif"),
+    "headline_outline": RoomField("bool", True),
+    "neon_glow": RoomField("bool", False),
+    "readable_shadow": RoomField("bool", True),
+    "pill_panel": RoomField("bool", False),
+    "overlay": RoomField("bool", True),
+    "dim_video": RoomField("bool", False),
+    "idle_unload_bg": RoomField("bool", False),
+    "url_params": RoomField("bool", False),
+    "telemetry": RoomField("bool", False),
+    "inline_assets": RoomField("bool", True),
+    "cache_urls": RoomField("bool", True),
+    "budget_warn_kb": RoomField("int", PAGE_BUDGET_WARN_KB, minimum=0),
+    "budget_block_kb": RoomField("int", PAGE_BUDGET_BLOCK_KB, minimum=0),
+    "start_at": RoomField("text", ""),
+    "headline_size": RoomField("choice", "Medium", tuple(HEADLINE_SIZES)),
+    "inner_font_choice": RoomField("choice", "Pacifico", tuple(FANCY_FONTS)),
+    "inner_font_local": RoomField("text", ""),
+    "title_color": RoomField("color", "#FFFFFF"),
+    "inner_color": RoomField("color", "#FFFFFF"),
+    "link_colors": RoomField("bool", True),
+    "inner_pos": RoomField("choice", "Center", tuple(INNER_POS_PRESETS)),
+    "inner_offset_x": RoomField("int", 0),
+    "inner_offset_y": RoomField("int", 0),
+    "stop_minutes": RoomField("int", 0, minimum=0),
+    "next_video": RoomField("text", ""),
+    "next_bg": RoomField("text", ""),
+    "next_logo": RoomField("text", ""),
+    "next_font_choice": RoomField("choice", "Same as Title", tuple(FANCY_FONTS)),
+}
+ROOM_DEFAULTS = {k: f.default for k, f in ROOM_SCHEMA.items()}
+ROOM_RETIRED_KEYS = ("inner_size", "inner_double")  # older config.ini files; ignored
+_choice_index = {k: {str(c).lower(): c for c in f.choices} for k, f in ROOM_SCHEMA.items() if f.kind == "choice"}
+_color_re = re.compile(r"#(?:[0-9a-fA-F]{3}){1,2}")
+
+def parse_room_value(key: str, raw):
+    """One schema field -> its typed value; ValueError says what was expected."""
+    field = ROOM_SCHEMA[key]
+    if field.kind == "text":
+        return "" if raw is None else str(raw)
+    if field.kind == "bool":
+        if isinstance(raw, bool):
+            return raw
+        value = configparser.ConfigParser.BOOLEAN_STATES.get(str(raw).strip().lower())
+        if value is None:
+            raise ValueError("expected true/false")
+        return value
+    if field.kind == "int":
+        try:
+            value = int(str(raw).strip())
+        except ValueError:
+            raise ValueError("expected a whole number") from None
+        if field.choices and value not in field.choices:
+            raise ValueError("expected one of " + ", ".join(map(str, field.choices)))
+        if field.minimum is not None and value < field.minimum:
+            raise ValueError(f"expected {field.minimum} or more")
+        return value
+    if field.kind == "choice":
+        value = _choice_index[key].get(str(raw).strip().lower())
+        if value is None:
+            raise ValueError("expected one of " + ", ".join(field.choices))
+        return value
+    value = str(raw).strip()  # color
+    if not _color_re.fullmatch(value):
+        raise ValueError("expected a #RRGGBB color")
+    return value
+
+def coerce_room_state(raw: dict, where: str = "") -> Tuple[dict, list]:
+    """Typed copy of raw: schema fields are parsed (bad ones dropped and reported), others pass through."""
+    state, errors = {}, []
+    for key, value in raw.items():
+        if key not in ROOM_SCHEMA:
+            state[key] = value
+            continue
+        try:
+            state[key] = parse_room_value(key, value)
+        except ValueError as e:
+            errors.append(f"{where}{key} = {value!r}: {e}")
+    return state, errors
+
+# ---------- Config (config.ini) ----------
+def room_state_from_config(config: configparser.ConfigParser, sect: str, errors: Optional[list] = None) -> dict:
+    """One [roomN] section -> a complete typed room state; invalid or unknown keys go to errors."""
+    state = dict(ROOM_DEFAULTS)
+    problems = []
+    for key, raw in config.items(sect, raw=True):
+        if key not in ROOM_SCHEMA:
+            if key not in ROOM_RETIRED_KEYS:
+                problems.append(f"[{sect}] {key}: unknown setting")
+            continue
+        try:
+            if "%" in raw:  # only these need the (slow, per-key) interpolating get
+                raw = config.get(sect, key)
+            state[key] = parse_room_value(key, raw)
+        except configparser.Error as e:
+            problems.append(f"[{sect}] {key}: {e.message.splitlines()[0]}")
+        except ValueError as e:
+            problems.append(f"[{sect}] {key} = {raw!r}: {e} (using {ROOM_DEFAULTS[key]!r})")
+    if errors is not None:
+        errors.extend(problems)
+    return state
+
+def default_config_path() -> Path:
+    return Path(getattr(sys, "_MEIPASS", Path(__file__).parent)).resolve() / "config.ini"
+
+def load_room_states(config_path: Path, errors: Optional[list] = None) -> Tuple[str, dict]:
+    """(output_dir, {room number: state}) for every [roomN] section of config_path."""
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding="utf-8")
+    states = {}
+    for sect in config.sections():
+        m = re.fullmatch(r"room(\d+)", sect)
+        if m:
+            states[int(m.group(1))] = room_state_from_config(config, sect, errors)
+    return config.get("general", "output_dir", fallback=""), states
+
+# ---------- SQLite state + party history ----------
+def default_store_path() -> Path:
+    return default_config_path().parent / STORE_FILENAME
+
+# ---------- Bulk booking import ----------
+# Booking-export column (lower-cased) -> RoomFrame state key; other columns named like state keys pass through
+BOOKING_COLUMNS = {
+    "room": "room", "party room": "room", "room number": "room",
+    "name": "inner", "guest": "inner", "guest name": "inner", "birthday child": "inner",
+    "theme": "color", "theme color": "color", "theme_color": "color",
+    "video": "video_override",
+    "timer": "stop_minutes", "stop": "stop_minutes", "minutes": "stop_minutes",
+    "start": "start_at", "time": "start_at", "start time": "start_at",
+}
+
+def iter_json_array(f, chunk_size: int = 64 * 1024) -> Iterator[dict]:
+    """Yield the objects of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, started = "", 0, False
+    while True:
+        chunk = f.read(chunk_size)
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in ",]" or (buf[pos] == "[" and not started)):
+                started = started or buf[pos] == "["
+                pos += 1
+            if pos >= len(buf):
+                break
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # object continues in the next chunk
+            yield obj
+            pos = end
+        if not chunk:
+            return
+
+def iter_booking_rows(path: Path) -> Iterator[dict]:
+    """Stream rows from a .csv, JSON array or JSON Lines booking export."""
+    path = Path(path)
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            yield from csv.DictReader(f)
+            return
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        if head == "[":
+            f.seek(0)
+            yield from iter_json_array(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def booking_state(row: dict, base_states: dict) -> Tuple[int, dict]:
+    """Map one booking row onto (room, state), starting from that room's configured state."""
+    mapped = {}
+    for col, value in row.items():
+        if col is None:
+            continue
+        key = col.strip().lower()
+        key = BOOKING_COLUMNS.get(key, key.replace(" ", "_"))
+        mapped[key] = "" if value is None else str(value).strip()
+    room = int(re.sub(r"\D", "", mapped.pop("room", "")) or 0)
+    if room < 1:
+        raise ValueError("missing room number")
+    state = dict(base_states.get(room) or base_states.get(min(base_states), {}) if base_states else ROOM_DEFAULTS)
+    state["enabled"] = True
+    video = mapped.pop("video_override", None)
+    if video is not None:
+        # VIDEO_OPTIONS number or label, otherwise a file path / URL
+        idx = [i for i, (fn, label) in VIDEO_OPTIONS.items() if video.lower() in (str(i), fn.lower(), label.lower())]
+        if idx:
+            state["video"], state["video_override"] = idx[0], ""
+        else:
+            state["video_override"] = video
+    # other columns (booking id, email, phone, ...) are dropped: they would make every row its own style;
+    # blank cells leave typed fields (theme, timer, ...) at the room's configured value
+    mapped = {k: v for k, v in mapped.items() if k in ROOM_SCHEMA and (v or ROOM_SCHEMA[k].kind == "text")}
+    typed, errors = coerce_room_state(mapped)
+    if errors:
+        raise ValueError("; ".join(errors))
+    state.update(typed)
+    return room, state
+
+class BatchReport:
+    def __init__(self):
+        self.rows = 0
+        self.pages: list = []      # (room, start epoch or None, path, page_ref, version, state)
+        self.errors: list = []
+        self.seconds = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return len(self.pages) / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        text = (f"{len(self.pages)} pages from {self.rows} rows in {self.seconds:.2f}s "
+                f"({self.pages_per_sec:.1f} pages/s)")
+        if self.errors:
+            text += "\n" + "\n".join(self.errors)
+        return text
+
+def import_bookings(path: Path, out_dir: Path, base_states: dict,
+                    shells: Optional[ShellCache] = None) -> BatchReport:
+    """
+    One streaming pass over a booking export: every row becomes partyroom<room>-<HHMM>.html
+    (or -<n> without a start time) in out_dir. Rows sharing a style reuse the same compiled
+    shell, data: URIs and font subsets.
+    """
+    report = BatchReport()
+    shells = shells or ROOM_SHELLS
+    out_dir.mkdir(parents=True, exist_ok=True)
+    used: set = set()
+    t0 = time.perf_counter()
+    for n, row in enumerate(iter_booking_rows(path), start=1):
+        report.rows += 1
+        try:
+            room, state = booking_state(row, base_states)
+            start = parse_start_time(state["start_at"], allow_past=True) if state.get("start_at") else None
+            stem = f"partyroom{room}-" + (datetime.fromtimestamp(start).strftime("%H%M") if start else str(n))
+            while stem in used:
+                stem += "b"
+            used.add(stem)
+            html, page_ref, version = render_room_page(state, out_dir, f"partyroom{room}.html", room, shells)
+            page = out_dir / f"{stem}.html"
+            page.write_text(html, encoding="utf-8")
+            report.pages.append((room, start, page, page_ref, version, state))
+        except Exception as e:
+            report.errors.append(f"row {n}: {e}")
+    report.seconds = time.perf_counter() - t0
+    return report
+
+# ---------- Build daemon (one warm builder shared by several front-desk PCs) ----------
+def build_room_page_via(address: Optional[Tuple[str, int]], state: dict, out_dir: Path,
+                        filename: str, room_number: int) -> Optional[Path]:
+    """build_room_page on the build daemon when one serves out_dir, locally otherwise."""
+    response = daemon_build(address, state, out_dir, filename, room_number) if address else None
+    if response is None:
+        return build_room_page(state, out_dir, filename, room_number)
+    return Path(response["path"]) if response["path"] else None
+
+def build_party(state: dict, out_dir: Path, filename: str, room_number: int,
+                daemon: Optional[Tuple[str, int]] = None, store: Optional["PartyStore"] = None) -> Tuple[Optional[Path], float]:
+    """One room of 'Create Selected Rooms': build (on the daemon when running), log it; (path, ms)."""
+    t0 = time.perf_counter()
+    file_path = build_room_page_via(daemon, state, out_dir, filename, room_number)
+    ms = (time.perf_counter() - t0) * 1000
+    if file_path and store is not None:
+        store.record_build(room_number, state, file_path, ms)
+    return file_path, ms
+
+# ---------- Playback telemetry collector (python App3.py collect) ----------
+TELEMETRY_MAX_BODY = 256 * 1024
+
+class _TelemetryHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if self.path.split("?")[0] != "/t" or not 0 < length <= TELEMETRY_MAX_BODY:
+            self.send_error(400)
+            return
+        try:
+            added = self.server.store.record_telemetry(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(400, str(e))
+            return
+        with self.server.lock:  # one handler thread per request
+            self.server.received += added
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/report":
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.store.telemetry_report(time.time() - 86400)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # a line per batch from every room is just noise
+
+class TelemetryCollector(http.server.ThreadingHTTPServer):
+    """Receives the pages' telemetry batches (POST /t) into the store; GET /report = last 24 h."""
+    daemon_threads = True
+
+    def __init__(self, store: "PartyStore", address: Tuple[str, int]):
+        super().__init__(address, _TelemetryHandler)
+        self.store = store
+        self.received = 0
+        self.lock = threading.Lock()
+
+def telemetry_rows_by_combo(rows: list) -> dict:
+    """telemetry_report rows -> {(room, combo, display): {metric: row}}."""
+    grouped: dict = {}
+    for r in rows:
+        grouped.setdefault((r["room"], r["combo"], r["display"]), {})[r["metric"]] = r
+    return grouped
+
+def telemetry_line(metrics: dict) -> str:
+    def mean(m):
+        return f"{metrics[m]['mean'] / 1000:.2f}s" if m in metrics else "-"
+    decoded = metrics.get("decoded_frames", {}).get("total") or 0
+    dropped = metrics.get("dropped_frames", {}).get("total") or 0
+    drop = f"{dropped / decoded * 100:.1f}% of {decoded:.0f}" if decoded else "-"
+    errors = metrics.get("asset_error", {}).get("n", 0)
+    return (f"first frame {mean('ttff_ms')}  canplaythrough {mean('canplaythrough_ms')}  "
+            f"fonts {mean('font_load_ms')}  dropped {drop}" + (f"  asset errors {errors}" if errors else ""))
+
+# ---------- Single-file room export (zip bundle for machines we can't sync to) ----------
+def export_room(state: dict, out_dir: Path, room_number: int, dest: Path, include_video: bool = True) -> dict:
+    """
+    One self-contained zip for a room: the page (guest name baked in, logo/background as files),
+    every local asset it references, a manifest.json and optionally the video. Sources are streamed
+    straight into the archive; media is stored, text deflated. Returns the manifest; a video that isn't
+    in the archive is listed under not_included with the reason.
+    """
+    t0 = time.perf_counter()
+    filename = f"partyroom{room_number}.html"
+    export_state = {**state, "enabled": True, "url_params": False, "inline_assets": False}
+    html, _, version = render_room_page(export_state, out_dir, filename, room_number)
+    html, files = export_bundle_files(html, out_dir)
+    title, inner = page_text(export_state)
+    manifest = {"room": room_number, "page": filename, "title": title, "guest": inner, "version": version,
+                "exported": datetime.now().isoformat(timespec="seconds"), "files": [], "not_included": []}
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(filename, html)
+            for arcname, src in sorted(files.items()):
+                if not include_video and src.suffix.lower() in EXPORT_VIDEO_EXTS:
+                    manifest["not_included"].append({"path": arcname, "reason": "video left out"})  # copy it by hand
+                    continue
+                manifest["files"].append(zip_stream(zf, src, arcname))
+            bundled = {media_publish_name(src) for src in files.values()}
+            playing = (state.get("video_override") or "").strip() \
+                or VIDEO_OPTIONS.get(state_int(state.get("video", 1), 1), ("movie.mp4", ""))[0]
+            for video in (playing, (state.get("next_video") or "").strip()):
+                if video and not looks_like_url(video) and Path(video).name not in bundled:
+                    path = Path(video) if Path(video).is_absolute() else out_dir / video
+                    reason = "video not found" if not path.is_file() else "video not referenced by the page"
+                    manifest["not_included"].append({"path": str(path), "reason": reason})
+            zf.writestr("manifest.json", json.dumps(manifest, indent=1, ensure_ascii=False))
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    manifest["archive"] = str(dest)
+    manifest["seconds"] = round(time.perf_counter() - t0, 3)
+    return manifest
+
+# ---------- Watch mode: debounced rebuilds when inputs change ----------
+WATCH_DEBOUNCE_SECONDS = 0.75   # wait for a burst of changes (copying a video, saving config) to settle
+WATCH_POLL_SECONDS = 1.0        # stat-polling interval (no inotify, or files under missing folders)
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x002, 0x004, 0x008
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x040, 0x080, 0x100, 0x200
+IN_Q_OVERFLOW, IN_NONBLOCK, IN_CLOEXEC = 0x4000, 0o4000, 0o2000000
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+def watch_path(path_str: str, out_dir: Path) -> str:
+    p = Path(path_str)
+    return os.path.abspath(p if p.is_absolute() else out_dir / p)
+
+def file_stamp(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _load_inotify():
+    """libc's inotify functions via ctypes, or None (not Linux / no libc)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher:
+    """Debounced change notifications for a set of files.
+
+    Uses inotify on the files' folders where available and stat polling otherwise (and for files
+    whose folder doesn't exist yet, or with poll_only=True for network shares, where inotify
+    doesn't see other machines' writes). Each settled burst is put on `changes` as a frozenset.
+    """
+    def __init__(self, debounce: float = WATCH_DEBOUNCE_SECONDS, poll: float = WATCH_POLL_SECONDS,
+                 poll_only: bool = False):
+        self.debounce = debounce
+        self.poll = poll
+        self.changes: "queue.Queue[frozenset]" = queue.Queue()
+        self._paths: frozenset = frozenset()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._libc = None if poll_only else _load_inotify()
+        self._fd = -1
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                self._libc = None
+        self._wds: dict = {}        # folder -> watch descriptor
+        self._wd_dirs: dict = {}    # watch descriptor -> folder
+        self._polled: dict = {}     # path -> last stamp, for paths inotify isn't covering
+        self._applied: frozenset = frozenset()
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._libc is not None else "polling"
+
+    def watch(self, paths):
+        """Replace the watched set (absolute path strings); cheap when nothing changed."""
+        with self._lock:
+            self._paths = frozenset(paths)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _apply(self, paths: frozenset):
+        """Add/remove folder watches for a new path set; everything not covered gets polled."""
+        folders = {os.path.dirname(p) for p in paths}
+        if self._libc is not None:
+            for folder in set(self._wds) - folders:
+                self._libc.inotify_rm_watch(self._fd, self._wds.pop(folder))
+            for folder in folders - set(self._wds):
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), INOTIFY_MASK)
+                if wd >= 0:
+                    self._wds[folder] = wd
+            self._wd_dirs = {wd: folder for folder, wd in self._wds.items()}
+        polled = {p for p in paths if os.path.dirname(p) not in self._wds}
+        self._polled = {p: self._polled.get(p, file_stamp(p)) for p in polled}
+        self._applied = paths
+
+    def _read_events(self, timeout: float) -> set:
+        changed = set()
+        if self._libc is None:
+            self._stop.wait(timeout)
+            return changed
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos + 16 <= len(buf):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", buf, pos)
+            name = buf[pos + 16:pos + 16 + length].rstrip(b"\0")
+            pos += 16 + length
+            if mask & IN_Q_OVERFLOW:
+                changed |= self._applied   # lost events: treat everything as changed
+            elif wd in self._wd_dirs and name:
+                changed.add(os.path.join(self._wd_dirs[wd], os.fsdecode(name)))
+        return changed
+
+    def _run(self):
+        pending: set = set()
+        last_event = 0.0
+        next_poll = 0.0
+        while not self._stop.is_set():
+            with self._lock:
+                paths = self._paths
+            if paths != self._applied:
+                self._apply(paths)
+            timeout = self.poll if self._polled or self._libc is None else 1.0
+            if pending:
+                timeout = min(timeout, max(0.0, last_event + self.debounce - time.monotonic()))
+            hits = self._read_events(timeout) & paths
+            now = time.monotonic()
+            if self._polled and now >= next_poll:
+                next_poll = now + self.poll
+                for p, old in list(self._polled.items()):
+                    new = file_stamp(p)
+                    if new != old:
+                        self._polled[p] = new
+                        hits.add(p)
+            if hits:
+                pending |= hits
+                last_event = now
+            elif pending and now - last_event >= self.debounce:
+                self.changes.put(frozenset(pending))
+                pending = set()
+
+def room_watch_paths(states: dict, out_dir: Path) -> dict:
+    """{room number: set of absolute input paths} for the enabled rooms."""
+    return {n: {watch_path(f, out_dir) for f in room_input_files(st, out_dir)}
+            for n, st in states.items() if state_bool(st.get("enabled", True))}
+
+def rooms_to_rebuild(changed: frozenset, room_paths: dict) -> list:
+    return sorted(n for n, paths in room_paths.items() if paths & changed)
+
+# ---------- Micro-benchmarks (python App3.py bench) ----------
+BENCH_BASELINE_FILENAME = "bench-baseline.json"
+BENCH_ASSET_SIZES = (10 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024)
+BENCH_ROOM_COUNTS = (1, 3, 10, 50)
+BENCH_EFFECTS = ("headline_outline", "neon_glow", "readable_shadow", "pill_panel", "overlay", "dim_video", "idle_unload_bg")
+BENCH_MIN_RUNS = 20              # time every case at least this many times...
+BENCH_MIN_SECONDS = 1.0          # ...and keep repeating fast cases at least this long...
+BENCH_MAX_RUNS = 500             # ...up to this many runs
+BENCH_TIME_TOLERANCE = 0.25      # a case regresses when its median is >25% slower than the baseline's
+BENCH_TIME_FLOOR_MS = 0.05       # and slower by more than this (timer noise on tiny cases)
+BENCH_MEMORY_TOLERANCE = 0.10    # or when its peak traced memory grows by >10%
+BENCH_MEMORY_FLOOR_KB = 64
+
+def bench_size_label(n: int) -> str:
+    return f"{n // (1024 * 1024)}MB" if n >= 1024 * 1024 else f"{n // 1024}KB"
+
+def bench_style(size: str, effects=()) -> dict:
+    opts = {k: False for k in BENCH_EFFECTS}
+    opts.update({k: True for k in effects})
+    opts.update(headline_size=size, title_color="#FFFFFF", inner_color="#FFD700",
+                inner_pos="Center", inner_offset_x=0, inner_offset_y=0)
+    return opts
+
+def bench_asset(work: Path, n: int) -> Path:
+    """An n-byte random .png under work, written the first time a selected case asks for it."""
+    asset = work / f"asset-{bench_size_label(n)}.png"
+    if not asset.exists():
+        with asset.open("wb") as f:
+            for _ in range(0, n, 1024 * 1024):
+                f.write(os.urandom(min(1024 * 1024, n - f.tell())))
+    return asset
+
+def bench_cases(work: Path, max_bytes: int, font_path: str = "") -> Iterator[tuple]:
+    """(name, setup, fn) per case; setup runs untimed before the warm-up and every timed call,
+    so assets are only generated for the cases --filter selects."""
+    nothing = lambda: None
+    toggles = [("none", ())] + [(e, (e,)) for e in BENCH_EFFECTS] + [("all", BENCH_EFFECTS)]
+    for size in HEADLINE_SIZES:
+        for label, effects in toggles:
+            opts = bench_style(size, effects)
+            yield f"css/{size}/{label}", nothing, lambda o=opts: make_inline_css(o, None, None)
+        for label, effects in (toggles[0], toggles[-1]):
+            opts = bench_style(size, effects)
+            yield (f"html/{size}/{label}", nothing,
+                   lambda o=opts: build_html("Happy Birthday", "Ava", "Style.css", None, "movie.mp4",
+                                             "lte.gif", o, "", None, None, 1, stop_minutes=60))
+    for n in BENCH_ASSET_SIZES:
+        if n > max_bytes:
+            continue
+        asset = work / f"asset-{bench_size_label(n)}.png"
+        def encode_cold(n=n):
+            bench_asset(work, n)
+            _data_uris.clear()
+        yield f"data-uri/{bench_size_label(n)}/cold", encode_cold, lambda a=str(asset): path_to_data_uri(a, work)
+        # Warm: a style change rebuilds the page around the already-encoded background
+        state = dict(ROOM_DEFAULTS, inner="Ava", bg=str(asset), logo_path="", budget_warn_kb=0, budget_block_kb=0)
+        shells = ShellCache()
+        def rebuild_warm(n=n, shells=shells):
+            bench_asset(work, n)
+            shells.shells.clear()
+        yield (f"data-uri/{bench_size_label(n)}/warm-rebuild", rebuild_warm,
+               lambda st=state, shells=shells: build_room_page(st, work / "out", "partyroom1.html", 1, shells))
+    for choice in FANCY_FONTS:
+        yield f"font/{choice}", nothing, lambda c=choice: resolve_inner_font(c, "", None)
+    if font_path:
+        subsets = work / FONT_STORE_DIRNAME / FONT_SUBSET_DIRNAME
+        yield ("font/local-subset/cold", lambda: shutil.rmtree(subsets, ignore_errors=True),
+               lambda: resolve_inner_font("Same as Title", font_path, None, "AVA", work))
+        yield "font/local-subset/warm", nothing, lambda: resolve_inner_font("Same as Title", font_path, None, "AVA", work)
+    logo_bytes = min(1024 * 1024, max_bytes)
+    logo = work / f"asset-{bench_size_label(logo_bytes)}.png"
+    out = work / "out"
+    for rooms in BENCH_ROOM_COUNTS:
+        states = [dict(ROOM_DEFAULTS, inner=f"Guest {i}", color=COLORS[i % len(COLORS)],
+                       logo_path=str(logo), bg=str(logo)) for i in range(rooms)]
+        shells = ShellCache(max(SHELL_CACHE_SIZE, rooms))
+        def build_all(states=states, shells=shells):
+            for i, st in enumerate(states, start=1):
+                build_room_page(st, out, f"partyroom{i}.html", i, shells)
+        def cold(shells=shells):
+            bench_asset(work, logo_bytes)
+            shells.shells.clear()
+            _data_uris.clear()
+        yield f"rooms/{rooms}/cold", cold, build_all
+        yield f"rooms/{rooms}/warm", lambda: bench_asset(work, logo_bytes), build_all
+
+def bench_run(setup, fn) -> dict:
+    """Median and interquartile range of the wall time over repeated runs, then peak traced memory of one more run."""
+    times = []
+    start = time.perf_counter()
+    setup()
+    fn()  # warm-up (imports, first-touch caches for the warm cases)
+    while len(times) < BENCH_MIN_RUNS or (time.perf_counter() - start < BENCH_MIN_SECONDS
+                                          and len(times) < BENCH_MAX_RUNS):
+        setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    setup()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    q1, median, q3 = statistics.quantiles(times, n=4)
+    return {"ms": round(median, 4), "iqr_ms": round(q3 - q1, 4), "best_ms": round(min(times), 4),
+            "peak_kb": round(peak / 1024, 1), "runs": len(times)}
+
+def bench_compare(results: dict, baseline: dict, time_tol: float, mem_tol: float) -> list:
+    """Regression messages for cases slower / hungrier than baseline beyond the tolerances.
+
+    Time compares medians, and only flags a slowdown that is also larger than the spread of both runs
+    (the sum of their interquartile ranges), so a noisy case doesn't fail on an unchanged build.
+    """
+    problems = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        spread = r.get("iqr_ms", 0) + b.get("iqr_ms", 0)  # baselines saved before the IQR was recorded: 0
+        slower = r["ms"] - b["ms"]
+        if r["ms"] > b["ms"] * (1 + time_tol) and slower > max(spread, BENCH_TIME_FLOOR_MS):
+            problems.append(f"{name}: median {b['ms']:.3f} -> {r['ms']:.3f} ms "
+                            f"(+{(r['ms'] / b['ms'] - 1) * 100:.0f}%, spread {spread:.3f} ms)")
+        if r["peak_kb"] > b["peak_kb"] * (1 + mem_tol) and r["peak_kb"] - b["peak_kb"] > BENCH_MEMORY_FLOOR_KB:
+            problems.append(f"{name}: peak {b['peak_kb']:.0f} -> {r['peak_kb']:.0f} KB")
+    return problems
+
+# ---------- Venue-day simulation (python App3.py simulate) ----------
+SIM_GUEST_NAMES = ("Ava", "Liam", "Olivia", "Noah", "Emma", "Mateo", "Sophia", "Lucas", "Isabella", "Elijah",
+                   "Mia", "Kai", "Charlotte", "Jayden", "Amelia", "Aaliyah", "Zoë", "José", "Anneliese", "Maximilian")
+SIM_ASSET_VARIANTS = 4   # distinct logos / backgrounds a site rotates through
 
-    if opts.get("overlay"):
-        parts.append("""
-.overlay {
-  position: fixed; inset: 0; pointer-events: none; z-index: 1;
-  background:
-    linear-gradient(to bottom, rgba(0,0,0,.55), rgba(0,0,0,0) 40%),
-    linear-gradient(to top,    rgba(0,0,0,.45), rgba(0,0,0,0) 45%);
-}
-body > * { position: relative; z-index: 2; }
-""")
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values (0 for none)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered)))) - 1]
 
-    if opts.get("dim_video"):
-        parts.append("""
-#myVideo { filter: brightness(.85) contrast(1.05) saturate(1.05); }
-""")
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far (None where it can't be read)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        class _Counters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong)] + [
+                (n, ctypes.c_size_t) for n in ("PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                                               "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                                               "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        counters = _Counters(cb=ctypes.sizeof(_Counters))
+        proc = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(proc, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
 
-    return "<style>\n" + "\n".join(parts) + "\n</style>"
+def sim_party_state(rng: random.Random, assets: list) -> dict:
+    """A random but plausible party: name, theme, font, video, timer, effects, logo/background."""
+    state = dict(ROOM_DEFAULTS)
+    state.update({k: rng.random() < 0.3 for k in BENCH_EFFECTS})
+    state.update(
+        inner=rng.choice(SIM_GUEST_NAMES) + ("'s 10th" if rng.random() < 0.2 else ""),
+        color=rng.choice(COLORS),
+        video=rng.choice(list(VIDEO_OPTIONS)),
+        inner_font_choice=rng.choice(list(FANCY_FONTS)),
+        headline_size=rng.choice(list(HEADLINE_SIZES)),
+        inner_pos=rng.choice(INNER_POS_PRESETS),
+        stop_minutes=rng.choice((0, 60, 90, 120)),
+        url_params=rng.random() < 0.25,
+    )
+    if assets:
+        state["logo_path"] = rng.choice(assets)
+        state["bg"] = rng.choice(assets) if rng.random() < 0.5 else ""
+    return state
 
-def build_html(title_text: str, inner_text: str, css_file: str,
-               bg_src: Optional[str], video_file: str,
-               logo_src: str,
-               style_opts: dict, font_head_extra: str,
-               inner_font_family: Optional[str],
-               local_face_css: Optional[str],
-               room_number: int,
-               stop_minutes: int = 0) -> str:
-    overlay_div = "<div class='overlay'></div>\n" if style_opts.get("overlay") else ""
-    bg_tag = f"  <img src='{bg_src}' alt='background'>\n" if bg_src else ""
-    inline_css = make_inline_css(style_opts, inner_font_family, local_face_css)
-    logo_img = logo_src or "lte.gif"
+def simulate_day(out_dir: Path, rooms: int, parties: int, seed: int = 0, asset_kb: int = 512,
+                 workers: int = 1, daemon: Optional[Tuple[str, int]] = None) -> dict:
+    """Every room runs `parties` parties in turn; each slot's rooms are built `workers` at a time.
 
-    # Inline JS for auto-stop: pause + reset video, show logo overlay
-    stop_ms = max(0, int(stop_minutes)) * 60 * 1000
-    timer_script = f"""
-<script>
-(function() {{
-  var stopMs = {stop_ms};
-  if (stopMs > 0) {{
-    setTimeout(function() {{
-      try {{
-        var v = document.getElementById('myVideo');
-        if (v) {{
-          v.pause();
-          v.currentTime = 0;
-          v.muted = true;
-        }}
-      }} catch(e) {{}}
-      var ov = document.getElementById('endOverlay');
-      if (ov) {{
-        ov.style.display = 'flex';
-      }}
-    }}, stopMs);
-  }}
-}})();
-</script>
-""".strip()
+    Builds go through build_party (what Create Selected Rooms does per room) plus the per-room
+    state save, into a history store in out_dir.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    assets = []
+    for i in range(SIM_ASSET_VARIANTS if asset_kb else 0):
+        asset = out_dir / f"sim-asset-{i}.png"
+        asset.write_bytes(rng.randbytes(asset_kb * 1024))
+        assets.append(asset.name)
+    store = PartyStore(out_dir / STORE_FILENAME)
+    latencies, written, failures = [], 0, []
+    lock = threading.Lock()
+    fallbacks_before = daemon_fallbacks()
 
-    return f"""<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>{title_text}</title>
-  <link rel='stylesheet' href='{css_file}'>
-  {font_head_extra}
-  {inline_css}
-</head>
-<body>
-{overlay_div}{bg_tag}  <h1>{title_text}</h1>
-  <video autoplay muted loop id='myVideo'>
-    <source src="{video_file}" type='video/mp4'>Video not found
-  </video>
-  <div class='innertext'>{inner_text}</div>
-  <img class='brand-logo' src="{logo_img}" alt="LTE logo"
-       onerror="console.warn('Bottom logo failed to load:', this.src)" />
-  <div id="endOverlay">
-    <div class="end-wrap">
-      <img class="end-brand" src="{logo_img}" alt="LTE logo"
-           onerror="console.warn('End logo failed to load:', this.src)" />
-      <div class="end-room-text">Party Room {room_number}</div>
-    </div>
-  </div>
-{timer_script}
-</body>
-</html>"""
+    def room_files(room: int) -> dict:
+        """What a build of this room writes: page, kiosk shell + beacon, trace -> (mtime_ns, size)."""
+        stats = {}
+        for path in (out_dir / f"partyroom{room}.html", out_dir / shell_filename(room),
+                     out_dir / beacon_filename(room), trace_path(out_dir, room)):
+            try:
+                st = path.stat()
+                stats[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        return stats
+
+    def one(room: int, state: dict):
+        nonlocal written
+        try:
+            before = room_files(room)
+            path, ms = build_party(state, out_dir, f"partyroom{room}.html", room, daemon, store)
+            store.save_room(room, state)
+            size = sum(stat[1] for p, stat in room_files(room).items() if before.get(p) != stat)
+        except Exception as e:
+            with lock:
+                failures.append(f"room {room}: {e}")
+            return
+        with lock:
+            latencies.append(ms)
+            written += size
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for _ in range(parties):
+            slot = [(room, sim_party_state(rng, assets)) for room in range(1, rooms + 1)]
+            list(pool.map(lambda job: one(*job), slot))
+    seconds = time.perf_counter() - t0
+    store.close()
+    fallbacks = {reason: n - fallbacks_before.get(reason, 0) for reason, n in daemon_fallbacks().items()
+                 if n > fallbacks_before.get(reason, 0)}
+    return {
+        "rooms": rooms, "parties_per_room": parties, "workers": workers, "asset_kb": asset_kb,
+        "builds": len(latencies), "failures": failures, "seconds": round(seconds, 3),
+        "builds_per_second": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2), "max_ms": round(max(latencies, default=0), 2),
+        "bytes_written": written, "peak_rss_bytes": peak_rss_bytes(),
+        "daemon": f"{daemon[0]}:{daemon[1]}" if daemon else None,
+        "daemon_fallbacks": fallbacks,   # reason -> builds that ran locally instead of on the daemon
+    }
 
 # -----------------------------
 # RoomFrame: one room's controls
@@ -451,6 +2949,7 @@ class RoomFrame(ttk.LabelFrame):
         self.pill_panel = BooleanVar(value=False)
         self.overlay = BooleanVar(value=True)
         self.dim_video = BooleanVar(value=False)
+        self.idle_unload_bg = BooleanVar(value=False)
 
         style_frame = ttk.Frame(self.adv_frame); style_frame.grid(row=r, column=1, columnspan=11, sticky="w")
         ttk.Checkbutton(style_frame, text="Headline Outline", variable=self.headline_outline).pack(side="left", padx=6)
@@ -462,6 +2961,7 @@ class RoomFrame(ttk.LabelFrame):
         ttk.Checkbutton(style_frame2, text="Pill Panel (Guest)", variable=self.pill_panel).pack(side="left", padx=6)
         ttk.Checkbutton(style_frame2, text="Top/Bottom Overlay", variable=self.overlay).pack(side="left", padx=6)
         ttk.Checkbutton(style_frame2, text="Dim Video", variable=self.dim_video).pack(side="left", padx=6)
+        ttk.Checkbutton(style_frame2, text="Unload Background When Idle", variable=self.idle_unload_bg).pack(side="left", padx=6)
         r += 1
 
         # Preset buttons
@@ -469,6 +2969,10 @@ class RoomFrame(ttk.LabelFrame):
         ttk.Button(preset_frame, text="Preset: High Contrast", command=self.preset_high_contrast).pack(side="left", padx=4)
         ttk.Button(preset_frame, text="Preset: Neon", command=self.preset_neon).pack(side="left", padx=4)
         ttk.Button(preset_frame, text="Preset: Panel", command=self.preset_panel).pack(side="left", padx=4)
+        ttk.Button(preset_frame, text="Save Preset…", command=self.save_named_preset).pack(side="left", padx=4)
+        ttk.Button(preset_frame, text="Load Preset…", command=self.load_named_preset).pack(side="left", padx=4)
+        ttk.Button(preset_frame, text=f"Export Room {room_index}…",
+                   command=lambda: self.winfo_toplevel().export_room(self.room_index)).pack(side="left", padx=4)
         r += 1
 
         # ---- Font size (title drives both) ----
@@ -527,6 +3031,52 @@ class RoomFrame(ttk.LabelFrame):
         ttk.Label(self.adv_frame, text="Auto-stop (minutes):").grid(row=r, column=0, sticky="e")
         self.stop_minutes = StringVar(value="0")
         ttk.Entry(self.adv_frame, textvariable=self.stop_minutes, width=10).grid(row=r, column=1, sticky="w", padx=5, pady=(2,6))
+        self.url_params = BooleanVar(value=False)
+        ttk.Checkbutton(self.adv_frame, text="Names from URL (reusable page)", variable=self.url_params).grid(row=r, column=2, columnspan=4, sticky="w", padx=8)
+        self.telemetry = BooleanVar(value=False)
+        ttk.Checkbutton(self.adv_frame, text="Playback telemetry", variable=self.telemetry).grid(row=r, column=6, columnspan=4, sticky="w", padx=8)
+        r += 1
+
+        # ---- Scheduled start (Queue Selected Rooms) ----
+        ttk.Label(self.adv_frame, text="Start at (HH:MM):").grid(row=r, column=0, sticky="e")
+        self.start_at = StringVar(value="")
+        ttk.Entry(self.adv_frame, textvariable=self.start_at, width=10).grid(row=r, column=1, sticky="w", padx=5, pady=(2,6))
+        r += 1
+
+        # ---- Next party (warmed during this party's last minutes) ----
+        ttk.Label(self.adv_frame, text="Next video:").grid(row=r, column=0, sticky="e")
+        self.next_video_var = StringVar(value="")
+        ttk.Entry(self.adv_frame, textvariable=self.next_video_var, width=40).grid(row=r, column=1, columnspan=10, sticky="we", padx=5, pady=2)
+        ttk.Button(self.adv_frame, text="Browse…", command=lambda: self._browse_into(self.next_video_var, "Choose next video", [("MP4 Video", "*.mp4"), ("All files", "*.*")])).grid(row=r, column=11, sticky="w")
+        r += 1
+
+        ttk.Label(self.adv_frame, text="Next background:").grid(row=r, column=0, sticky="e")
+        self.next_bg_var = StringVar(value="")
+        ttk.Entry(self.adv_frame, textvariable=self.next_bg_var, width=40).grid(row=r, column=1, columnspan=10, sticky="we", padx=5, pady=2)
+        ttk.Button(self.adv_frame, text="Browse…", command=lambda: self._browse_into(self.next_bg_var, "Choose next background image", [("Images", "*.png;*.jpg;*.jpeg;*.gif;*.webp"), ("All files", "*.*")])).grid(row=r, column=11, sticky="w")
+        r += 1
+
+        ttk.Label(self.adv_frame, text="Next logo:").grid(row=r, column=0, sticky="e")
+        self.next_logo_var = StringVar(value="")
+        ttk.Entry(self.adv_frame, textvariable=self.next_logo_var, width=40).grid(row=r, column=1, columnspan=10, sticky="we", padx=5, pady=2)
+        ttk.Button(self.adv_frame, text="Browse…", command=lambda: self._browse_into(self.next_logo_var, "Choose next logo image", [("Images", "*.png;*.jpg;*.jpeg;*.gif;*.webp"), ("All files", "*.*")])).grid(row=r, column=11, sticky="w")
+        r += 1
+
+        ttk.Label(self.adv_frame, text="Next Guest Font:").grid(row=r, column=0, sticky="e")
+        self.next_font_choice = StringVar(value="Same as Title")
+        ttk.Combobox(self.adv_frame, textvariable=self.next_font_choice, values=list(FANCY_FONTS.keys()), state="readonly", width=22).grid(row=r, column=1, sticky="w", padx=5, pady=(0,6))
+        r += 1
+
+        # ---- Page size budget (KB, 0 = off) ----
+        ttk.Label(self.adv_frame, text="Page budget KB (warn/block):").grid(row=r, column=0, sticky="e")
+        self.budget_warn_kb = StringVar(value=str(PAGE_BUDGET_WARN_KB))
+        ttk.Entry(self.adv_frame, textvariable=self.budget_warn_kb, width=8).grid(row=r, column=1, sticky="w", padx=5, pady=2)
+        self.budget_block_kb = StringVar(value=str(PAGE_BUDGET_BLOCK_KB))
+        ttk.Entry(self.adv_frame, textvariable=self.budget_block_kb, width=8).grid(row=r, column=2, sticky="w", padx=5, pady=2)
+        self.inline_assets = BooleanVar(value=True)
+        ttk.Checkbutton(self.adv_frame, text="Inline logo/background", variable=self.inline_assets).grid(row=r, column=6, columnspan=3, sticky="w", padx=8)
+        self.cache_urls = BooleanVar(value=True)
+        ttk.Checkbutton(self.adv_frame, text="Cache URL assets locally", variable=self.cache_urls).grid(row=r, column=9, columnspan=3, sticky="w", padx=8)
         r += 1
 
         # Expand grid weights
@@ -580,6 +3130,22 @@ class RoomFrame(ttk.LabelFrame):
             self.title_color.set("#FFFFFF")
         self._refresh_color_buttons()
 
+    # ---- named presets (style only, kept in the app's store)
+    def save_named_preset(self):
+        name = simpledialog.askstring("Save Preset", "Preset name:", parent=self)
+        if name and name.strip():
+            self.winfo_toplevel().store.save_preset(name.strip(), self.get_state())
+
+    def load_named_preset(self):
+        names = self.winfo_toplevel().store.preset_names()
+        if not names:
+            messagebox.showinfo("Load Preset", "No saved presets yet.")
+            return
+        name = simpledialog.askstring("Load Preset", "Preset name:\n" + "\n".join(names), parent=self)
+        state = self.winfo_toplevel().store.load_preset(name.strip()) if name else None
+        if state:
+            self.set_state(state)
+
     # ---- file pickers
     def browse_bg(self):
         path = filedialog.askopenfilename(
@@ -605,6 +3171,11 @@ class RoomFrame(ttk.LabelFrame):
         if path:
             self.logo_path_var.set(path)
 
+    def _browse_into(self, var: StringVar, title: str, filetypes: list):
+        path = filedialog.askopenfilename(title=title, filetypes=filetypes)
+        if path:
+            var.set(path)
+
     def browse_local_font(self):
         path = filedialog.askopenfilename(
             title="Choose font file (.ttf/.otf/.woff/.woff2)",
@@ -649,202 +3220,79 @@ class RoomFrame(ttk.LabelFrame):
         self._apply_btn_color(self.title_color_btn, self.title_color.get())
 
     # ---- state IO
-    def get_state(self):
+    def get_state(self) -> dict:
         return {
-            "enabled": str(self.enabled.get()),
+            "enabled": self.enabled.get(),
             "title": self.title_entry.get(),
             "inner": self.inner_entry.get(),
             "color": self.color.get(),
-            "video": str(self.video_sel.get()),  # legacy
+            "video": self.video_sel.get(),  # legacy
             "bg": self.bg_var.get(),
             "video_override": self.video_override_var.get(),
             "logo_path": self.logo_path_var.get(),
-            "headline_outline": str(self.headline_outline.get()),
-            "neon_glow": str(self.neon_glow.get()),
-            "readable_shadow": str(self.readable_shadow.get()),
-            "pill_panel": str(self.pill_panel.get()),
-            "overlay": str(self.overlay.get()),
-            "dim_video": str(self.dim_video.get()),
-            "headline_size": self.headline_size.get(),
-            "inner_font_choice": self.inner_font_choice.get(),
-            "inner_font_local": self.inner_font_local.get(),
-            "title_color": self.title_color.get(),
-            "inner_color": self.inner_color.get(),
-            "link_colors": str(self.link_colors.get()),
-            "inner_pos": self.inner_pos.get(),
-            "inner_offset_x": self.inner_off_x.get(),
-            "inner_offset_y": self.inner_off_y.get(),
-            "stop_minutes": self.stop_minutes.get(),
-        }
-
-    def set_state(self, state: dict):
-        try:
-            if "enabled" in state: self.enabled.set(str(state["enabled"]).lower() == "true")
-            if "title" in state:
-                self.title_entry.delete(0, END); self.title_entry.insert(0, state["title"])
-            if "inner" in state:
-                self.inner_entry.delete(0, END); self.inner_entry.insert(0, state["inner"])
-            if "color" in state and state["color"] in COLORS:
-                self.color.set(state["color"])
-
-            if "video" in state:
-                try:
-                    v = int(state["video"])
-                    if v in VIDEO_OPTIONS: self.video_sel.set(v)
-                except Exception:
-                    pass
-
-            if "bg" in state: self.bg_var.set(state["bg"])
-            if "video_override" in state: self.video_override_var.set(state["video_override"])
-            if "logo_path" in state and state["logo_path"]:
-                self.logo_path_var.set(state["logo_path"])
-
-            for k in ("headline_outline","neon_glow","readable_shadow","pill_panel","overlay","dim_video"):
-                if k in state: getattr(self, k).set(str(state[k]).lower()=="true")
-
-            if "headline_size" in state and state["headline_size"] in HEADLINE_SIZES:
-                self.headline_size.set(state["headline_size"])
-            if "inner_font_choice" in state and state["inner_font_choice"] in FANCY_FONTS:
-                self.inner_font_choice.set(state["inner_font_choice"])
-            if "inner_font_local" in state:
-                self.inner_font_local.set(state["inner_font_local"])
-            if "title_color" in state and state["title_color"]:
-                self.title_color.set(state["title_color"])
-            if "inner_color" in state and state["inner_color"]:
-                self.inner_color.set(state["inner_color"])
-            if "link_colors" in state:
-                self.link_colors.set(str(state["link_colors"]).lower()=="true")
-            if "inner_pos" in state and state["inner_pos"] in INNER_POS_PRESETS:
-                self.inner_pos.set(state["inner_pos"])
-            if "inner_offset_x" in state:
-                self.inner_off_x.set(state["inner_offset_x"])
-            if "inner_offset_y" in state:
-                self.inner_off_y.set(state["inner_offset_y"])
-            if "stop_minutes" in state:
-                self.stop_minutes.set(state["stop_minutes"])
-
-            self._refresh_color_buttons()
-        except Exception:
-            pass  # keep defaults
-
-    def build_and_write(self, out_dir: Path, filename: str, room_number: int) -> Optional[Path]:
-        if not self.enabled.get():
-            return None
-
-        title = (self.title_entry.get() or "Happy Birthday").strip()
-        inner = self.inner_entry.get().strip()
-
-        # Resolve video
-        video_override = self.video_override_var.get().strip()
-        video_file: Optional[str] = None
-        if video_override:
-            if looks_like_url(video_override):
-                video_file = video_override
-            else:
-                vp = Path(video_override)
-                if vp.exists() or (out_dir / video_override).exists():
-                    video_file = video_override
-        if not video_file:
-            video_file = VIDEO_OPTIONS.get(self.video_sel.get(), ("movie.mp4", ""))[0]
-
-        css_file = get_css(self.color.get(), Path(video_file).name if not looks_like_url(video_file) else video_file)
-
-        # Background image (optional)
-        bg_input = self.bg_var.get().strip()
-        bg_src: Optional[str] = None
-        if bg_input:
-            if looks_like_url(bg_input):
-                bg_src = bg_input
-            else:
-                bp = Path(bg_input)
-                if bp.exists() or (out_dir / bg_input).exists():
-                    bg_src = bg_input
-
-        # Logo (optional override)
-        logo_input = (self.logo_path_var.get() or "").strip()
-        logo_src: str = "lte.gif"
-        if logo_input:
-            if looks_like_url(logo_input):
-                logo_src = logo_input
-            else:
-                lp = Path(logo_input)
-                if lp.exists() or (out_dir / logo_input).exists():
-                    logo_src = logo_input
-
-        # Fancy font for inner name
-        font_choice = self.inner_font_choice.get()
-        local_font = self.inner_font_local.get()
-        inner_font_family, google_link_tag, local_face_css = resolve_inner_font(font_choice, local_font)
-        font_head_extra = google_link_tag or ""
-
-        # Style + colors (link enforced)
-        title_color = self.title_color.get()
-        inner_color = self.inner_color.get()
-        if self.link_colors.get():
-            title_color = inner_color
-
-        # parse offsets safely
-        try:
-            offx = int(self.inner_off_x.get())
-        except Exception:
-            offx = 0
-        try:
-            offy = int(self.inner_off_y.get())
-        except Exception:
-            offy = 0
-
-        # parse stop minutes safely
-        try:
-            stop_mins = int(self.stop_minutes.get().strip() or "0")
-            if stop_mins < 0:
-                stop_mins = 0
-        except Exception:
-            stop_mins = 0
-
-        style_opts = {
             "headline_outline": self.headline_outline.get(),
             "neon_glow": self.neon_glow.get(),
             "readable_shadow": self.readable_shadow.get(),
             "pill_panel": self.pill_panel.get(),
             "overlay": self.overlay.get(),
             "dim_video": self.dim_video.get(),
+            "idle_unload_bg": self.idle_unload_bg.get(),
+            "url_params": self.url_params.get(),
+            "telemetry": self.telemetry.get(),
+            "inline_assets": self.inline_assets.get(),
+            "cache_urls": self.cache_urls.get(),
+            "budget_warn_kb": max(0, state_int(self.budget_warn_kb.get(), PAGE_BUDGET_WARN_KB)),
+            "budget_block_kb": max(0, state_int(self.budget_block_kb.get(), PAGE_BUDGET_BLOCK_KB)),
+            "start_at": self.start_at.get(),
             "headline_size": self.headline_size.get(),
-            "title_color": title_color,
-            "inner_color": inner_color,
+            "inner_font_choice": self.inner_font_choice.get(),
+            "inner_font_local": self.inner_font_local.get(),
+            "title_color": self.title_color.get(),
+            "inner_color": self.inner_color.get(),
+            "link_colors": self.link_colors.get(),
             "inner_pos": self.inner_pos.get(),
-            "inner_offset_x": offx,
-            "inner_offset_y": offy,
+            "inner_offset_x": state_int(self.inner_off_x.get()),
+            "inner_offset_y": state_int(self.inner_off_y.get()),
+            "stop_minutes": max(0, state_int(self.stop_minutes.get())),
+            "next_video": self.next_video_var.get(),
+            "next_bg": self.next_bg_var.get(),
+            "next_logo": self.next_logo_var.get(),
+            "next_font_choice": self.next_font_choice.get(),
         }
 
-        # ---- Make assets robust ----
-        # Background: try inline image first (if local), else file:/// fallback; leave URLs as-is
-        if bg_src and not looks_like_url(bg_src):
-            inlined_bg = path_to_data_uri(bg_src, out_dir)
-            if inlined_bg:
-                bg_src = inlined_bg
-            else:
-                bg_src = to_file_uri_if_exists(bg_src, out_dir)
-
-        # Video: cannot inline; just ensure file:/// if local
-        if video_file and not looks_like_url(video_file):
-            video_file = to_file_uri_if_exists(video_file, out_dir)
-
-        # Logo: prefer inline image (guaranteed to show), else file:/// fallback
-        if logo_src and not looks_like_url(logo_src):
-            inlined_logo = path_to_data_uri(logo_src, out_dir)
-            if inlined_logo:
-                logo_src = inlined_logo
-            else:
-                logo_src = to_file_uri_if_exists(logo_src, out_dir)
+    def set_state(self, state: dict) -> list:
+        """Apply a (possibly partial) state. Invalid values keep the current setting and are returned."""
+        state, errors = coerce_room_state(state, f"Room {self.room_index}: ")
+        for key, var in (("enabled", self.enabled), ("color", self.color), ("video", self.video_sel),
+                         ("bg", self.bg_var), ("video_override", self.video_override_var),
+                         ("headline_outline", self.headline_outline), ("neon_glow", self.neon_glow),
+                         ("readable_shadow", self.readable_shadow), ("pill_panel", self.pill_panel),
+                         ("overlay", self.overlay), ("dim_video", self.dim_video),
+                         ("idle_unload_bg", self.idle_unload_bg), ("url_params", self.url_params),
+                         ("telemetry", self.telemetry), ("inline_assets", self.inline_assets), ("cache_urls", self.cache_urls),
+                         ("budget_warn_kb", self.budget_warn_kb), ("budget_block_kb", self.budget_block_kb),
+                         ("headline_size", self.headline_size), ("inner_font_choice", self.inner_font_choice),
+                         ("inner_font_local", self.inner_font_local), ("title_color", self.title_color),
+                         ("inner_color", self.inner_color), ("link_colors", self.link_colors),
+                         ("inner_pos", self.inner_pos), ("inner_offset_x", self.inner_off_x),
+                         ("inner_offset_y", self.inner_off_y), ("stop_minutes", self.stop_minutes),
+                         ("start_at", self.start_at), ("next_video", self.next_video_var),
+                         ("next_bg", self.next_bg_var), ("next_logo", self.next_logo_var),
+                         ("next_font_choice", self.next_font_choice)):
+            if key in state:
+                var.set(state[key])
+        if state.get("logo_path"):
+            self.logo_path_var.set(state["logo_path"])
+        for key, entry in (("title", self.title_entry), ("inner", self.inner_entry)):
+            if key in state:
+                entry.delete(0, END); entry.insert(0, state[key])
+        self._refresh_color_buttons()
+        return errors
 
-        html = build_html(title, inner, css_file, bg_src, video_file,
-                          logo_src, style_opts, font_head_extra, inner_font_family, local_face_css,
-                          room_number=room_number,
-                          stop_minutes=stop_mins)
-        out_dir.mkdir(parents=True, exist_ok=True)
-        file_path = out_dir / filename
-        file_path.write_text(html, encoding="utf-8")
-        return file_path
+    def build_and_write(self, out_dir: Path, filename: str, room_number: int,
+                        daemon: Optional[Tuple[str, int]] = None) -> Optional[Path]:
+        with MemoryProfile.session(BuildTrace.profile_memory):
+            return build_room_page_via(daemon, self.get_state(), out_dir, filename, room_number)
 
 # -----------------------------
 # Main App with config.ini + open buttons
@@ -859,6 +3307,8 @@ class PartyRoomBuilder(Tk):
         self.app_dir = Path(getattr(sys, "_MEIPASS", Path(__file__).parent)).resolve()
         self.config_path = self.app_dir / "config.ini"
         self.config = configparser.ConfigParser()
+        self.store = PartyStore(self.app_dir / STORE_FILENAME)
+        self.daemon = daemon_address()  # build daemon to use when running (see `App3.py serve`)
 
         # Output folder selector
         path_frame = ttk.LabelFrame(self, text="Output Folder", padding=10)
@@ -871,6 +3321,8 @@ class PartyRoomBuilder(Tk):
         ttk.Label(path_frame, text="Folder:").grid(row=0, column=0, sticky="e")
         ttk.Entry(path_frame, textvariable=self.output_var).grid(row=0, column=1, sticky="we", padx=6)
         ttk.Button(path_frame, text="Browse…", command=self.choose_folder).grid(row=0, column=2, padx=4)
+        ttk.Button(path_frame, text="Import Fonts…", command=self.import_fonts).grid(row=0, column=3, padx=4)
+        ttk.Button(path_frame, text="Mirror Google Fonts", command=self.mirror_fonts).grid(row=0, column=4, padx=4)
         path_frame.columnconfigure(1, weight=1)
 
         # Rooms
@@ -890,71 +3342,91 @@ class PartyRoomBuilder(Tk):
         btn_frame.pack(fill="x", padx=10, pady=(0,12))
 
         ttk.Button(btn_frame, text="Create Selected Rooms", command=self.create_files).pack(side="left")
+        ttk.Button(btn_frame, text="Queue Selected Rooms", command=self.queue_rooms).pack(side="left", padx=6)
+        ttk.Button(btn_frame, text="Import Bookings…", command=self.import_bookings).pack(side="left")
         ttk.Separator(btn_frame, orient="vertical").pack(side="left", fill="y", padx=8)
         ttk.Button(btn_frame, text="Open Room 1", command=lambda: self.open_specific_out(1)).pack(side="left")
         ttk.Button(btn_frame, text="Open Room 2", command=lambda: self.open_specific_out(2)).pack(side="left", padx=6)
         ttk.Button(btn_frame, text="Open Room 3", command=lambda: self.open_specific_out(3)).pack(side="left")
-        ttk.Button(btn_frame, text="Save Settings Now", command=self.save_config).pack(side="right")
+        ttk.Button(btn_frame, text="Save Settings Now", command=self.export_config).pack(side="right")
+        self.watch_var = BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="Watch for changes", variable=self.watch_var,
+                        command=self.toggle_watch).pack(side="right", padx=8)
+        self.watcher: Optional[FileWatcher] = None
+        self.sync_targets: list = sync_targets()
+        self.sync_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="publish")
+        self.sync_job = None
+        self.create_job = None  # URL prefetch ahead of a Create Selected Rooms
+        self.import_job = None  # Import Bookings: parse + build in the background
+        self.profile_var = BooleanVar(value=BuildTrace.profile_memory)
+        ttk.Checkbutton(btn_frame, text="Profile memory", variable=self.profile_var,
+                        command=lambda: setattr(BuildTrace, "profile_memory", self.profile_var.get())).pack(side="right")
 
         self.created_paths: dict[int, Path] = {}
+        self.built_states: dict[int, tuple] = {}  # room -> (when, out_dir, state) of the page this window last built
+        self.open_shells: dict[int, str] = {}  # room -> launch token of the shell we opened
+        self.scheduler: Optional[PartyScheduler] = None
+        self.schedule_status = StringVar(value="")
 
         ttk.Label(
             self,
             text="Tip: Advanced → Background, Video override, Logo image, fonts, colors, position, and Auto-stop minutes.",
             foreground="#444"
         ).pack(padx=10, pady=(0,10), anchor="w")
+        ttk.Label(self, textvariable=self.schedule_status, foreground="#064").pack(padx=10, pady=(0,10), anchor="w")
 
         self.load_config()
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(1000, self._poll_media)
 
     # ---- Config handling ----
     def load_config(self):
-        if not self.config_path.exists():
-            return
+        """config.ini first, then whatever the store saved after config.ini was last written (hand edits win)."""
+        problems = []
+        config_mtime = 0.0
         try:
-            self.config.read(self.config_path, encoding="utf-8")
-            general = self.config.get("general", "output_dir", fallback="")
-            if general:
-                self.output_var.set(general)
-            for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
-                sect = f"room{idx}"
-                if self.config.has_section(sect):
-                    state = {
-                        "enabled": self.config.get(sect, "enabled", fallback="True"),
-                        "title": self.config.get(sect, "title", fallback="Happy Birthday"),
-                        "inner": self.config.get(sect, "inner", fallback=""),
-                        "color": self.config.get(sect, "color", fallback="Blue"),
-                        "video": self.config.get(sect, "video", fallback="1"),
-                        "bg": self.config.get(sect, "bg", fallback=""),
-                        "video_override": self.config.get(sect, "video_override", fallback=""),
-                        "logo_path": self.config.get(sect, "logo_path", fallback="lte.gif"),
-                        "headline_outline": self.config.get(sect, "headline_outline", fallback="True"),
-                        "neon_glow": self.config.get(sect, "neon_glow", fallback="False"),
-                        "readable_shadow": self.config.get(sect, "readable_shadow", fallback="True"),
-                        "pill_panel": self.config.get(sect, "pill_panel", fallback="False"),
-                        "overlay": self.config.get(sect, "overlay", fallback="True"),
-                        "dim_video": self.config.get(sect, "dim_video", fallback="False"),
-                        "headline_size": self.config.get(sect, "headline_size", fallback="Medium"),
-                        "inner_font_choice": self.config.get(sect, "inner_font_choice", fallback="Pacifico"),
-                        "inner_font_local": self.config.get(sect, "inner_font_local", fallback=""),
-                        "title_color": self.config.get(sect, "title_color", fallback="#FFFFFF"),
-                        "inner_color": self.config.get(sect, "inner_color", fallback="#FFFFFF"),
-                        "link_colors": self.config.get(sect, "link_colors", fallback="True"),
-                        "inner_pos": self.config.get(sect, "inner_pos", fallback="Center"),
-                        "inner_offset_x": self.config.get(sect, "inner_offset_x", fallback="0"),
-                        "inner_offset_y": self.config.get(sect, "inner_offset_y", fallback="0"),
-                        "stop_minutes": self.config.get(sect, "stop_minutes", fallback="0"),
-                    }
-                    for k in ("enabled","headline_outline","neon_glow","readable_shadow","pill_panel","overlay","dim_video"):
-                        state[k] = "True" if str(state[k]).lower()=="true" else "False"
-                    if state["headline_size"] not in HEADLINE_SIZES: state["headline_size"] = "Medium"
-                    if state["inner_font_choice"] not in FANCY_FONTS: state["inner_font_choice"] = "Pacifico"
-                    if state["inner_pos"] not in INNER_POS_PRESETS: state["inner_pos"] = "Center"
-                    room.set_state(state)
-        except Exception as e:
+            if self.config_path.exists():
+                config_mtime = self.config_path.stat().st_mtime
+                self.config.read(self.config_path, encoding="utf-8")
+                general = self.config.get("general", "output_dir", fallback="")
+                if general:
+                    self.output_var.set(general)
+                self.daemon = daemon_address(self.config.get("general", "daemon", fallback=""))
+                self.sync_targets = sync_targets(self.config.get("general", "sync_targets", fallback=""))
+                configure_media_cache(self.config)
+                configure_shell_cache(self.config)
+                configure_telemetry(self.config)
+                for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
+                    sect = f"room{idx}"
+                    if self.config.has_section(sect):
+                        room.set_state(room_state_from_config(self.config, sect, problems))
+        except (OSError, configparser.Error, ValueError) as e:
             messagebox.showwarning("Config", f"Could not load config.ini:\n{e}")
+        try:
+            stored_dir = self.store.get_setting("output_dir", newer_than=config_mtime)
+            if stored_dir:
+                self.output_var.set(stored_dir)
+            saved = self.store.load_rooms(newer_than=config_mtime)
+            for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
+                if idx in saved:
+                    problems += room.set_state(saved[idx])
+        except (sqlite3.Error, ValueError) as e:
+            messagebox.showwarning("Settings", f"Could not load {STORE_FILENAME}:\n{e}")
+        if problems:
+            messagebox.showwarning("Config", "Some settings were invalid and were not applied:\n\n" + "\n".join(problems))
 
     def save_config(self):
+        """Incremental save: one upsert per room whose state changed."""
+        try:
+            self.store.set_setting("output_dir", self.output_var.get().strip())
+            for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
+                self.store.save_room(idx, room.get_state())
+        except Exception as e:
+            messagebox.showerror("Settings", f"Could not save {STORE_FILENAME}:\n{e}")
+
+    def export_config(self):
+        """Save Settings Now: store + a full config.ini snapshot (portable / hand-editable)."""
+        self.save_config()
         try:
             if not self.config.has_section("general"):
                 self.config.add_section("general")
@@ -966,7 +3438,7 @@ class PartyRoomBuilder(Tk):
                     self.config.add_section(sect)
                 state = room.get_state()
                 for k, v in state.items():
-                    self.config.set(sect, k, v)
+                    self.config.set(sect, k, str(v))
 
             with (self.config_path).open("w", encoding="utf-8") as f:
                 self.config.write(f)
@@ -979,6 +3451,39 @@ class PartyRoomBuilder(Tk):
         if folder:
             self.output_var.set(folder)
 
+    def _font_store(self) -> FontStore:
+        out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+        return FontStore(out_dir / FONT_STORE_DIRNAME)
+
+    def _report_fonts(self, title: str, done: list, errors: list):
+        msg = (f"{len(done)} added to the local font store:\n" + "\n".join(done)) if done else "Nothing was added."
+        if errors:
+            msg += "\n\nProblems:\n" + "\n".join(errors)
+        (messagebox.showwarning if errors else messagebox.showinfo)(title, msg)
+
+    def _run_font_job(self, title: str, fn, *args):
+        """Copy/download fonts on the background pool and report once done (mirroring can take minutes)."""
+        job = self.sync_pool.submit(fn, *args)
+        self.schedule_status.set(f"{title}…")
+
+        def done(job):
+            self.schedule_status.set("")
+            try:
+                added, errors = job.result()
+            except OSError as e:
+                messagebox.showerror(title, str(e))
+                return
+            self._report_fonts(title, added, errors)
+        self._when_done(job, done)
+
+    def import_fonts(self):
+        folder = filedialog.askdirectory(title="Choose a folder of font files")
+        if folder:
+            self._run_font_job("Import Fonts", self._font_store().import_folder, Path(folder))
+
+    def mirror_fonts(self):
+        self._run_font_job("Mirror Google Fonts", self._font_store().mirror_google)
+
     def create_files(self):
         out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
         self.created_paths.clear()
@@ -988,31 +3493,745 @@ class PartyRoomBuilder(Tk):
             (self.room2, 2, "partyroom2.html"),
             (self.room3, 3, "partyroom3.html"),
         ]
-        for room_frame, idx, filename in mapping:
-            file_path = room_frame.build_and_write(out_dir, filename, idx)
-            if file_path:
-                self.created_paths[idx] = file_path
+        states = [r.get_state() for r, _, _ in mapping]
+        reporting = [idx for (_, idx, _), st in zip(mapping, states)
+                     if state_bool(st["enabled"]) and state_bool(st.get("telemetry"))]
+        if reporting and telemetry_is_loopback(telemetry_address()):
+            messagebox.showerror("Playback Telemetry",
+                                 f"Telemetry is on for Room {', '.join(map(str, reporting))}, but pages would post to "
+                                 f"{telemetry_address()}, i.e. to the room PC itself.\n\n"
+                                 "Set [general] telemetry = <collector PC>:47616 in config.ini "
+                                 "(where python App3.py collect runs), or turn telemetry off.")
+            return
+        if self.create_job is not None and not self.create_job.done():
+            return  # still fetching for the previous click; it builds when done
+        urls = [u for st in states if state_bool(st["enabled"]) for u in room_asset_urls(st)]
+        if not urls:
+            self._create_rooms(out_dir, mapping, states)
+            return
+        # Download / revalidate all rooms' URL assets off the Tk thread, then build
+        self.create_job = self.sync_pool.submit(prefetch_room_assets, [st for st in states if state_bool(st["enabled"])], out_dir)
+        self.schedule_status.set(f"Fetching {len(urls)} URL asset(s) before building…")
+
+        def fetched(job):
+            self.schedule_status.set("")
+            self._create_rooms(out_dir, mapping, states)
+        self._when_done(self.create_job, fetched)
+
+    def _create_rooms(self, out_dir: Path, mapping: list, states: list):
+        blocked, failed = [], []
+        with MemoryProfile.session(BuildTrace.profile_memory) as memory:
+            for (_, idx, filename), state in zip(mapping, states):
+                try:
+                    file_path = self._build_room(state, idx, out_dir, filename)
+                except PageBudgetError as e:
+                    blocked.append(str(e))
+                    continue
+                except (RuntimeError, OSError) as e:  # daemon build error / unwritable output folder
+                    failed.append(f"Room {idx}: {e}")
+                    continue
+                if file_path:
+                    self.created_paths[idx] = file_path
 
         self.save_config()
 
+        if failed:
+            messagebox.showerror("Build Failed", "\n\n".join(failed))
+        if blocked:
+            messagebox.showwarning("Page Over Budget", "\n\n".join(blocked))
         if self.created_paths:
             msg = "Created:\n" + "\n".join(f"Room {i}: {p}" for i, p in self.created_paths.items())
+            traces = {i: t for i in self.created_paths for t in (read_build_trace(out_dir, i),) if t}
+            timings = [f"Room {i}: {trace_summary(t)}" for i, t in traces.items()]
+            if timings:
+                msg += f"\n\nBuild time ({TRACE_DIRNAME}/roomN.json has the full trace):\n" + "\n".join(timings)
+            if memory:
+                msg += f"\nTraced memory peak over all rooms: {size_text(memory['peak_kb'] * 1024)}"
+            heavy = [f"Room {i}: {budget_text(b)}" for i, t in traces.items()
+                     for b in (trace_budget(t),) if b and b["status"] != "ok"]
+            if heavy:
+                msg += "\n\nPage size over budget:\n" + "\n".join(heavy)
+            if self.sync_targets:
+                msg += f"\n\nPublishing to {len(self.sync_targets)} display folder(s) in the background."
+                self.start_sync(out_dir)
             messagebox.showinfo("Success", msg)
-        else:
+        elif not blocked and not failed:
             messagebox.showwarning("No Rooms Selected", "No rooms were selected to create. Please check at least one room.")
 
+    def start_sync(self, out_dir: Path):
+        """Delta-publish the output folder to [general] sync_targets without blocking the UI."""
+        if self.sync_job is not None and not self.sync_job.done():
+            self.after(1000, lambda: self.start_sync(out_dir))  # one publish at a time; catch up after it
+            return
+        self.sync_job = self.sync_pool.submit(sync_output, out_dir, self.sync_targets)
+        self.schedule_status.set(f"Publishing to {len(self.sync_targets)} display folder(s)…")
+        self._when_done(self.sync_job, self._sync_done)
+
+    def _when_done(self, job, callback):
+        """Call callback(job) on the Tk thread once a background job (sync_pool) has finished."""
+        if job.done():
+            callback(job)
+        else:
+            self.after(250, lambda: self._when_done(job, callback))
+
+    def _sync_done(self, job):
+        try:
+            results = job.result()
+        except OSError as e:
+            self.schedule_status.set(f"Publish failed: {e}")
+            return
+        self.schedule_status.set(f"{datetime.now():%H:%M:%S} published: " + "; ".join(sync_line(r).replace("\n", " ") for r in results))
+        failed = [sync_line(r) for r in results if r["errors"]]
+        if failed:
+            messagebox.showwarning("Publish to Displays", "\n\n".join(failed))
+
+    def export_room(self, idx: int):
+        """Export Room N: one zip with the page, its assets and a manifest, written in the background."""
+        out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+        dest = filedialog.asksaveasfilename(title=f"Export Room {idx}", defaultextension=".zip",
+                                            initialfile=f"partyroom{idx}.zip", filetypes=[("Zip archive", "*.zip")])
+        if not dest:
+            return
+        include_video = messagebox.askyesno(f"Export Room {idx}", "Include the video in the archive?")
+        state = (self.room1, self.room2, self.room3)[idx - 1].get_state()
+        job = self.sync_pool.submit(export_room, state, out_dir, idx, Path(dest), include_video)
+        self.schedule_status.set(f"Exporting Room {idx}…")
+
+        def done(job):
+            try:
+                manifest = job.result()
+            except (OSError, ValueError) as e:
+                self.schedule_status.set("")
+                messagebox.showerror(f"Export Room {idx}", str(e))
+                return
+            self.schedule_status.set(f"{datetime.now():%H:%M:%S} exported " + export_line(manifest).splitlines()[0])
+            missing = [n for n in manifest["not_included"] if n["reason"] != "video left out"]
+            (messagebox.showwarning if missing else messagebox.showinfo)(f"Export Room {idx}", export_line(manifest))
+        self._when_done(job, done)
+
+    def _poll_media(self):
+        """Repoint the rooms built this session at their video's local copy once it has landed: rebuilt
+        from the state they were built with (not unsaved edits), unless a scheduled party has gone live since."""
+        media = MediaCache.active
+        landed = set()
+        while media is not None:
+            try:
+                landed.add(media.ready.get_nowait())
+            except queue.Empty:
+                break
+        if landed:
+            rebuilt, folders = [], set()
+            for idx, (built, out_dir, state) in list(self.built_states.items()):
+                scheduler = self.scheduler if self.scheduler is not None and self.scheduler.out_dir == out_dir else None
+                if scheduler is not None and scheduler.live.get(idx, 0) > built:
+                    continue  # the scheduler owns the live page now
+                if any(str(media_source(v, out_dir)) in landed for v in room_videos(state, out_dir)):
+                    try:
+                        if self._build_room(state, idx, out_dir, f"partyroom{idx}.html"):
+                            rebuilt.append(idx)
+                            folders.add(out_dir)
+                    except (PageBudgetError, RuntimeError, OSError):
+                        pass  # the page keeps playing from the share
+            if rebuilt:
+                self.schedule_status.set(f"{datetime.now():%H:%M:%S} "
+                                         + ", ".join(f"Room {i}" for i in rebuilt) + " now play(s) the local video copy")
+                if self.sync_targets:
+                    for out_dir in folders:
+                        self.start_sync(out_dir)
+        if media is not None and media.errors:
+            self.schedule_status.set(f"Media cache: {media.errors.pop()}")
+        self.after(1000, self._poll_media)
+
+    def _build_room(self, state: dict, idx: int, out_dir: Path, filename: str) -> Optional[Path]:
+        daemon = None if BuildTrace.profile_memory else self.daemon  # profile this process, not the daemon
+        path = build_party(state, out_dir, filename, idx, daemon, self.store)[0]
+        if path:
+            self.built_states[idx] = (time.time(), out_dir, dict(state))
+        else:
+            self.built_states.pop(idx, None)
+        return path
+
+    # ---- Watch mode ----
+    def toggle_watch(self):
+        if self.watch_var.get():
+            self.watcher = FileWatcher()
+            self._watch_rooms()
+            self.watcher.start()
+            self.schedule_status.set(f"Watching config.ini and room inputs ({self.watcher.backend}).")
+            self.after(500, self._poll_watch)
+        elif self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.schedule_status.set("")
+
+    def _watch_rooms(self) -> dict:
+        """Point the watcher at config.ini + the current inputs of each room (they change with the UI)."""
+        out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+        states = {i: r.get_state() for i, r in enumerate((self.room1, self.room2, self.room3), start=1)}
+        room_paths = room_watch_paths(states, out_dir)
+        self.watcher.watch(set().union({os.path.abspath(self.config_path)}, *room_paths.values()))
+        return room_paths
+
+    def _poll_watch(self):
+        if self.watcher is None:
+            return
+        room_paths = self._watch_rooms()
+        changed = set()
+        while True:
+            try:
+                changed |= self.watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+        if changed:
+            rebuild = set(rooms_to_rebuild(frozenset(changed), room_paths))
+            problems = []
+            if os.path.abspath(self.config_path) in changed:
+                # hand edit of config.ini: apply it to the rooms, rebuild the ones it changed
+                self.config = configparser.ConfigParser()
+                self.config.read(self.config_path, encoding="utf-8")
+                for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
+                    if self.config.has_section(f"room{idx}"):
+                        before = room.get_state()
+                        problems += room.set_state(room_state_from_config(self.config, f"room{idx}", problems))
+                        if room.get_state() != before:
+                            rebuild.add(idx)
+                self._watch_rooms()
+            out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+            rooms = (self.room1, self.room2, self.room3)
+            built = []
+            for idx in sorted(rebuild):
+                try:
+                    if self._build_room(rooms[idx - 1].get_state(), idx, out_dir, f"partyroom{idx}.html"):
+                        built.append(idx)
+                except PageBudgetError as e:
+                    problems.append(str(e).splitlines()[0])
+                except (RuntimeError, OSError) as e:
+                    problems.append(f"Room {idx}: {e}")
+            self.schedule_status.set(f"{datetime.now():%H:%M:%S} rebuilt "
+                                     + (", ".join(f"Room {i}" for i in built) if built else "nothing")
+                                     + (f"   ({len(problems)} problem(s): {problems[0]})" if problems else ""))
+        self.after(500, self._poll_watch)
+
+    def _ensure_scheduler(self, out_dir: Path) -> PartyScheduler:
+        if self.scheduler is None or self.scheduler.out_dir != out_dir:
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            self.scheduler = PartyScheduler(out_dir, store=self.store)
+            self.scheduler.start()
+            self.after(1000, self._poll_scheduler)
+        return self.scheduler
+
+    def import_bookings(self):
+        path = filedialog.askopenfilename(
+            title="Choose booking export",
+            filetypes=[("Bookings", "*.csv;*.json;*.jsonl"), ("All files", "*.*")]
+        )
+        if not path or (self.import_job is not None and not self.import_job.done()):
+            return
+        out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+        base = {i: r.get_state() for i, r in enumerate((self.room1, self.room2, self.room3), start=1)}
+        # Parse, build and prefetch off the Tk thread; history and the scheduler are updated here once done
+        self.import_job = self.sync_pool.submit(import_bookings, Path(path), out_dir, base)
+        self.schedule_status.set(f"Importing {Path(path).name}…")
+        self._when_done(self.import_job, lambda job: self._import_done(job, out_dir))
+
+    def _import_done(self, job, out_dir: Path):
+        self.schedule_status.set("")
+        try:
+            report = job.result()
+        except (OSError, ValueError) as e:  # unreadable file, bad encoding / JSON
+            messagebox.showerror("Import Bookings", str(e))
+            return
+        now = time.time()
+        scheduled = [p for p in report.pages if p[1] is not None and p[1] > now]
+        build_ms = report.seconds * 1000 / max(1, len(report.pages))
+        for room, start, page, page_ref, version, state in report.pages:
+            if start is None or start <= now:  # scheduled ones are recorded when they go live
+                self.store.record_build(room, state, page, build_ms)
+        if scheduled:
+            sched = self._ensure_scheduler(out_dir)
+            for room, start, page, page_ref, version, state in scheduled:
+                sched.add(room, start, state, staged=page, page_ref=page_ref, version=version, build_ms=build_ms)
+            self._poll_scheduler(reschedule=False)
+        msg = report.summary() + (f"\n\n{len(scheduled)} queued to go live at their start times." if scheduled else "")
+        (messagebox.showwarning if report.errors else messagebox.showinfo)("Import Bookings", msg)
+
+    def queue_rooms(self):
+        out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
+        self._ensure_scheduler(out_dir)
+        queued, problems = [], []
+        for idx, room in enumerate((self.room1, self.room2, self.room3), start=1):
+            state = room.get_state()
+            if not state_bool(state["enabled"]):
+                continue
+            if not state["start_at"].strip():
+                problems.append(f"Room {idx}: no start time")
+                continue
+            try:
+                start = parse_start_time(state["start_at"])
+            except ValueError as e:
+                problems.append(f"Room {idx}: {e}")
+                continue
+            queued.append(self.scheduler.add(idx, start, state).label())
+        self.save_config()
+        msg = ("Queued:\n" + "\n".join(queued)) if queued else "Nothing was queued."
+        if problems:
+            msg += "\n\n" + "\n".join(problems)
+        (messagebox.showwarning if problems else messagebox.showinfo)("Schedule", msg)
+        self._poll_scheduler(reschedule=False)
+
+    def _poll_scheduler(self, reschedule: bool = True):
+        if self.scheduler is None:
+            return
+        last = None
+        while True:
+            try:
+                kind, text = self.scheduler.events.get_nowait()
+            except queue.Empty:
+                break
+            last = f"{kind}: {text}"
+        upcoming = self.scheduler.upcoming()
+        status = f"Next: {upcoming[0].label()}" + (" (staged)" if upcoming[0].staged else "") if upcoming else "No parties queued."
+        if last:
+            status = f"{status}   Last: {last}"
+        self.schedule_status.set(status)
+        if reschedule:
+            self.after(1000, self._poll_scheduler)
+
     def open_specific_out(self, room_idx: int):
         out_dir = Path(self.output_var.get().strip()) if self.output_var.get().strip() else Path(__file__).parent
         expected = out_dir / f"partyroom{room_idx}.html"
         if expected.exists():
-            webbrowser.open_new_tab(expected.as_uri())
+            prev = read_shell_beacon(out_dir, room_idx)
+            version = prev.get("version") or hashlib.sha1(expected.read_bytes()).hexdigest()[:12]
+            # URL-parameter pages get the room's current title/guest/stop in the query
+            page_ref = room_page_ref((self.room1, self.room2, self.room3)[room_idx - 1].get_state(), expected.name)
+            nonce = str(time.time_ns())
+            token = self.open_shells.get(room_idx)
+            if token and prev.get("shell") == token:
+                # Shell already running: reload it. A page can't raise its own tab, so if the
+                # window was closed the user can still open a fresh one (the old one retires).
+                write_shell_beacon(out_dir, room_idx, page_ref, version, shell_token=token, reload=nonce)
+                if not messagebox.askyesno("Display Open",
+                                           f"Room {room_idx}'s display is already open and has been reloaded.\n\n"
+                                           "Open a new window for it anyway?", default=messagebox.NO):
+                    return
+            # Open one shell; any older shell for this room retires itself. The token goes
+            # into the shell file, since Windows drops the query string of file:// URLs.
+            token = nonce
+            self.open_shells[room_idx] = token
+            write_shell_beacon(out_dir, room_idx, page_ref, version, shell_token=token, reload=nonce)
+            shell = ensure_kiosk_shell(out_dir, room_idx, token)
+            webbrowser.open(shell.as_uri(), new=1)
         else:
             messagebox.showinfo("Not Found", f"partyroom{room_idx}.html was not found in:\n{out_dir}\n\nCreate files first.")
 
     def on_close(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
         self.save_config()
+        self.store.close()
         self.destroy()
 
+# -----------------------------
+# Headless commands (python App3.py <command> ...)
+# -----------------------------
+def cli_out_dir(args_out: Optional[str], config_out: str) -> Path:
+    return Path(args_out or config_out or Path(__file__).parent)
+
+def cmd_import(args) -> int:
+    problems = []
+    config_out, base_states = load_room_states(Path(args.config), problems)
+    for problem in problems:
+        print(f"config.ini {problem}", file=sys.stderr)
+    out_dir = cli_out_dir(args.out, config_out)
+    report = import_bookings(Path(args.bookings), out_dir, base_states)
+    print(report.summary())
+    store = PartyStore(Path(args.store))
+    build_ms = report.seconds * 1000 / max(1, len(report.pages))
+    now = time.time()
+    sched = PartyScheduler(out_dir, store=store) if args.schedule else None
+    for room, start, page, page_ref, version, state in report.pages:
+        if sched is not None and start is not None and start > now:
+            sched.add(room, start, state, staged=page, page_ref=page_ref, version=version, build_ms=build_ms)
+        else:
+            store.record_build(room, state, page, build_ms)  # scheduled parties are recorded as they go live
+    if sched is not None:
+        sched.start()
+        try:
+            while sched.upcoming():
+                try:
+                    print(*sched.events.get(timeout=1.0))
+                except queue.Empty:
+                    pass
+        except KeyboardInterrupt:
+            pass
+        sched.stop()
+    store.close()
+    return 1 if report.errors else 0
+
+def cmd_history(args) -> int:
+    store = PartyStore(Path(args.store))
+    try:
+        if args.videos is not None:
+            since = time.time() - args.videos * 86400
+            for video, n in store.most_used_videos(since):
+                print(f"{n:5d}  {video}")
+        elif args.near:
+            for h in store.parties_near(datetime.fromisoformat(args.near), args.room):
+                print(f"#{h['id']:<6} room {h['room']}  {datetime.fromtimestamp(h['built_at']):%Y-%m-%d %H:%M}  "
+                      f"{h['inner'] or '(no name)'}  {h['video']}")
+        elif args.rebuild:
+            h = store.history_entry(args.rebuild)
+            if not h:
+                print(f"no history entry #{args.rebuild}")
+                return 1
+            config_out, _ = load_room_states(Path(args.config))
+            state = json.loads(h["state"])
+            t0 = time.perf_counter()
+            path = build_room_page(dict(state, enabled="True"), cli_out_dir(args.out, config_out),
+                                   f"partyroom{h['room']}.html", h["room"])
+            store.record_build(h["room"], state, path, (time.perf_counter() - t0) * 1000)
+            print(f"rebuilt #{h['id']} -> {path}")
+        return 0
+    finally:
+        store.close()
+
+def cmd_serve(args) -> int:
+    problems = []
+    config_out, states = load_room_states(Path(args.config), problems)
+    out_dir = cli_out_dir(args.out, config_out)
+    config = configparser.ConfigParser()
+    config.read(args.config, encoding="utf-8")
+    address = daemon_address(args.bind or config.get("general", "daemon", fallback=""))
+    daemon = BuildDaemon(out_dir, address, build_room_page, coerce_room_state,
+                         roots=daemon_roots(config.get("general", "daemon_roots", fallback="")))
+    for room, state in states.items():  # warm the shell / asset caches with the configured rooms
+        try:
+            render_room_page(state, daemon.out_dir, f"partyroom{room}.html", room)
+        except Exception as e:
+            problems.append(f"room {room}: {e}")
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f"building {daemon.out_dir} on {address[0]}:{address[1]} (Ctrl+C to stop)")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    daemon.server.server_close()
+    return 0
+
+def cmd_watch(args) -> int:
+    config_path = os.path.abspath(args.config)
+    problems = []
+    config_out, states = load_room_states(Path(config_path), problems)
+    out_dir = cli_out_dir(args.out, config_out)
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding="utf-8")
+    local = args.local or BuildTrace.profile_memory
+    address = None if local else daemon_address(config.get("general", "daemon", fallback=""))
+    for problem in problems:
+        print(f"config.ini {problem}", file=sys.stderr)
+
+    def rebuild(rooms, why: str):
+        with MemoryProfile.session(BuildTrace.profile_memory) as memory:
+            rebuild_rooms(rooms, why)
+        if memory:
+            print(f"  traced memory peak over this rebuild: {size_text(memory['peak_kb'] * 1024)}")
+
+    def rebuild_rooms(rooms, why: str):
+        for n in rooms:
+            t0 = time.perf_counter()
+            try:
+                path = build_room_page_via(address, states[n], out_dir, f"partyroom{n}.html", n)
+            except Exception as e:
+                print(f"room {n}: {e}", file=sys.stderr)
+                continue
+            if path:
+                print(f"{datetime.now():%H:%M:%S} room {n} rebuilt ({why}) in {(time.perf_counter() - t0) * 1000:.0f} ms")
+                if BuildTrace.profile_memory:
+                    print(f"  {trace_summary(read_build_trace(out_dir, n))}")
+
+    watcher = FileWatcher(poll_only=args.poll)
+    room_paths = room_watch_paths(states, out_dir)
+    watcher.watch(set().union({config_path}, *room_paths.values()))
+    if args.build_now:
+        rebuild(sorted(states), "start")
+    watcher.start()
+    print(f"watching config.ini + inputs of {len(room_paths)} rooms ({watcher.backend}); Ctrl+C to stop")
+    try:
+        while True:
+            try:
+                changed = watcher.changes.get(timeout=1.0)
+            except queue.Empty:
+                landed = set()
+                while MediaCache.active is not None and not MediaCache.active.ready.empty():
+                    landed.add(MediaCache.active.ready.get())
+                if landed:  # a video copy reached the local media cache: repoint its rooms, watch the copy
+                    rebuild(sorted(n for n, st in states.items()
+                                   if any(str(media_source(v, out_dir)) in landed for v in room_videos(st, out_dir))),
+                            "local video copy")
+                    room_paths = room_watch_paths(states, out_dir)
+                    watcher.watch(set().union({config_path}, *room_paths.values()))
+                continue
+            rooms = set(rooms_to_rebuild(changed, room_paths))
+            if config_path in changed:
+                problems = []
+                _, new_states = load_room_states(Path(config_path), problems)
+                for problem in problems:
+                    print(f"config.ini {problem}", file=sys.stderr)
+                rooms |= {n for n, st in new_states.items() if st != states.get(n)}
+                states = new_states
+                room_paths = room_watch_paths(states, out_dir)
+                watcher.watch(set().union({config_path}, *room_paths.values()))
+            names = sorted(os.path.basename(p) for p in changed)
+            rebuild(sorted(n for n in rooms if n in states), ", ".join(names[:3]) + (" …" if len(names) > 3 else ""))
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+    return 0
+
+def cmd_bench(args) -> int:
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else None
+    meta = {"python": platform.python_version(), "machine": platform.node(), "fonttools": TTFont is not None}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="partyroom-bench-") as tmp:
+        for name, setup, fn in bench_cases(Path(tmp), int(args.max_size_mb * 1024 * 1024), args.font or ""):
+            if args.filter and args.filter not in name:
+                continue
+            r = results[name] = bench_run(setup, fn)
+            b = (baseline or {}).get("cases", {}).get(name)
+            delta = f"  {(r['ms'] / b['ms'] - 1) * 100:+5.0f}%" if b and b.get("ms") else ""
+            print(f"{name:<34} {r['ms']:>10.3f} ms median{delta:<8} {r['iqr_ms']:>8.3f} ms IQR "
+                  f"{r['best_ms']:>10.3f} ms best {r['peak_kb']:>10.0f} KB peak  ({r['runs']} runs)")
+    if args.save:
+        cases = dict((baseline or {}).get("cases", {}), **results) if args.filter else results
+        baseline_path.write_text(json.dumps({"meta": meta, "cases": cases}, indent=1, sort_keys=True), encoding="utf-8")
+        print(f"baseline saved to {baseline_path}")
+        return 0
+    if baseline is None:
+        print(f"no baseline at {baseline_path}; run with --save to record one")
+        return 0
+    if baseline.get("meta", {}).get("machine") != meta["machine"]:
+        print(f"note: baseline was recorded on {baseline.get('meta', {}).get('machine')!r}")
+    problems = bench_compare(results, baseline.get("cases", {}), args.time_tolerance, args.memory_tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+def cmd_sync(args) -> int:
+    config = configparser.ConfigParser()
+    config.read(args.config, encoding="utf-8")
+    out_dir = cli_out_dir(args.out, config.get("general", "output_dir", fallback=""))
+    targets = [Path(t) for t in args.targets] or sync_targets(config.get("general", "sync_targets", fallback=""))
+    if not targets:
+        print("no targets: pass folders or set [general] sync_targets = D:\\mirror; \\\\room2-pc\\party", file=sys.stderr)
+        return 2
+    results = sync_output(out_dir, targets, prune=not args.keep)
+    for result in results:
+        print(sync_line(result))
+    return 1 if any(r["errors"] for r in results) else 0
+
+def cmd_export(args) -> int:
+    problems = []
+    config_out, states = load_room_states(Path(args.config), problems)
+    for problem in problems:
+        print(f"config.ini {problem}", file=sys.stderr)
+    if args.room not in states:
+        print(f"no [room{args.room}] in {args.config}", file=sys.stderr)
+        return 2
+    dest = Path(args.archive or f"partyroom{args.room}.zip")
+    manifest = export_room(states[args.room], cli_out_dir(args.out, config_out), args.room, dest,
+                           include_video=not args.no_video)
+    print(export_line(manifest))
+    return 0
+
+def cmd_collect(args) -> int:
+    host, _, port = (args.bind or telemetry_address()).rpartition(":")
+    store = PartyStore(Path(args.store))
+    collector = TelemetryCollector(store, (host or "127.0.0.1", int(port)))
+    print(f"collecting page telemetry on http://{host or '127.0.0.1'}:{port}/t into {store.path} (Ctrl+C to stop)")
+    try:
+        collector.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    collector.server_close()
+    store.close()
+    print(f"{collector.received} samples received")
+    return 0
+
+def cmd_telemetry(args) -> int:
+    store = PartyStore(Path(args.store))
+    since = time.time() - args.days * 86400
+    grouped = telemetry_rows_by_combo(store.telemetry_report(since, args.room))
+    if not grouped:
+        print("no telemetry yet (enable Playback telemetry on a room and run `App3.py collect`)")
+    room = None
+    for (r, combo, display), metrics in grouped.items():
+        if r != room:
+            room = r
+            print(f"Room {r}")
+        print(f"  {combo}  @ {display}\n    {telemetry_line(metrics)}")
+    failures = store.telemetry_failures(since, args.room)
+    if failures:
+        print("Asset failures:")
+        for f in failures:
+            print(f"  room {f['room']}  {f['n']:4d}x  {f['detail']}")
+    store.close()
+    return 0
+
+def cmd_simulate(args) -> int:
+    with tempfile.TemporaryDirectory(prefix="partyroom-sim-") as tmp:
+        out_dir = Path(args.out) if args.out else Path(tmp)
+        config = configparser.ConfigParser()
+        config.read(args.config, encoding="utf-8")
+        daemon = daemon_address(config.get("general", "daemon", fallback="")) if args.daemon else None
+        report = simulate_day(out_dir, args.rooms, args.parties, args.seed, args.asset_kb, args.workers, daemon)
+    rss = report["peak_rss_bytes"]
+    print(f"{report['builds']} builds ({report['rooms']} rooms x {report['parties_per_room']} parties, "
+          f"{report['workers']} worker(s)) in {report['seconds']:.2f}s = {report['builds_per_second']:.1f} builds/s")
+    print(f"latency p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms  p99 {report['p99_ms']:.1f} ms  "
+          f"max {report['max_ms']:.1f} ms")
+    print(f"written {report['bytes_written'] / 1024 / 1024:.1f} MB   peak RSS "
+          + (f"{rss / 1024 / 1024:.0f} MB" if rss else "n/a"))
+    if report["daemon"]:
+        local = sum(report["daemon_fallbacks"].values())
+        print(f"daemon {report['daemon']}: {report['builds'] - local} of {report['builds']} builds"
+              + "".join(f"\n  {n} built locally: {reason}" for reason, n in report["daemon_fallbacks"].items()))
+    for failure in report["failures"]:
+        print(f"FAILED {failure}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=1), encoding="utf-8")
+    return 1 if report["failures"] else 0
+
+def bench_config_ini(rooms: int) -> str:
+    """A config.ini with `rooms` fully populated [roomN] sections (values cycled through the schema)."""
+    def value(f: RoomField, n: int) -> str:
+        if f.choices:
+            return str(f.choices[n % len(f.choices)])
+        if f.kind == "bool":
+            return str(n % 2 == 0)
+        if f.kind == "int":
+            return str(n % 30)
+        return f.default if f.kind == "color" else f"value {n}"
+    lines = ["[general]", "output_dir = ", ""]
+    for n in range(1, rooms + 1):
+        lines.append(f"[room{n}]")
+        lines += [f"{k} = {value(f, n)}" for k, f in ROOM_SCHEMA.items()]
+        lines.append("")
+    return "\n".join(lines)
+
+def cmd_bench_config(args) -> int:
+    path = Path(args.out or Path(__file__).parent) / f"bench-{args.rooms}-rooms.ini"
+    path.write_text(bench_config_ini(args.rooms), encoding="utf-8")
+    try:
+        times = []
+        for _ in range(args.repeat):
+            problems = []
+            t0 = time.perf_counter()
+            _, states = load_room_states(path, problems)
+            times.append((time.perf_counter() - t0) * 1000)
+    finally:
+        path.unlink()
+    times.sort()
+    best, median = times[0], times[len(times) // 2]
+    print(f"{len(states)} rooms x {len(ROOM_SCHEMA)} fields: best {best:.2f} ms, median {median:.2f} ms "
+          f"({median * 1000 / max(1, len(states)):.0f} us/room), budget {args.budget_ms:g} ms")
+    for problem in problems:
+        print(problem)
+    return 1 if problems or median > args.budget_ms else 0
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="App3.py", description="Party Room Pages Builder (headless commands)")
+    parser.add_argument("--config", default=str(default_config_path()), help="config.ini with the [roomN] sections")
+    parser.add_argument("--store", default=str(default_store_path()), help=f"state/history database ({STORE_FILENAME})")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="tracemalloc each room build: peak + top allocation sites in .traces/roomN.json")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="build every party in a booking export (.csv / .json / .jsonl)")
+    p.add_argument("bookings")
+    p.add_argument("--out", help="output folder (default: [general] output_dir)")
+    p.add_argument("--schedule", action="store_true", help="stay running and swap pages live at their start times")
+    p.set_defaults(func=cmd_import)
+    p = sub.add_parser("history", help="query / replay the party history")
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--videos", type=int, metavar="DAYS", help="most-used videos over the last DAYS days")
+    g.add_argument("--near", metavar="WHEN", help="pages built or gone live around WHEN (e.g. 2026-10-17T15:00)")
+    g.add_argument("--rebuild", type=int, metavar="ID", help="rebuild history entry ID as the live page")
+    p.add_argument("--room", type=int)
+    p.add_argument("--out", help="output folder for --rebuild (default: [general] output_dir)")
+    p.set_defaults(func=cmd_history)
+    p = sub.add_parser("serve", help="run the build daemon the front-desk builders hand their builds to")
+    p.add_argument("--out", help="output folder (default: [general] output_dir)")
+    p.add_argument("--bind", metavar="HOST:PORT", help=f"listen address (default: [general] daemon or {DAEMON_ADDRESS})")
+    p.set_defaults(func=cmd_serve)
+    p = sub.add_parser("watch", help="rebuild rooms whenever config.ini or their logos/backgrounds/fonts/videos change")
+    p.add_argument("--out", help="output folder (default: [general] output_dir)")
+    p.add_argument("--poll", action="store_true", help="stat-poll instead of inotify (network shares)")
+    p.add_argument("--local", action="store_true", help="build in this process even if a build daemon is running")
+    p.add_argument("--build-now", action="store_true", help="build every room once before watching")
+    p.set_defaults(func=cmd_watch)
+    p = sub.add_parser("bench", help="time + memory micro-benchmarks of page generation against a saved baseline")
+    p.add_argument("--baseline", default=str(Path(__file__).parent / BENCH_BASELINE_FILENAME))
+    p.add_argument("--save", action="store_true", help="record this run as the baseline")
+    p.add_argument("--filter", help="only cases whose name contains this")
+    p.add_argument("--max-size-mb", type=float, default=50, help="largest logo/background size to test")
+    p.add_argument("--font", help="a local .ttf/.otf to also time glyph subsetting with")
+    p.add_argument("--time-tolerance", type=float, default=BENCH_TIME_TOLERANCE)
+    p.add_argument("--memory-tolerance", type=float, default=BENCH_MEMORY_TOLERANCE)
+    p.set_defaults(func=cmd_bench)
+    p = sub.add_parser("sync", help="publish the output folder to the display machines' folders (changed files only)")
+    p.add_argument("targets", nargs="*", help="target folders / mounted shares (default: [general] sync_targets)")
+    p.add_argument("--out", help="output folder (default: [general] output_dir)")
+    p.add_argument("--keep", action="store_true", help="don't remove files that are gone from the output folder")
+    p.set_defaults(func=cmd_sync)
+    p = sub.add_parser("export", help="write one room as a self-contained zip (page, assets, manifest.json, video)")
+    p.add_argument("room", type=int)
+    p.add_argument("archive", nargs="?", help="zip to write (default: partyroom<room>.zip in the current folder)")
+    p.add_argument("--out", help="output folder the room's assets resolve against (default: [general] output_dir)")
+    p.add_argument("--no-video", action="store_true", help="leave the video out (copy it next to the page by hand)")
+    p.set_defaults(func=cmd_export)
+    p = sub.add_parser("collect", help="receive the pages' playback telemetry into the store")
+    p.add_argument("--bind", metavar="HOST:PORT", help=f"listen address (default: [general] telemetry or {TELEMETRY_ADDRESS})")
+    p.set_defaults(func=cmd_collect)
+    p = sub.add_parser("telemetry", help="per-room playback report: first frame, stalls, dropped frames, failures")
+    p.add_argument("--days", type=float, default=7)
+    p.add_argument("--room", type=int)
+    p.set_defaults(func=cmd_telemetry)
+    p = sub.add_parser("simulate", help="simulate an operating day: N rooms x M random parties through the real build path")
+    p.add_argument("--rooms", type=int, default=20)
+    p.add_argument("--parties", type=int, default=8, help="parties per room")
+    p.add_argument("--workers", type=int, default=1, help="rooms built at once (front desks working in parallel)")
+    p.add_argument("--asset-kb", type=int, default=512, help="size of the generated logos/backgrounds (0: none)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--daemon", action="store_true", help="build through the running build daemon")
+    p.add_argument("--out", help="keep the output here (default: a temporary folder)")
+    p.add_argument("--json", help="also write the report to this file")
+    p.set_defaults(func=cmd_simulate)
+    p = sub.add_parser("bench-config", help="time loading a generated many-room config.ini")
+    p.add_argument("--rooms", type=int, default=50)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--budget-ms", type=float, default=50.0, help="fail if the median load takes longer")
+    p.add_argument("--out", help="folder for the temporary .ini (default: next to App3.py)")
+    p.set_defaults(func=cmd_bench_config)
+    args = parser.parse_args(argv)
+    if args.profile_memory:
+        BuildTrace.profile_memory = True
+    config = configparser.ConfigParser()
+    try:
+        config.read(args.config, encoding="utf-8")
+    except configparser.Error:
+        pass  # the command reports config problems itself
+    configure_media_cache(config)
+    configure_shell_cache(config)
+    configure_telemetry(config)
+    return args.func(args)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
     app = PartyRoomBuilder()
     app.mainloop()
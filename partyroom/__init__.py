@@ -0,0 +1 @@
+"""Parts of App3.py that don't need Tk; App3.py imports them back under their old names."""
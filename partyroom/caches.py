@@ -0,0 +1,406 @@
+"""Local copies of what room pages reference: URL assets (in the output folder) and videos on network shares."""
+import configparser
+import hashlib
+import json
+import mimetypes
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .util import VIDEO_OPTIONS, existing_or_url, file_sha256, looks_like_url, replace_text, state_bool, state_int
+
+try:  # cache index locks: fcntl on POSIX, msvcrt on Windows
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# ---------- Prefetch cache for URL assets (video / background / logo) ----------
+ASSET_CACHE_DIRNAME = "asset-cache"    # under the output folder: pages, sync and export see plain local files
+ASSET_CACHE_MAX_MB = 4096              # LRU bound; PARTYROOM_ASSET_CACHE_MB overrides
+ASSET_REVALIDATE_SECONDS = 600         # conditional GET (ETag / If-Modified-Since) at most this often per URL
+ASSET_FETCH_TIMEOUT = 30
+ASSET_REVALIDATE_TIMEOUT = 5           # a copy is on disk: don't hold the build up for a slow line
+ASSET_FETCH_WORKERS = 4
+ASSET_URL_KEYS = ("video_override", "bg", "logo_path", "next_video", "next_bg", "next_logo")
+
+@contextmanager
+def file_lock(path: Path):
+    """Exclusive lock on path (created if missing) across processes: GUI, daemon and watch share caches."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileCache:
+    """
+    A folder of cached files + index.json ({"entries": key -> file, size, last use, ...,
+    "pins": key -> until}), kept under max_bytes by evicting the least recently used entries.
+    Pinned keys are never evicted. Several processes share one cache: every save re-reads the
+    index under a file lock and merges in this process's changes.
+    """
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pins: dict = {}   # key -> epoch until which it stays
+        self.index: dict = {}
+        self._dirty: set = set()  # keys changed here and not saved yet
+        self._reload()
+
+    def _read_index(self) -> Tuple[dict, dict]:
+        try:
+            data = json.loads((self.root / "index.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}, {}
+        if "entries" not in data:
+            return data, {}  # index.json from before pins were saved
+        return data["entries"], data.get("pins", {})
+
+    def _reload(self):
+        """Pick up other processes' entries and pins (called with the lock held)."""
+        entries, pins = self._read_index()
+        for key, entry in entries.items():
+            if key not in self._dirty:
+                self.index[key] = entry
+        for key, until in pins.items():
+            self.pins[key] = max(until, self.pins.get(key, 0))
+
+    def _touch(self, key: str, entry: Optional[dict] = None):
+        """Record a new / updated entry (lock held); it is written by the next _save."""
+        self.index[key] = {**self.index.get(key, {}), **(entry or {}), "used": time.time()}
+        self._dirty.add(key)
+
+    def _save(self, keep: str = ""):
+        """Merge with the index on disk, evict down to max_bytes and write it (lock held)."""
+        with file_lock(self.root / "index.lock"):
+            entries, pins = self._read_index()
+            for key in self._dirty:
+                if key in self.index:
+                    entries[key] = self.index[key]
+            now = time.time()
+            for key, until in pins.items():
+                self.pins[key] = max(until, self.pins.get(key, 0))
+            self.pins = {k: t for k, t in self.pins.items() if t > now}
+            self.index, self._dirty = entries, set()
+            self._evict(keep)
+            replace_text(self.root / "index.json", json.dumps({"entries": self.index, "pins": self.pins}, indent=1))
+
+    def peek(self, key: str) -> Optional[Path]:
+        """The cached copy for key, if there is one."""
+        with self.lock:
+            entry = self.index.get(key)
+        path = self.root / entry["file"] if entry else None
+        return path if path is not None and path.is_file() else None
+
+    def pin(self, key: str, until: float):
+        with self.lock:
+            if self.pins.get(key, 0) >= until:
+                return
+            self.pins[key] = until
+            self._save()  # other processes' evictions must see it
+
+    def _evict(self, keep: str):
+        """Called with the lock held, after adding / touching keep."""
+        now = time.time()
+        total = sum(e.get("size", 0) for e in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1].get("used", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep or self.pins.get(key, 0) > now:
+                continue
+            try:
+                (self.root / entry["file"]).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # open on Windows: try again next time
+            total -= entry.get("size", 0)
+            del self.index[key]
+
+class AssetCache(FileCache):
+    """
+    Local copies of the http(s) videos / backgrounds / logos rooms point at, so displays load them
+    at disk speed whatever the venue's connection is doing. Entries keep the URL's ETag /
+    Last-Modified for revalidation.
+    """
+    def __init__(self, root: Path, max_bytes: int = ASSET_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(root, max_bytes)
+        self._fetching: dict = {}  # url -> lock, so two builds never download the same URL at once
+
+    def _filename(self, url: str, content_type: str) -> str:
+        ext = Path(urllib.parse.urlparse(url).path).suffix.lower()
+        if not re.fullmatch(r"\.[a-z0-9]{1,5}", ext):
+            ext = mimetypes.guess_extension(content_type or "") or ""
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ext
+
+    def fetch(self, url: str) -> Optional[Path]:
+        """Local copy of url: downloaded when missing, revalidated when due, the stale copy when offline."""
+        with self.lock:
+            guard = self._fetching.setdefault(url, threading.Lock())
+        with guard:
+            with self.lock:
+                if url not in self.index:
+                    self._reload()  # another builder (GUI / daemon) may have fetched it
+                entry = dict(self.index.get(url) or {})
+            path = self.root / entry["file"] if entry else None
+            have = path is not None and path.is_file()
+            if not (have and time.time() - entry.get("checked", 0) < ASSET_REVALIDATE_SECONDS):
+                headers = {"User-Agent": "PartyRoomBuilder"}
+                if have and entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if have and entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+                try:
+                    request = urllib.request.Request(url, headers=headers)
+                    timeout = ASSET_REVALIDATE_TIMEOUT if have else ASSET_FETCH_TIMEOUT
+                    with urllib.request.urlopen(request, timeout=timeout) as resp:
+                        name = entry.get("file") or self._filename(url, resp.headers.get_content_type())
+                        self.root.mkdir(parents=True, exist_ok=True)
+                        tmp = self.root / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+                        try:
+                            with open(tmp, "wb") as f:
+                                shutil.copyfileobj(resp, f, 1024 * 1024)
+                            os.replace(tmp, self.root / name)
+                        finally:
+                            if tmp.exists():
+                                tmp.unlink()
+                        entry = {"file": name, "etag": resp.headers.get("ETag"),
+                                 "last_modified": resp.headers.get("Last-Modified"),
+                                 "size": (self.root / name).stat().st_size}
+                except urllib.error.HTTPError as e:
+                    if e.code != 304 and not have:
+                        return None
+                except (OSError, ValueError):  # offline / DNS / timeout: serve what we have
+                    if not have:
+                        return None
+                entry["checked"] = time.time()  # 304, new copy, or unreachable with a copy: next check later
+            with self.lock:
+                self._touch(url, entry)
+                self._save(keep=url)
+                return self.root / self.index[url]["file"]
+
+    def prefetch(self, urls) -> dict:
+        """Fetch several URLs at once; url -> local Path (None when unavailable)."""
+        urls = sorted(set(urls))
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(ASSET_FETCH_WORKERS, len(urls)), thread_name_prefix="prefetch") as pool:
+            return dict(zip(urls, pool.map(self.fetch, urls)))
+
+_asset_caches: dict = {}
+_asset_caches_lock = threading.Lock()
+
+def asset_cache(out_dir: Path) -> AssetCache:
+    root = (out_dir / ASSET_CACHE_DIRNAME).resolve()
+    with _asset_caches_lock:
+        if root not in _asset_caches:
+            mb = state_int(os.environ.get("PARTYROOM_ASSET_CACHE_MB"), ASSET_CACHE_MAX_MB)
+            _asset_caches[root] = AssetCache(root, max(1, mb) * 1024 * 1024)
+        return _asset_caches[root]
+
+def room_asset_urls(state: dict) -> list:
+    if not state_bool(state.get("cache_urls", True)):
+        return []
+    return [u.strip() for u in (state.get(k) or "" for k in ASSET_URL_KEYS) if looks_like_url(u)]
+
+def prefetch_room_assets(states, out_dir: Path) -> dict:
+    """Download / revalidate every URL asset of these rooms concurrently (cheap when all are fresh)."""
+    return asset_cache(out_dir).prefetch(u for state in states for u in room_asset_urls(state))
+
+def local_asset(src: Optional[str], state: dict, out_dir: Path, pin: bool = True) -> Optional[str]:
+    """A URL with a cached copy -> that copy, relative to out_dir; anything else unchanged.
+    A copy a page is built against stays pinned for the rest of the day (pin=False just looks)."""
+    if not src or not looks_like_url(src) or not state_bool(state.get("cache_urls", True)):
+        return src
+    cache = asset_cache(out_dir)
+    path = cache.peek(src.strip())
+    if path is None:
+        return src
+    if pin:
+        cache.pin(src.strip(), end_of_day(time.time()))
+    return f"{ASSET_CACHE_DIRNAME}/{path.name}"
+
+# ---------- Local media cache (videos on network shares -> local SSD) ----------
+MEDIA_CACHE_MAX_MB = 20480             # LRU bound; [general] media_cache_mb overrides
+
+class MediaCache(FileCache):
+    """
+    Verified local copies of the videos rooms play from a network share, so <video loop> reads
+    the SSD instead of the share on every loop. Copies are made by one background thread (hash
+    while copying, re-read the copy, compare); a page only points at a copy once it has landed
+    and the source's size/mtime still match. Videos of today's scheduled parties are pinned.
+    """
+    active: Optional["MediaCache"] = None  # set by configure_media_cache ([general] media_cache)
+
+    def __init__(self, root: Path, max_bytes: int = MEDIA_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(root, max_bytes)
+        self.ready: queue.Queue = queue.Queue()   # sources whose copy just landed (the GUI rebuilds their rooms)
+        self.errors: list = []
+        self._jobs: queue.Queue = queue.Queue()
+        self._pending: set = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def lookup(self, src: Path) -> Optional[Path]:
+        """The current local copy of src, or None (and a copy is queued) when there isn't one yet."""
+        key = str(src)
+        try:
+            st = src.stat()
+        except OSError:
+            return self.peek(key)  # share unreachable: the copy we have beats a stalled video
+        with self.lock:
+            entry = self.index.get(key)
+            if entry and [entry["size"], entry["mtime_ns"]] == [st.st_size, st.st_mtime_ns] \
+                    and (self.root / entry["file"]).is_file():
+                self._touch(key)  # saved with the next copy / pin
+                return self.root / entry["file"]
+        self.request(src)
+        return None
+
+    def request(self, src: Path):
+        with self.lock:
+            if str(src) in self._pending:
+                return
+            self._pending.add(str(src))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="media-cache", daemon=True)
+                self._thread.start()
+        self._jobs.put(src)
+
+    def _run(self):
+        while True:
+            src = self._jobs.get()
+            try:
+                self.copy(src)
+                self.ready.put(str(src))
+            except (OSError, ValueError) as e:
+                self.errors.append(f"{src}: {e}")
+            finally:
+                with self.lock:
+                    self._pending.discard(str(src))
+
+    def copy(self, src: Path) -> Path:
+        """Copy src into the cache and verify it; raises when the copy doesn't match the source."""
+        st = src.stat()
+        name = hashlib.sha1(str(src).encode("utf-8")).hexdigest()[:16] + src.suffix.lower()
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{name}.{os.getpid()}.tmp"
+        try:
+            digest = hashlib.sha256()
+            with open(src, "rb") as f, open(tmp, "wb") as out:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            after = src.stat()
+            if [after.st_size, after.st_mtime_ns] != [st.st_size, st.st_mtime_ns]:
+                raise ValueError("changed while copying")
+            if file_sha256(tmp) != digest.hexdigest():
+                raise ValueError("copy does not match the source")
+            os.replace(tmp, self.root / name)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        with self.lock:
+            self._touch(str(src), {"file": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                   "sha256": digest.hexdigest()})
+            self._save(keep=str(src))
+        return self.root / name
+
+def configure_media_cache(config: Optional[configparser.ConfigParser] = None) -> Optional[MediaCache]:
+    folder = os.environ.get("PARTYROOM_MEDIA_CACHE") or (config.get("general", "media_cache", fallback="") if config else "")
+    mb = state_int(config.get("general", "media_cache_mb", fallback="") if config else "", MEDIA_CACHE_MAX_MB)
+    current = MediaCache.active
+    if not folder.strip():
+        MediaCache.active = None
+    elif current is None or current.root != Path(folder.strip()):
+        MediaCache.active = MediaCache(Path(folder.strip()), max(1, mb) * 1024 * 1024)
+    else:
+        current.max_bytes = max(1, mb) * 1024 * 1024
+    return MediaCache.active
+
+def media_source(video: Optional[str], out_dir: Path) -> Optional[Path]:
+    """The file a local video setting refers to, if it exists and isn't already on the cache's disk."""
+    media = MediaCache.active
+    if media is None or not video or looks_like_url(video):
+        return None
+    path = Path(video) if Path(video).is_absolute() else out_dir / video
+    try:
+        if not path.is_file() or (media.root.is_dir() and path.stat().st_dev == media.root.stat().st_dev):
+            return None
+    except OSError:
+        return None
+    return path.resolve()
+
+def room_videos(state: dict, out_dir: Path) -> list:
+    """The video settings a room page plays or warms: its video (override or built-in) and the next party's."""
+    override = existing_or_url(state.get("video_override", ""), out_dir)
+    video = override or VIDEO_OPTIONS.get(state_int(state.get("video", 1), 1), ("movie.mp4", ""))[0]
+    return [v for v in (video, state.get("next_video", "")) if v]
+
+def end_of_day(ts: float) -> float:
+    return datetime.fromtimestamp(ts).replace(hour=23, minute=59, second=59).timestamp()
+
+def local_media(video: Optional[str], out_dir: Path) -> Optional[str]:
+    """A video on another disk -> its verified local copy (absolute) once there is one; else unchanged.
+    A copy a page was built against stays pinned for the rest of the day. Published pages don't
+    keep the path: publish_page sends the copy to assets/ under the video's own name."""
+    src = media_source(video, out_dir)
+    copy = MediaCache.active.lookup(src) if src else None
+    if copy is None:
+        return video
+    MediaCache.active.pin(str(src), end_of_day(time.time()))
+    return str(copy)
+
+def media_publish_name(path: Path) -> str:
+    """File name to publish path under: a media cache copy goes out as the video it caches, so a page
+    built before and after the copy landed references the same assets/ file on the displays."""
+    media = MediaCache.active
+    if media is not None and path.parent.resolve() == media.root.resolve():
+        with media.lock:
+            for key, entry in media.index.items():
+                if entry.get("file") == path.name:
+                    return Path(key).name
+    return path.name
+
+def pin_party_media(state: dict, out_dir: Path, start: float) -> bool:
+    """Keep a scheduled party's videos cached through the end of its day and start copying them now;
+    False while one of them is still being copied."""
+    media = MediaCache.active
+    if media is None:
+        return True
+    local = True
+    for video in room_videos(state, out_dir):
+        src = media_source(video, out_dir)
+        if src:
+            media.pin(str(src), end_of_day(start))
+            local = media.lookup(src) is not None and local
+    return local
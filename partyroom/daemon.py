@@ -0,0 +1,212 @@
+"""Build daemon: one warm builder shared by several front-desk PCs, and the client side of its protocol."""
+import hashlib
+import json
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+from .util import PageBudgetError, looks_like_url, replace_text
+
+DAEMON_ADDRESS = "127.0.0.1:47615"   # [general] daemon = host:port or PARTYROOM_DAEMON override it
+DAEMON_CONNECT_TIMEOUT = 0.5
+DAEMON_BUILD_TIMEOUT = 120.0
+DAEMON_RETRY_SECONDS = 30            # after a failed connect, build locally this long before retrying
+DAEMON_ID_FILENAME = ".partyroom-daemon"  # in the output folder: identifies it however a PC mounts it
+DAEMON_PATH_KEYS = ("bg", "video_override", "logo_path", "inner_font_local", "next_video", "next_bg", "next_logo")
+_page_name_re = re.compile(r"[\w.-]+\.html")
+
+def daemon_roots(config_value: str = "") -> list:
+    """[general] daemon_roots: extra folders (';'-separated) the daemon may read assets from."""
+    return [Path(t.strip()) for t in re.split(r"[;\n]", config_value or "") if t.strip()]
+
+def daemon_folder_id(out_dir: Path) -> str:
+    """The id a running daemon wrote into out_dir ('' when none): Z:\\ and \\\\server\\share read the same file."""
+    try:
+        return (Path(out_dir) / DAEMON_ID_FILENAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+def daemon_address(config_value: str = "") -> Tuple[str, int]:
+    text = (os.environ.get("PARTYROOM_DAEMON") or config_value or DAEMON_ADDRESS).strip()
+    host, _, port = text.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"daemon address {text!r}: expected host:port")
+    return host or "127.0.0.1", int(port)
+
+class DaemonUnavailable(Exception):
+    """No daemon answered, or it doesn't serve this output folder: build locally instead."""
+
+class _RoomLane:
+    """One room's build slot: a single build at a time; requests arriving meanwhile share the next one."""
+    def __init__(self):
+        self.cv = threading.Condition()
+        self.busy = False
+        self.pending = None    # newest (state, filename) not built yet
+        self.requested = 0     # requests seen
+        self.built = 0         # requests covered by the last finished build
+        self.result = None     # response dict of the last finished build
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.build_daemon.handle(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+class _DaemonServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 64
+
+class BuildDaemon:
+    """Serves build requests for one output folder over a local socket (JSON lines).
+
+    Room shells, data: URIs and font subsets stay warm in this process, duplicate requests for a
+    room coalesce into one build, and each room's page is written by one build at a time.
+    build(state, out_dir, filename, room_number) writes a page; coerce(raw) -> (state, errors)
+    checks what a client sent (App3.py passes build_room_page and coerce_room_state).
+    """
+    def __init__(self, out_dir: Path, address: Tuple[str, int], build: Callable[..., Optional[Path]],
+                 coerce: Callable[[dict], Tuple[dict, list]], roots: Iterable[Path] = ()):
+        self.out_dir = out_dir.resolve()
+        self.build_page, self.coerce = build, coerce
+        self.roots = [self.out_dir] + [Path(r).resolve() for r in roots]  # client asset paths must lie under these
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.folder_id = hashlib.sha1(f"{self.out_dir}|{os.getpid()}|{time.time_ns()}".encode()).hexdigest()
+        replace_text(self.out_dir / DAEMON_ID_FILENAME, self.folder_id)
+        self.stats = {"requests": 0, "builds": 0}
+        self._lanes: dict = {}
+        self._lock = threading.Lock()
+        self.server = _DaemonServer(address, _DaemonHandler)
+        self.server.build_daemon = self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "out_dir": str(self.out_dir), "pid": os.getpid(), **self.stats}
+        if op != "build":
+            return {"ok": False, "error": f"unknown op {op!r}"}
+        if request.get("folder_id") != self.folder_id:
+            return {"ok": False, "fallback": True, "error": f"this daemon builds into {self.out_dir}"}
+        filename = str(request.get("filename", ""))
+        if not _page_name_re.fullmatch(filename):
+            return {"ok": False, "error": f"bad page name {filename!r}"}
+        state, errors = self.coerce(request.get("state") or {})
+        if errors:
+            return {"ok": False, "error": "; ".join(errors)}
+        outside = self.outside_roots(state)
+        if outside:
+            # The client can still read its own files: it builds this one locally
+            return {"ok": False, "fallback": True, "error": f"{outside} is outside the daemon's asset folders"}
+        return self.build(int(request["room"]), filename, state)
+
+    def outside_roots(self, state: dict) -> str:
+        """First local asset path in state that isn't under self.roots ('' when all are)."""
+        for key in DAEMON_PATH_KEYS:
+            value = str(state.get(key) or "").strip()
+            if not value or looks_like_url(value):
+                continue
+            path = Path(value) if Path(value).is_absolute() else self.out_dir / value
+            try:
+                path = path.resolve()
+            except OSError:
+                return f"{key} {value!r}"
+            if not any(path.is_relative_to(root) for root in self.roots):
+                return f"{key} {value!r}"
+        return ""
+
+    def build(self, room_number: int, filename: str, state: dict) -> dict:
+        with self._lock:
+            self.stats["requests"] += 1
+            lane = self._lanes.setdefault(room_number, _RoomLane())
+        with lane.cv:
+            lane.requested += 1
+            mine = lane.requested
+            lane.pending = (state, filename)
+            led = False
+            while lane.built < mine:
+                if lane.busy:
+                    lane.cv.wait()
+                    continue
+                lane.busy, led = True, True
+                (job_state, job_file), upto = lane.pending, lane.requested
+                lane.pending = None
+                lane.cv.release()
+                try:
+                    result = self._build(room_number, job_file, job_state)
+                finally:
+                    lane.cv.acquire()
+                lane.busy, lane.built, lane.result = False, upto, result
+                lane.cv.notify_all()
+            return {**lane.result, "coalesced": not led}
+
+    def _build(self, room_number: int, filename: str, state: dict) -> dict:
+        t0 = time.perf_counter()
+        try:
+            path = self.build_page(state, self.out_dir, filename, room_number)
+        except Exception as e:
+            return {"ok": False, "error": str(e), "budget": isinstance(e, PageBudgetError)}
+        with self._lock:
+            self.stats["builds"] += 1
+        return {"ok": True, "path": str(path) if path else None, "ms": (time.perf_counter() - t0) * 1000}
+
+_daemon_down_until: dict = {}  # address -> time before which we don't try it again
+_daemon_fallbacks: dict = {}   # reason -> builds that asked for the daemon but ran locally
+_daemon_fallbacks_lock = threading.Lock()
+
+def _note_fallback(reason: str):
+    with _daemon_fallbacks_lock:
+        _daemon_fallbacks[reason] = _daemon_fallbacks.get(reason, 0) + 1
+
+def daemon_fallbacks() -> dict:
+    """Copy of the local-fallback counts so far (diff two copies to count a run's)."""
+    with _daemon_fallbacks_lock:
+        return dict(_daemon_fallbacks)
+
+def daemon_request(address: Tuple[str, int], request: dict, timeout: float = DAEMON_BUILD_TIMEOUT) -> dict:
+    try:
+        with socket.create_connection(address, timeout=DAEMON_CONNECT_TIMEOUT) as sock:
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            line = sock.makefile("rb").readline()
+    except OSError as e:
+        raise DaemonUnavailable(f"{address[0]}:{address[1]}: {e}") from None
+    if not line:
+        raise DaemonUnavailable(f"{address[0]}:{address[1]} closed the connection")
+    return json.loads(line)
+
+def daemon_build(address: Tuple[str, int], state: dict, out_dir: Path, filename: str, room_number: int) -> Optional[dict]:
+    """Build one page on the daemon at address: its response ({"path": ...}), or None when this
+    build should run locally (daemon down / declined, counted in daemon_fallbacks)."""
+    if _daemon_down_until.get(address, 0) > time.time():
+        _note_fallback(f"{address[0]}:{address[1]} unreachable (retrying every {DAEMON_RETRY_SECONDS}s)")
+        return None
+    try:
+        response = daemon_request(address, {"op": "build", "room": room_number, "filename": filename,
+                                            "folder_id": daemon_folder_id(out_dir), "state": state})
+    except DaemonUnavailable as e:
+        _daemon_down_until[address] = time.time() + DAEMON_RETRY_SECONDS
+        _note_fallback(str(e))
+        return None
+    if response.get("ok"):
+        return response
+    if response.get("budget"):
+        raise PageBudgetError(response["error"])
+    if not response.get("fallback"):
+        raise RuntimeError(response.get("error", "build failed"))
+    _note_fallback(response.get("error", "daemon declined"))
+    return None
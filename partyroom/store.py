@@ -0,0 +1,157 @@
+"""SQLite state + party history: current room states, named presets, build history and playback telemetry."""
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .util import VIDEO_OPTIONS, page_text, state_int
+
+STORE_FILENAME = "partyrooms.db"
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS rooms (
+  room INTEGER PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS presets (
+  name TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS history (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  room INTEGER NOT NULL, built_at REAL NOT NULL,  -- when the page was built / went live (not the party start)
+  title TEXT, inner TEXT, video TEXT, bg TEXT, logo TEXT, font TEXT,
+  build_ms REAL, path TEXT, state TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS history_room_time ON history (room, built_at);
+CREATE INDEX IF NOT EXISTS history_time ON history (built_at);
+CREATE INDEX IF NOT EXISTS history_video_time ON history (video, built_at);
+CREATE TABLE IF NOT EXISTS telemetry (
+  room INTEGER NOT NULL, at REAL NOT NULL, combo TEXT, display TEXT,
+  metric TEXT NOT NULL, value REAL, detail TEXT);
+CREATE INDEX IF NOT EXISTS telemetry_room_time ON telemetry (room, at);
+"""
+
+class PartyStore:
+    """
+    Current room state, named presets and a per-party build history in SQLite.
+    Saves are single-row upserts, skipped when the row hasn't changed.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(STORE_SCHEMA)
+        if "updated" not in {r["name"] for r in self.db.execute("PRAGMA table_info(settings)")}:
+            self.db.execute("ALTER TABLE settings ADD COLUMN updated REAL NOT NULL DEFAULT 0")  # pre-timestamp stores
+        self.lock = threading.Lock()
+        self._saved: dict = {}  # room -> state JSON last written
+
+    def close(self):
+        self.db.close()
+
+    # ---- settings / rooms
+    def get_setting(self, key: str, default: str = "", newer_than: float = -1) -> str:
+        row = self.db.execute("SELECT value FROM settings WHERE key = ? AND updated > ?", (key, newer_than)).fetchone()
+        return row["value"] if row else default
+
+    def set_setting(self, key: str, value: str):
+        """Upsert; the timestamp only moves when the value actually changes."""
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO settings (key, value, updated) VALUES (?, ?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated "
+                            "WHERE settings.value != excluded.value", (key, value, time.time()))
+
+    def load_rooms(self, newer_than: float = -1) -> dict:
+        """Saved room states; newer_than skips rows last written before that time (e.g. config.ini's mtime)."""
+        rows = self.db.execute("SELECT room, state FROM rooms WHERE updated > ?", (newer_than,)).fetchall()
+        self._saved.update({r["room"]: r["state"] for r in rows})
+        return {r["room"]: json.loads(r["state"]) for r in rows}
+
+    def save_room(self, room: int, state: dict) -> bool:
+        """Upsert one room; returns False (no write) when nothing changed."""
+        raw = json.dumps(state, sort_keys=True)
+        if self._saved.get(room) == raw:
+            return False
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO rooms (room, state, updated) VALUES (?, ?, ?) "
+                            "ON CONFLICT(room) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                            (room, raw, time.time()))
+        self._saved[room] = raw
+        return True
+
+    # ---- presets
+    def save_preset(self, name: str, state: dict):
+        style = {k: v for k, v in state.items() if k not in ("title", "inner", "enabled", "start_at")}
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO presets (name, state, updated) VALUES (?, ?, ?) "
+                            "ON CONFLICT(name) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                            (name, json.dumps(style, sort_keys=True), time.time()))
+
+    def load_preset(self, name: str) -> Optional[dict]:
+        row = self.db.execute("SELECT state FROM presets WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["state"]) if row else None
+
+    def preset_names(self) -> list:
+        return [r["name"] for r in self.db.execute("SELECT name FROM presets ORDER BY name")]
+
+    # ---- history
+    def record_build(self, room: int, state: dict, path: Optional[Path], build_ms: float) -> int:
+        """History row stamped with the build / go-live time, so parties_near finds what was on screen."""
+        title, inner = page_text(state)
+        font = state.get("inner_font_local") or state.get("inner_font_choice", "")
+        video = state.get("video_override") or VIDEO_OPTIONS.get(state_int(state.get("video", 1), 1), ("movie.mp4", ""))[0]
+        with self.lock, self.db:
+            cur = self.db.execute(
+                "INSERT INTO history (room, built_at, title, inner, video, bg, logo, font, build_ms, path, state) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (room, time.time(), title, inner, video, state.get("bg", ""),
+                 state.get("logo_path", ""), font, build_ms, str(path or ""), json.dumps(state, sort_keys=True)))
+            return cur.lastrowid
+
+    def history_entry(self, entry_id: int) -> Optional[dict]:
+        row = self.db.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+    def parties_near(self, when: datetime, room: Optional[int] = None, window_minutes: int = 60) -> list:
+        """Builds within +/- window of when (e.g. last Saturday 15:00), closest first."""
+        t = when.timestamp()
+        sql = "SELECT * FROM history WHERE built_at BETWEEN ? AND ?"
+        args = [t - window_minutes * 60, t + window_minutes * 60]
+        if room is not None:
+            sql += " AND room = ?"
+            args.append(room)
+        sql += " ORDER BY ABS(built_at - ?) LIMIT 20"
+        args.append(t)
+        return [dict(r) for r in self.db.execute(sql, args)]
+
+    # ---- playback telemetry
+    def record_telemetry(self, batch: dict) -> int:
+        """Store one posted batch ({room, combo, display, events: [{m, v, x, t}]}); returns rows added."""
+        room = int(batch["room"])
+        combo, display = str(batch.get("combo", ""))[:300], str(batch.get("display", ""))[:40]
+        now = time.time()  # receipt time: room PC clocks aren't trusted
+        rows = [(room, now, combo, display,
+                 str(e["m"])[:40], float(e.get("v", 0)), str(e.get("x", ""))[:300])
+                for e in batch.get("events", [])[:1000]]
+        with self.lock, self.db:
+            self.db.executemany("INSERT INTO telemetry (room, at, combo, display, metric, value, detail) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def telemetry_report(self, since: float, room: Optional[int] = None) -> list:
+        """Per room / combination / display: count, mean and max of every metric."""
+        sql = ("SELECT room, combo, display, metric, COUNT(*) AS n, AVG(value) AS mean, MAX(value) AS max, "
+               "SUM(value) AS total FROM telemetry WHERE at >= ?" + (" AND room = ?" if room else "") +
+               " GROUP BY room, combo, display, metric ORDER BY room, combo, display, metric")
+        return [dict(r) for r in self.db.execute(sql, (since, room) if room else (since,))]
+
+    def telemetry_failures(self, since: float, room: Optional[int] = None, limit: int = 20) -> list:
+        sql = ("SELECT room, detail, COUNT(*) AS n FROM telemetry WHERE metric = 'asset_error' AND at >= ?"
+               + (" AND room = ?" if room else "") + " GROUP BY room, detail ORDER BY n DESC LIMIT ?")
+        return [dict(r) for r in self.db.execute(sql, (since, room, limit) if room else (since, limit))]
+
+    def most_used_videos(self, since: float, limit: int = 10) -> list:
+        return [(r["video"], r["n"]) for r in self.db.execute(
+            "SELECT video, COUNT(*) AS n FROM history WHERE built_at >= ? GROUP BY video ORDER BY n DESC LIMIT ?",
+            (since, limit))]
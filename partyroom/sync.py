@@ -0,0 +1,235 @@
+"""Publishing the output folder to display machines (delta sync) and single-room zip bundles."""
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Tuple
+
+from .caches import ASSET_CACHE_DIRNAME, media_publish_name
+from .util import FONT_STORE_DIRNAME, file_sha256, replace_text, size_text
+
+# ---------- Publish to display machines (delta sync of the output folder) ----------
+SYNC_MANIFEST = ".partyroom-sync.json"   # on each target: sha256/size/mtime of what we published there
+SYNC_HASH_CACHE = ".sync-hashes.json"    # in the output folder: sha256 by (size, mtime) so unchanged videos aren't re-read
+SYNC_PAGES = ("partyroom*.html", "partyroom*_kiosk.js")  # top of the output folder: pages, kiosk shells + beacons
+SYNC_DIRS = (FONT_STORE_DIRNAME, ASSET_CACHE_DIRNAME)     # published whole
+SYNC_STAGING_DIRNAME = ".publish"        # in the output folder: pages rewritten for the displays
+SYNC_WORKERS = 8                         # targets published at once
+
+def sync_targets(config_value: str = "") -> list:
+    """[general] sync_targets (or PARTYROOM_SYNC_TARGETS): folders / mounted shares separated by ';' or newlines."""
+    text = os.environ.get("PARTYROOM_SYNC_TARGETS") or config_value or ""
+    return [Path(t.strip()) for t in re.split(r"[;\n]", text) if t.strip()]
+
+_published_pages: dict = {}  # page path -> ((size, mtime_ns), path to publish, referenced assets)
+
+def publish_page(page: Path, out_dir: Path) -> Tuple[Path, dict]:
+    """(file to publish for page, rel -> Path of the local assets it references). Pages with file:///
+    references are published as a copy rewritten like an export bundle: the displays don't have
+    the builder's paths, so files outside out_dir go to assets/."""
+    st = page.stat()
+    cached = _published_pages.get(page)
+    if cached and cached[0] == (st.st_size, st.st_mtime_ns) and cached[1].exists():
+        return cached[1], cached[2]
+    html = page.read_text(encoding="utf-8")
+    published, refs = export_bundle_files(html, out_dir)
+    target = page
+    if published != html:
+        target = out_dir / SYNC_STAGING_DIRNAME / page.name
+        target.parent.mkdir(exist_ok=True)
+        try:
+            same = target.read_text(encoding="utf-8") == published
+        except OSError:
+            same = False
+        if not same:  # keep the copy's mtime (and the hash cache) when nothing changed
+            replace_text(target, published)
+    _published_pages[page] = ((st.st_size, st.st_mtime_ns), target, refs)
+    return target, refs
+
+def publish_files(out_dir: Path) -> dict:
+    """relative posix path -> Path of what the displays need: pages and kiosk shell files, fonts/,
+    asset-cache/ and every local asset a page references. Nothing else in the folder is published."""
+    files, assets = {}, {}
+    for path in sorted(out_dir.iterdir()):
+        if not path.is_file() or not any(fnmatch.fnmatch(path.name, x) for x in SYNC_PAGES):
+            continue
+        if path.suffix == ".html":
+            files[path.name], refs = publish_page(path, out_dir)
+            assets.update(refs)
+        else:
+            files[path.name] = path
+    for dirname in SYNC_DIRS:
+        for root, dirs, names in os.walk(out_dir / dirname):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in names:
+                if not name.startswith(".") and not name.endswith(".tmp"):
+                    path = Path(root) / name
+                    files[path.relative_to(out_dir).as_posix()] = path
+    for rel, path in assets.items():
+        files.setdefault(rel, path)
+    return files
+
+def source_manifest(out_dir: Path, files: dict) -> dict:
+    """rel -> {sha256, size}; hashes are reused while a file's size and mtime are unchanged."""
+    cache_path = out_dir / SYNC_HASH_CACHE
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+    manifest, fresh = {}, {}
+    for rel, path in files.items():
+        st = path.stat()
+        cached = cache.get(rel)
+        digest = cached[2] if cached and cached[:2] == [st.st_size, st.st_mtime_ns] else file_sha256(path)
+        fresh[rel] = [st.st_size, st.st_mtime_ns, digest]
+        manifest[rel] = {"sha256": digest, "size": st.st_size}
+    if fresh != cache:
+        replace_text(cache_path, json.dumps(fresh))
+    return manifest
+
+def _publish_order(rel: str) -> tuple:
+    # assets first, then pages, kiosk beacons last: a display never follows a link to a file not there yet
+    return (2 if rel.endswith("_kiosk.js") else 1 if rel.endswith(".html") else 0, rel)
+
+def sync_target(out_dir: Path, files: dict, manifest: dict, target: Path, prune: bool = True) -> dict:
+    """Bring one target up to date: copy only files whose hash differs from what we last published
+    there (or that were changed on the target since), each via a temp file + rename."""
+    t0 = time.perf_counter()
+    result = {"target": str(target), "copied": 0, "bytes": 0, "unchanged": 0, "deleted": 0, "errors": []}
+    try:
+        target.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        result["errors"].append(str(e))
+        result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return result
+    try:
+        published = json.loads((target / SYNC_MANIFEST).read_text(encoding="utf-8")).get("files", {})
+    except (OSError, ValueError):
+        published = {}
+    current = {}
+    for rel in sorted(manifest, key=_publish_order):
+        want, dest = manifest[rel], target / rel
+        prev = published.get(rel)
+        try:
+            st = dest.stat()
+        except OSError:
+            st = None
+        if st and st.st_size == want["size"] and (
+                (prev and prev["sha256"] == want["sha256"] and [prev["size"], prev["mtime_ns"]] == [st.st_size, st.st_mtime_ns])
+                or (not prev and file_sha256(dest) == want["sha256"])):  # first sync over a hand copy
+            current[rel] = {**want, "mtime_ns": st.st_mtime_ns}
+            result["unchanged"] += 1
+            continue
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(files[rel], tmp)
+            os.replace(tmp, dest)
+            current[rel] = {**want, "mtime_ns": dest.stat().st_mtime_ns}
+            result["copied"] += 1
+            result["bytes"] += want["size"]
+        except OSError as e:
+            result["errors"].append(f"{rel}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+    for rel in set(published) - set(manifest):
+        if not prune:
+            current[rel] = published[rel]
+            continue
+        try:
+            (target / rel).unlink()
+            result["deleted"] += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current[rel] = published[rel]
+            result["errors"].append(f"{rel}: {e}")
+    try:
+        replace_text(target / SYNC_MANIFEST, json.dumps({"source": str(out_dir), "synced": time.time(), "files": current}, indent=1))
+    except OSError as e:
+        result["errors"].append(f"{SYNC_MANIFEST}: {e}")
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+def sync_output(out_dir: Path, targets: list, prune: bool = True) -> list:
+    """Publish out_dir to every target in parallel; one result dict per target."""
+    files = publish_files(out_dir)
+    manifest = source_manifest(out_dir, files)
+    targets = [t for t in targets if Path(t).resolve() != out_dir.resolve()]
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=min(SYNC_WORKERS, len(targets)), thread_name_prefix="sync") as pool:
+        return list(pool.map(lambda t: sync_target(out_dir, files, manifest, Path(t), prune), targets))
+
+def sync_line(result: dict) -> str:
+    text = (f"{result['target']}: {result['copied']} copied ({size_text(result['bytes'])}), "
+            f"{result['unchanged']} unchanged, {result['deleted']} removed in {result['ms']:.0f} ms")
+    return text + "".join(f"\n  ! {e}" for e in result["errors"][:5]) + (
+        f"\n  ! ... {len(result['errors']) - 5} more" if len(result["errors"]) > 5 else "")
+
+# ---------- Single-file room export (zip bundle for machines we can't sync to) ----------
+EXPORT_STORED_EXTS = {".mp4", ".m4v", ".webm", ".mov", ".mkv", ".gif", ".png", ".jpg", ".jpeg", ".webp",
+                      ".avif", ".woff", ".woff2", ".zip", ".gz", ".mp3", ".m4a"}  # already compressed: ZIP_STORED
+EXPORT_VIDEO_EXTS = {".mp4", ".m4v", ".webm", ".mov", ".mkv"}
+EXPORT_ASSET_EXTS = EXPORT_STORED_EXTS | {".css", ".ttf", ".otf", ".svg", ".js", ".json"}
+EXPORT_CHUNK = 1024 * 1024
+_file_uri_re = re.compile(r"file:///[^\"'\s)<>]+")
+_relative_ref_re = re.compile(r"""(?:src=|href=|url\()\s*["']?([^"'()\s<>:]+)|["']([^"'()\s<>:]+)["']""")
+
+def zip_stream(zf: zipfile.ZipFile, src: Path, arcname: str) -> dict:
+    """Copy one file into the archive chunk by chunk (constant memory); the zip's own CRC-32 goes in
+    the manifest, so there is no second hashing pass over the video."""
+    st = src.stat()
+    info = zipfile.ZipInfo(arcname, time.localtime(max(st.st_mtime, 315619200))[:6])  # zip dates start in 1980
+    info.compress_type = zipfile.ZIP_STORED if src.suffix.lower() in EXPORT_STORED_EXTS else zipfile.ZIP_DEFLATED
+    info.file_size = st.st_size  # lets zipfile switch to zip64 up front for >4 GB videos
+    with open(src, "rb") as f, zf.open(info, "w") as dst:
+        shutil.copyfileobj(f, dst, EXPORT_CHUNK)
+    return {"path": arcname, "size": info.file_size, "crc32": f"{info.CRC:08x}",
+            "stored": info.compress_type == zipfile.ZIP_STORED}
+
+def export_bundle_files(html: str, out_dir: Path) -> Tuple[str, dict]:
+    """(page with bundle-relative references, arcname -> source Path). Local file:/// assets move to
+    assets/ (or keep their place when under out_dir); relative references that exist are kept as-is."""
+    files: dict = {}
+
+    def arcname_for(path: Path) -> str:
+        try:
+            name = path.resolve().relative_to(out_dir.resolve()).as_posix()
+        except ValueError:
+            base = media_publish_name(path)
+            name = f"assets/{base}"
+            if name in files and files[name].resolve() != path.resolve():
+                name = f"assets/{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}-{base}"
+        files[name] = path
+        return name
+
+    def rewrite(m) -> str:
+        path = Path(urllib.request.url2pathname(urllib.parse.urlparse(m.group(0)).path))
+        return urllib.parse.quote(arcname_for(path)) if path.is_file() else m.group(0)
+
+    html = _file_uri_re.sub(rewrite, html)
+    for m in _relative_ref_re.finditer(html):
+        ref = urllib.parse.unquote(m.group(1) or m.group(2) or "")
+        if (Path(ref).suffix.lower() in EXPORT_ASSET_EXTS and not ref.startswith(("/", "data")) and ".." not in ref
+                and (out_dir / ref).is_file()):
+            files.setdefault(ref, out_dir / ref)
+    return html, files
+
+def export_line(manifest: dict) -> str:
+    size = sum(f["size"] for f in manifest["files"])
+    text = (f"Room {manifest['room']}: {manifest['archive']} ({len(manifest['files']) + 1} files, "
+            f"{size_text(size)} of assets, {manifest['seconds']:.1f}s)")
+    missing = [f"{n['path']} ({n['reason']})" for n in manifest["not_included"]]
+    return text + (f"\n  not included: {', '.join(missing)}" if missing else "")
@@ -0,0 +1,60 @@
+"""Small helpers shared by App3.py and the partyroom modules: room state values, paths, atomic writes."""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+FONT_STORE_DIRNAME = "fonts"                # under the output folder: the local font store
+
+VIDEO_OPTIONS = {
+    1: ("movie.mp4",   "Fireworks"),
+    2: ("fortnite.mp4","Fortnite"),
+    3: ("harry.mp4",   "Harry Potter"),
+    4: ("pokemon.mp4", "Pokemon"),
+    5: ("minecraft.mp4","Minecraft"),
+}
+
+def looks_like_url(path_str: str) -> bool:
+    s = (path_str or "").lower().strip()
+    return s.startswith("http://") or s.startswith("https://")
+
+def state_bool(v) -> bool:
+    return str(v).lower() == "true"
+
+def state_int(v, default: int = 0) -> int:
+    try:
+        return int(str(v).strip() or default)
+    except Exception:
+        return default
+
+def existing_or_url(path_str: str, out_dir: Path) -> Optional[str]:
+    """path_str if it is a URL or an existing file (absolute or relative to out_dir), else None."""
+    path_str = (path_str or "").strip()
+    if not path_str:
+        return None
+    if looks_like_url(path_str) or Path(path_str).exists() or (out_dir / path_str).exists():
+        return path_str
+    return None
+
+def page_text(state: dict) -> Tuple[str, str]:
+    return (state.get("title") or "Happy Birthday").strip(), (state.get("inner") or "").strip()
+
+def replace_text(path: Path, text: str):
+    """Write via a temp file + rename so kiosks (or another PC) never read a half-written page."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+def size_text(n: float) -> str:
+    return f"{n / 1024 / 1024:.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} KB"
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PageBudgetError(ValueError):
+    """The page is over its block budget and was not written."""
@@ -0,0 +1,44 @@
+import itertools
+
+from App3 import BENCH_MIN_RUNS, bench_compare, bench_run
+
+
+def case(ms, iqr_ms=0.0, peak_kb=100.0):
+    return {"ms": ms, "iqr_ms": iqr_ms, "best_ms": ms, "peak_kb": peak_kb, "runs": 20}
+
+
+def test_slower_median_beyond_tolerance_and_spread_regresses():
+    problems = bench_compare({"rooms/3/warm": case(40.0, 2.0)}, {"rooms/3/warm": case(20.0, 2.0)}, 0.25, 0.10)
+    assert len(problems) == 1 and problems[0].startswith("rooms/3/warm: median 20.000 -> 40.000 ms")
+
+
+def test_slowdown_within_the_spread_of_noisy_runs_is_not_flagged():
+    # +45% on the median, but both runs scatter by more than the difference
+    assert bench_compare({"rooms/3/warm": case(29.0, 6.0)}, {"rooms/3/warm": case(20.0, 5.0)}, 0.25, 0.10) == []
+
+
+def test_slowdown_within_tolerance_is_not_flagged():
+    assert bench_compare({"css/M/none": case(1.2)}, {"css/M/none": case(1.0)}, 0.25, 0.10) == []
+
+
+def test_tiny_cases_need_more_than_timer_noise():
+    assert bench_compare({"css/M/none": case(0.004)}, {"css/M/none": case(0.002)}, 0.25, 0.10) == []
+
+
+def test_baseline_without_an_iqr_still_compares():
+    old = {"ms": 20.0, "best_ms": 18.0, "peak_kb": 100.0, "runs": 5}
+    assert bench_compare({"rooms/1/warm": case(30.0, 1.0)}, {"rooms/1/warm": old}, 0.25, 0.10)
+    assert bench_compare({"rooms/1/warm": case(21.0, 1.0)}, {"rooms/1/warm": old}, 0.25, 0.10) == []
+
+
+def test_memory_growth_regresses_and_unknown_cases_are_skipped():
+    problems = bench_compare({"a": case(1.0, peak_kb=2000.0), "new": case(99.0)},
+                             {"a": case(1.0, peak_kb=1000.0)}, 0.25, 0.10)
+    assert problems == ["a: peak 1000 -> 2000 KB"]
+
+
+def test_bench_run_times_every_case_at_least_the_minimum_runs():
+    calls = itertools.count()
+    r = bench_run(lambda: None, lambda: next(calls))
+    assert r["runs"] >= BENCH_MIN_RUNS
+    assert r["iqr_ms"] >= 0 and r["best_ms"] <= r["ms"]
@@ -0,0 +1,45 @@
+import pytest
+
+from App3 import ROOM_DEFAULTS, booking_state
+
+BASE = {1: dict(ROOM_DEFAULTS), 2: dict(ROOM_DEFAULTS, title="Welcome", color="Blue", stop_minutes=20)}
+
+
+def test_columns_map_onto_the_rooms_configured_state():
+    room, state = booking_state({"Room": "Room 2", "Guest Name": " Mia ", "Theme": "red", "Timer": "15",
+                                 "Booking ID": "B-77", "Email": "x@example.com"}, BASE)
+    assert room == 2
+    assert state["inner"] == "Mia"
+    assert state["color"] == "Red"
+    assert state["stop_minutes"] == 15
+    assert state["title"] == "Welcome"
+    assert state["enabled"] is True
+    assert "booking_id" not in state and "email" not in state
+
+
+def test_blank_cells_keep_the_configured_value():
+    _, state = booking_state({"room": "2", "name": "Leo", "theme": "", "timer": ""}, BASE)
+    assert state["color"] == "Blue"
+    assert state["stop_minutes"] == 20
+
+
+def test_video_by_number_label_or_path():
+    assert booking_state({"room": "1", "video": "Minecraft"}, BASE)[1]["video"] == 5
+    assert booking_state({"room": "1", "video": "3"}, BASE)[1]["video"] == 3
+    _, state = booking_state({"room": "1", "video": "D:/videos/custom.mp4"}, BASE)
+    assert state["video_override"] == "D:/videos/custom.mp4"
+
+
+def test_unknown_room_starts_from_the_first_configured_one():
+    room, state = booking_state({"room": "7", "name": "Ava"}, BASE)
+    assert room == 7 and state["title"] == ROOM_DEFAULTS["title"]
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"name": "No Room"}, "missing room number"),
+    ({"room": "1", "timer": "soon"}, "stop_minutes"),
+    ({"room": "1", "theme": "purple"}, "color"),
+])
+def test_bad_rows_are_rejected(row, message):
+    with pytest.raises(ValueError, match=message):
+        booking_state(row, BASE)
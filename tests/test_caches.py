@@ -0,0 +1,157 @@
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+import partyroom.caches as caches
+from partyroom.caches import AssetCache, FileCache
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        site = self.server.site
+        site["requests"].append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in site["files"]:
+            self.send_error(404)
+            return
+        body, etag = site["files"][self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.site = {"files": {"/logo.png": (b"png-1", '"v1"')}, "requests": []}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.site["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server.site
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_then_serve_from_disk(tmp_path, site):
+    cache = AssetCache(tmp_path / "cache")
+    path = cache.fetch(site["url"] + "/logo.png")
+    assert path.read_bytes() == b"png-1" and path.suffix == ".png"
+    assert cache.fetch(site["url"] + "/logo.png") == path
+    assert len(site["requests"]) == 1  # fresh: no second request
+
+
+def test_revalidation_304_keeps_the_copy(tmp_path, site, monkeypatch):
+    cache = AssetCache(tmp_path / "cache")
+    path = cache.fetch(site["url"] + "/logo.png")
+    monkeypatch.setattr(caches, "ASSET_REVALIDATE_SECONDS", 0)
+    assert cache.fetch(site["url"] + "/logo.png") == path
+    assert site["requests"][-1] == ("/logo.png", '"v1"')
+    assert path.read_bytes() == b"png-1"
+
+
+def test_revalidation_picks_up_a_changed_asset(tmp_path, site, monkeypatch):
+    cache = AssetCache(tmp_path / "cache")
+    cache.fetch(site["url"] + "/logo.png")
+    site["files"]["/logo.png"] = (b"png-2", '"v2"')
+    monkeypatch.setattr(caches, "ASSET_REVALIDATE_SECONDS", 0)
+    assert cache.fetch(site["url"] + "/logo.png").read_bytes() == b"png-2"
+
+
+def test_offline_serves_the_stale_copy(tmp_path, site, monkeypatch):
+    url = site["url"] + "/logo.png"
+    cache = AssetCache(tmp_path / "cache")
+    path = cache.fetch(url)
+    monkeypatch.setattr(caches, "ASSET_REVALIDATE_SECONDS", 0)
+    del site["files"]["/logo.png"]  # server error with a copy on disk
+    assert cache.fetch(url) == path
+    dead = "http://127.0.0.1:9/logo.png"  # nothing listens on the discard port
+    cache.index[dead] = dict(cache.index[url])
+    assert cache.fetch(dead) == path
+
+
+def test_missing_without_a_copy(tmp_path, site):
+    cache = AssetCache(tmp_path / "cache")
+    assert cache.fetch(site["url"] + "/nope.png") is None
+    assert cache.fetch("http://127.0.0.1:9/logo.png") is None
+    assert cache.index == {}
+
+
+def test_another_process_fetch_is_reused(tmp_path, site):
+    url = site["url"] + "/logo.png"
+    first, second = AssetCache(tmp_path / "cache"), AssetCache(tmp_path / "cache")
+    path = first.fetch(url)
+    assert second.fetch(url) == path
+    assert len(site["requests"]) == 1
+
+
+def put(cache, key, size=100):
+    """Add a key the way fetch / copy do: file first, then the index entry."""
+    name = f"{len(cache.index)}-{key}.bin"
+    cache.root.mkdir(parents=True, exist_ok=True)
+    (cache.root / name).write_bytes(b"x" * size)
+    with cache.lock:
+        cache._touch(key, {"file": name, "size": size})
+        cache._save(keep=key)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FileCache(tmp_path, 250)
+    for key in "abc":
+        put(cache, key)
+    assert sorted(cache.index) == ["b", "c"]
+    assert len(list(tmp_path.glob("*.bin"))) == 2
+
+
+def test_pinned_keys_are_not_evicted(tmp_path):
+    cache = FileCache(tmp_path, 250)
+    put(cache, "a")
+    cache.pin("a", time.time() + 60)
+    put(cache, "b")
+    put(cache, "c")
+    assert sorted(cache.index) == ["a", "c"]
+
+
+def test_expired_pins_are_dropped(tmp_path):
+    cache = FileCache(tmp_path, 250)
+    put(cache, "a")
+    cache.pin("a", time.time() - 1)
+    put(cache, "b")
+    put(cache, "c")
+    assert sorted(cache.index) == ["b", "c"]
+    assert json.loads((tmp_path / "index.json").read_text())["pins"] == {}
+
+
+def test_the_new_entry_stays_even_when_over_budget(tmp_path):
+    cache = FileCache(tmp_path, 50)
+    put(cache, "a")
+    assert list(cache.index) == ["a"]
+
+
+def test_processes_share_entries_and_pins(tmp_path):
+    gui, daemon = FileCache(tmp_path, 250), FileCache(tmp_path, 250)
+    put(gui, "a")
+    gui.pin("a", time.time() + 60)
+    put(daemon, "b")
+    put(daemon, "c")  # over budget: the daemon must honour the GUI's pin
+    assert sorted(daemon.index) == ["a", "c"]
+    put(gui, "d")
+    assert sorted(gui.index) == ["a", "d"]
+    assert sorted(json.loads((tmp_path / "index.json").read_text())["entries"]) == ["a", "d"]
+
+
+def test_reads_an_index_from_before_pins_were_saved(tmp_path):
+    (tmp_path / "index.json").write_text(json.dumps({"a": {"file": "a.bin", "size": 1, "used": 0}}))
+    cache = FileCache(tmp_path, 250)
+    assert cache.index == {"a": {"file": "a.bin", "size": 1, "used": 0}} and cache.pins == {}
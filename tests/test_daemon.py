@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from partyroom.daemon import BuildDaemon, daemon_build
+
+
+class SlowBuild:
+    """Build callback that holds its first build until release() and records what it built."""
+    def __init__(self):
+        self.built = []
+        self.gate = threading.Event()
+
+    def __call__(self, state, out_dir, filename, room_number):
+        self.built.append(state["inner"])
+        if len(self.built) == 1:
+            self.gate.wait(10)
+        path = out_dir / filename
+        path.write_text(state["inner"], encoding="utf-8")
+        return path
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    build = SlowBuild()
+    d = BuildDaemon(tmp_path / "out", ("127.0.0.1", 0), build, lambda raw: (dict(raw), []))
+    thread = threading.Thread(target=d.serve_forever, daemon=True)
+    thread.start()
+    yield d, build
+    build.gate.set()
+    d.shutdown()
+
+
+def wait_until(check, timeout=10.0):
+    deadline = time.time() + timeout
+    while not check():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_requests_during_a_build_share_the_next_one(daemon):
+    d, build = daemon
+    results = {}
+
+    def request(name):
+        results[name] = d.build(1, "partyroom1.html", {"inner": name})
+    first = threading.Thread(target=request, args=("Ava",))
+    first.start()
+    wait_until(lambda: build.built == ["Ava"])
+    later = [threading.Thread(target=request, args=(name,)) for name in ("Mia", "Kai", "Zoe")]
+    for t in later:
+        t.start()
+    wait_until(lambda: d._lanes[1].requested == 4)
+    build.gate.set()
+    for t in [first] + later:
+        t.join(10)
+    assert len(build.built) == 2 and d.stats == {"requests": 4, "builds": 2}
+    newest = build.built[1]
+    assert all(results[name]["path"] == results[newest]["path"] for name in ("Mia", "Kai", "Zoe"))
+    assert (d.out_dir / "partyroom1.html").read_text(encoding="utf-8") == newest
+    assert sorted(r["coalesced"] for r in results.values()) == [False, False, True, True]
+
+
+def test_other_rooms_are_not_held_up(daemon):
+    d, build = daemon
+    first = threading.Thread(target=d.build, args=(1, "partyroom1.html", {"inner": "Ava"}))
+    first.start()
+    wait_until(lambda: build.built == ["Ava"])
+    assert d.build(2, "partyroom2.html", {"inner": "Mia"})["ok"]
+    build.gate.set()
+    first.join(10)
+
+
+def test_clients_build_through_the_socket_or_fall_back(daemon, tmp_path):
+    d, build = daemon
+    build.gate.set()
+    address = d.server.server_address[:2]
+    response = daemon_build(address, {"inner": "Ava"}, d.out_dir, "partyroom1.html", 1)
+    assert response["ok"] and response["path"] == str(d.out_dir / "partyroom1.html")
+    assert daemon_build(address, {"inner": "Ava"}, tmp_path / "elsewhere", "partyroom1.html", 1) is None
+    outside = {"inner": "Ava", "bg": str(tmp_path / "bg.png")}
+    assert daemon_build(address, outside, d.out_dir, "partyroom1.html", 1) is None
+    assert build.built == ["Ava"]
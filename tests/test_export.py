@@ -0,0 +1,69 @@
+import zipfile
+import zlib
+
+from App3 import ROOM_DEFAULTS, export_room
+from partyroom.sync import export_bundle_files, export_line, zip_stream
+
+
+def test_file_uris_become_bundle_paths(tmp_path):
+    out, share = tmp_path / "out", tmp_path / "share dir"
+    (out / "fonts").mkdir(parents=True)
+    (share / "b").mkdir(parents=True)
+    (out / "fonts" / "face.woff2").write_bytes(b"f")
+    (share / "party video.mp4").write_bytes(b"v")
+    (share / "logo.png").write_bytes(b"1")
+    (share / "b" / "logo.png").write_bytes(b"2")
+    html = (f"<video src='{(share / 'party video.mp4').as_uri()}'></video>"
+            f"<img src=\"{(share / 'logo.png').as_uri()}\"><img src=\"{(share / 'b' / 'logo.png').as_uri()}\">"
+            f"<style>url({(out / 'fonts' / 'face.woff2').as_uri()})</style>"
+            f"<img src='{(share / 'missing.png').as_uri()}'>")
+    page, files = export_bundle_files(html, out)
+    assert "assets/party%20video.mp4" in page
+    assert "url(fonts/face.woff2)" in page
+    assert (share / "missing.png").as_uri() in page  # nothing to bundle: left as it was
+    assert files["assets/party video.mp4"] == share / "party video.mp4"
+    assert files["assets/logo.png"] == share / "logo.png"
+    renamed = [name for name in files if name.endswith("-logo.png")]
+    assert len(renamed) == 1 and files[renamed[0]] == share / "b" / "logo.png"
+    assert "file:///" not in page.replace((share / "missing.png").as_uri(), "")
+
+
+def test_relative_references_that_exist_are_bundled(tmp_path):
+    (tmp_path / "lte.gif").write_bytes(b"g")
+    (tmp_path / "Style.css").write_text("x", encoding="utf-8")
+    html = ("<img src='lte.gif'><link href=\"Style.css\"><img src='gone.png'>"
+            "<img src='../outside.png'><img src='data:image/png;base64,AA'>")
+    page, files = export_bundle_files(html, tmp_path)
+    assert page == html
+    assert files == {"lte.gif": tmp_path / "lte.gif", "Style.css": tmp_path / "Style.css"}
+
+
+def test_zip_stream_stores_media_and_deflates_text(tmp_path):
+    video, css = tmp_path / "v.mp4", tmp_path / "s.css"
+    video.write_bytes(b"\x00" * 5000)
+    css.write_text("body{}" * 500, encoding="utf-8")
+    with zipfile.ZipFile(tmp_path / "r.zip", "w") as zf:
+        entries = [zip_stream(zf, video, "v.mp4"), zip_stream(zf, css, "assets/s.css")]
+    assert [e["stored"] for e in entries] == [True, False]
+    assert entries[0]["crc32"] == f"{zlib.crc32(video.read_bytes()):08x}"
+    with zipfile.ZipFile(tmp_path / "r.zip") as zf:
+        assert zf.testzip() is None
+        assert zf.read("assets/s.css") == css.read_bytes()
+        assert zf.getinfo("v.mp4").compress_type == zipfile.ZIP_STORED
+
+
+def test_export_lists_a_video_it_could_not_bundle(tmp_path):
+    (tmp_path / "movie.mp4").write_bytes(b"v")
+    state = dict(ROOM_DEFAULTS, inner="Mia", video_override=str(tmp_path / "share" / "gone.mp4"))
+    manifest = export_room(state, tmp_path, 1, tmp_path / "room1.zip")
+    assert manifest["not_included"] == [{"path": str(tmp_path / "share" / "gone.mp4"), "reason": "video not found"}]
+    assert "gone.mp4 (video not found)" in export_line(manifest)
+    with zipfile.ZipFile(tmp_path / "room1.zip") as zf:
+        assert "not_included" in zf.read("manifest.json").decode("utf-8")
+
+
+def test_export_without_video_says_so(tmp_path):
+    (tmp_path / "movie.mp4").write_bytes(b"v")
+    manifest = export_room(dict(ROOM_DEFAULTS, inner="Mia"), tmp_path, 1, tmp_path / "room1.zip", include_video=False)
+    assert manifest["not_included"] == [{"path": "movie.mp4", "reason": "video left out"}]
+    assert all(f["path"] != "movie.mp4" for f in manifest["files"])
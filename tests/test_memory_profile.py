@@ -0,0 +1,29 @@
+import inspect
+import os
+import tracemalloc
+
+import App3
+from App3 import ROOM_DEFAULTS, BuildTrace, MemoryProfile, build_room_page, read_build_trace
+
+
+def test_source_lines_map_to_their_innermost_function():
+    lines, first = inspect.getsourcelines(App3.RoomShell.render)
+    assert App3._enclosing_def(App3.__file__, first) == "RoomShell.render"
+    nested = next(first + i for i, line in enumerate(lines) if " for i, seg in " in line)
+    assert App3._enclosing_def(App3.__file__, nested) == "RoomShell.render.<genexpr>"
+    assert App3._enclosing_def(App3.__file__, 1) == ""
+    assert App3._enclosing_def("elsewhere.py", first) == ""
+
+
+def test_profiled_build_records_peak_and_sites(tmp_path, monkeypatch):
+    monkeypatch.setattr(BuildTrace, "profile_memory", True)
+    bg = tmp_path / "bg.png"
+    bg.write_bytes(os.urandom(2 * 1024 * 1024))
+    state = dict(ROOM_DEFAULTS, inner="Mia", bg=str(bg), budget_block_kb=0)
+    with MemoryProfile.session() as session:
+        build_room_page(state, tmp_path, "partyroom1.html", 1)
+    memory = read_build_trace(tmp_path, 1)["memory"]
+    assert memory["peak_kb"] > 2 * 1024
+    assert "path_to_data_uri" in {site["function"] for site in memory["top"]}
+    assert session["peak_kb"] >= memory["peak_kb"]
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,48 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from App3 import ROOM_DEFAULTS, ShellCache, page_budget, page_size_breakdown
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    shutil.copy(REPO / "lte.gif", tmp_path / "lte.gif")  # inlined as a data: URI logo
+    return tmp_path
+
+
+@pytest.mark.parametrize("title, inner", [
+    ("Happy Birthday", ""),
+    ("Happy Birthday", "Mia"),
+    ("Feliz Cumpleaños", "Zoë & Łukasz <3"),
+    ("🎉", "A very long guest name that has to be fitted " * 3),
+])
+def test_shell_page_sizes_match_a_full_scan(out_dir, title, inner):
+    shell = ShellCache().get(dict(ROOM_DEFAULTS, inner_font_choice="Pacifico"), out_dir, 1)
+    assert shell.page_sizes(title, inner) == page_size_breakdown(shell.render(title, inner))
+
+
+def test_breakdown_classifies_images_by_id_and_class():
+    html = ('<img id="brandLogo" src="data:image/gif;base64,AAAA" alt="bgImage">'
+            '<img class="bgImage" src="data:image/png;base64,BBBBBB">'
+            '<img src="data:image/png;base64,CC" alt="logo">')
+    sizes = page_size_breakdown(html)
+    assert sizes["logo"] == len("data:image/gif;base64,AAAA")
+    assert sizes["background"] == len("data:image/png;base64,BBBBBB")
+    assert sizes["logo_count"] == 1
+
+
+def test_budget_status():
+    sizes = dict(page_size_breakdown("<p>x</p>"), total=300 * 1024)
+    assert page_budget(sizes, {"budget_warn_kb": 200, "budget_block_kb": 0})["status"] == "warn"
+    assert page_budget(sizes, {"budget_warn_kb": 200, "budget_block_kb": 250})["status"] == "block"
+    assert page_budget(sizes, {"budget_warn_kb": 0, "budget_block_kb": 0})["status"] == "ok"
+
+
+def test_default_budget_warns_but_never_blocks():
+    sizes = dict(page_size_breakdown("<p>x</p>"), total=50 * 1024 * 1024)
+    assert page_budget(sizes, dict(ROOM_DEFAULTS))["status"] == "warn"
+    assert page_budget(sizes, {})["status"] == "warn"
@@ -0,0 +1,44 @@
+import pytest
+
+from App3 import ROOM_DEFAULTS, ROOM_SCHEMA, coerce_room_state, parse_room_value
+
+
+@pytest.mark.parametrize("key, raw, expected", [
+    ("enabled", "yes", True),
+    ("enabled", "Off", False),
+    ("enabled", False, False),
+    ("video", " 4 ", 4),
+    ("stop_minutes", "0", 0),
+    ("color", "orange", "Orange"),
+    ("headline_size", "xl", "XL"),
+    ("title_color", " #abc ", "#abc"),
+    ("inner", None, ""),
+    ("inner", 12, "12"),
+])
+def test_parse_room_value(key, raw, expected):
+    assert parse_room_value(key, raw) == expected
+
+
+@pytest.mark.parametrize("key, raw, message", [
+    ("enabled", "maybe", "true/false"),
+    ("video", "9", "one of 1, 2, 3, 4, 5"),
+    ("video", "two", "whole number"),
+    ("stop_minutes", "-5", "0 or more"),
+    ("color", "Purple", "one of Blue"),
+    ("title_color", "white", "#RRGGBB"),
+])
+def test_parse_room_value_rejects(key, raw, message):
+    with pytest.raises(ValueError, match=message):
+        parse_room_value(key, raw)
+
+
+def test_every_default_parses_as_itself():
+    for key, field in ROOM_SCHEMA.items():
+        assert parse_room_value(key, field.default) == ROOM_DEFAULTS[key]
+
+
+def test_coerce_room_state_drops_and_reports_bad_fields():
+    state, errors = coerce_room_state({"color": "red", "video": "x", "stop_minutes": "10", "extra": [1]},
+                                      "Room 2: ")
+    assert state == {"color": "Red", "stop_minutes": 10, "extra": [1]}
+    assert errors == ["Room 2: video = 'x': expected a whole number"]
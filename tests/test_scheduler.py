@@ -0,0 +1,61 @@
+import time
+
+import App3
+from App3 import PREBUILD_MEDIA_RECHECK_SECONDS, ROOM_DEFAULTS, STAGING_DIRNAME, PartyScheduler
+
+
+def wait_for(scheduler, kind, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        event = scheduler.events.get(timeout=max(0.01, deadline - time.time()))
+        assert event[0] != "error", event
+        if event[0] == kind:
+            return event
+    raise AssertionError(f"no {kind!r} event")
+
+
+def test_party_is_staged_ahead_then_swapped_in_at_its_start(tmp_path):
+    scheduler = PartyScheduler(tmp_path, lead_seconds=0.5)
+    party = scheduler.add(1, time.time() + 1.0, dict(ROOM_DEFAULTS, inner="Mia"))
+    scheduler.start()
+    try:
+        wait_for(scheduler, "staged")
+        assert party.staged.parent == tmp_path / STAGING_DIRNAME
+        assert not (tmp_path / "partyroom1.html").exists()
+        wait_for(scheduler, "live")
+    finally:
+        scheduler.stop()
+    assert "Mia" in (tmp_path / "partyroom1.html").read_text(encoding="utf-8")
+    assert not party.staged.exists()
+    assert scheduler.live[1] >= party.start
+    assert scheduler.upcoming() == []
+
+
+def test_due_stages_within_the_lead_only(tmp_path):
+    scheduler = PartyScheduler(tmp_path, lead_seconds=60)
+    now = time.time()
+    party = scheduler.add(2, now + 600, dict(ROOM_DEFAULTS, inner="Ava"))
+    assert scheduler._due(now) == ([], now + 540)
+    assert scheduler._due(now + 545) == ([("stage", party)], now + 600)
+    assert scheduler._due(now + 600)[0] == [("swap", party)]
+
+
+def test_page_staged_while_the_video_copies_is_restaged_once_it_is_local(tmp_path, monkeypatch):
+    local = [False]
+    monkeypatch.setattr(App3, "pin_party_media", lambda state, out_dir, start: local[0])
+    scheduler = PartyScheduler(tmp_path, lead_seconds=60)
+    now = time.time()
+    party = scheduler.add(3, now + 30, dict(ROOM_DEFAULTS, inner="Kai"), staged=tmp_path / "imported.html")
+    assert party.staged is None  # an imported page built against the share isn't used
+    scheduler._stage(party)
+    first = party.staged
+    assert not party.media_local
+    actions, wake = scheduler._due(party.media_checked)
+    assert actions == [] and wake == party.media_checked + PREBUILD_MEDIA_RECHECK_SECONDS
+    assert scheduler._due(wake)[0] == [("restage", party)]
+    scheduler._restage(party)  # still copying: keeps the staged page, checks again later
+    assert party.staged == first and scheduler.events.qsize() == 1
+    local[0] = True
+    scheduler._restage(party)
+    assert party.media_local and scheduler.events.qsize() == 2
+    assert scheduler._due(party.media_checked + PREBUILD_MEDIA_RECHECK_SECONDS) == ([], party.start)
@@ -0,0 +1,52 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from partyroom.store import PartyStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = PartyStore(tmp_path / "partyrooms.db")
+    yield s
+    s.close()
+
+
+def test_rooms_are_saved_only_when_they_change(store, tmp_path):
+    assert store.save_room(1, {"inner": "Mia", "color": "Red"})
+    assert not store.save_room(1, {"color": "Red", "inner": "Mia"})
+    assert store.save_room(1, {"inner": "Ava", "color": "Red"})
+    store.close()
+    reopened = PartyStore(tmp_path / "partyrooms.db")
+    assert reopened.load_rooms() == {1: {"inner": "Ava", "color": "Red"}}
+    assert reopened.load_rooms(newer_than=time.time() + 60) == {}
+    reopened.close()
+
+
+def test_setting_timestamp_moves_only_on_a_new_value(store):
+    store.set_setting("output_dir", "D:/party")
+    time.sleep(0.01)  # coarse clocks
+    before = time.time()
+    store.set_setting("output_dir", "D:/party")
+    assert store.get_setting("output_dir", newer_than=before) == ""
+    time.sleep(0.01)
+    store.set_setting("output_dir", "E:/party")
+    assert store.get_setting("output_dir", newer_than=before) == "E:/party"
+
+
+def test_presets_keep_the_style_not_the_party(store):
+    store.save_preset("Neon", {"title": "Happy Birthday", "inner": "Mia", "enabled": True, "neon_glow": True})
+    assert store.load_preset("Neon") == {"neon_glow": True}
+    assert store.preset_names() == ["Neon"]
+    assert store.load_preset("Missing") is None
+
+
+def test_history_finds_parties_near_a_time(store):
+    first = store.record_build(1, {"inner": "Mia", "video_override": "D:/v/dino.mp4"}, None, 12.5)
+    store.record_build(2, {"inner": "Ava", "video": 1}, None, 8.0)
+    entry = store.history_entry(first)
+    assert (entry["room"], entry["inner"], entry["video"]) == (1, "Mia", "D:/v/dino.mp4")
+    assert [p["inner"] for p in store.parties_near(datetime.now(), room=2)] == ["Ava"]
+    assert store.parties_near(datetime.fromtimestamp(time.time() - 86400)) == []
+    assert dict(store.most_used_videos(time.time() - 60)) == {"D:/v/dino.mp4": 1, "movie.mp4": 1}
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from partyroom.sync import SYNC_MANIFEST, publish_files, source_manifest, sync_target
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    out = tmp_path / "out"
+    (out / "fonts").mkdir(parents=True)
+    (out / "partyroom1.html").write_text("<video src='movie.mp4'></video>", encoding="utf-8")
+    (out / "partyroom1_kiosk.js").write_text("beacon", encoding="utf-8")
+    (out / "movie.mp4").write_bytes(b"m" * 2048)
+    (out / "fonts" / "a.woff2").write_bytes(b"font")
+    (out / "config.ini").write_text("[general]", encoding="utf-8")  # not something the displays need
+    return out
+
+
+def sync(out_dir, target, **kwargs):
+    files = publish_files(out_dir)
+    return sync_target(out_dir, files, source_manifest(out_dir, files), target, **kwargs)
+
+
+def test_publishes_only_what_the_displays_need(out_dir):
+    assert sorted(publish_files(out_dir)) == ["fonts/a.woff2", "movie.mp4", "partyroom1.html", "partyroom1_kiosk.js"]
+
+
+def test_second_sync_copies_nothing(out_dir, tmp_path):
+    target = tmp_path / "display"
+    first = sync(out_dir, target)
+    assert (first["copied"], first["errors"]) == (4, [])
+    assert (target / "movie.mp4").read_bytes() == b"m" * 2048
+    second = sync(out_dir, target)
+    assert (second["copied"], second["unchanged"], second["deleted"]) == (0, 4, 0)
+
+
+def test_only_changed_files_are_copied(out_dir, tmp_path):
+    target = tmp_path / "display"
+    sync(out_dir, target)
+    (out_dir / "partyroom1_kiosk.js").write_text("beacon v2", encoding="utf-8")
+    result = sync(out_dir, target)
+    assert (result["copied"], result["bytes"], result["unchanged"]) == (1, len("beacon v2"), 3)
+    assert (target / "partyroom1_kiosk.js").read_text(encoding="utf-8") == "beacon v2"
+
+
+def test_files_changed_on_the_target_are_replaced(out_dir, tmp_path):
+    target = tmp_path / "display"
+    sync(out_dir, target)
+    (target / "movie.mp4").write_bytes(b"x" * 2048)
+    os.utime(target / "movie.mp4", ns=(1, 1))
+    assert sync(out_dir, target)["copied"] == 1
+    assert (target / "movie.mp4").read_bytes() == b"m" * 2048
+
+
+def test_hand_copied_files_are_adopted(out_dir, tmp_path):
+    target = tmp_path / "display"
+    target.mkdir()
+    (target / "movie.mp4").write_bytes(b"m" * 2048)
+    result = sync(out_dir, target)
+    assert (result["copied"], result["unchanged"]) == (3, 1)
+
+
+def test_prune(out_dir, tmp_path):
+    target = tmp_path / "display"
+    sync(out_dir, target)
+    (out_dir / "fonts" / "a.woff2").unlink()
+    assert sync(out_dir, target, prune=False)["deleted"] == 0
+    assert (target / "fonts" / "a.woff2").exists()
+    assert sync(out_dir, target)["deleted"] == 1
+    assert not (target / "fonts" / "a.woff2").exists()
+    assert "fonts/a.woff2" not in (target / SYNC_MANIFEST).read_text(encoding="utf-8")
@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from App3 import TelemetryCollector
+from partyroom.store import PartyStore
+
+
+@pytest.fixture
+def collector(tmp_path):
+    store = PartyStore(tmp_path / "partyrooms.db")
+    server = TelemetryCollector(store, ("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    store.close()
+
+
+def post(server, batch):
+    req = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/t", json.dumps(batch).encode("utf-8"),
+                                 {"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return resp.status
+
+
+def test_concurrent_batches_are_all_counted(collector):
+    batch = {"room": 1, "combo": "neon", "display": "1920x1080", "events": [{"m": "ttff_ms", "v": 120}] * 3}
+
+    def client():
+        for _ in range(10):
+            assert post(collector, batch) == 204
+    clients = [threading.Thread(target=client) for _ in range(8)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    assert collector.received == 8 * 10 * 3
+    [row] = collector.store.telemetry_report(time.time() - 60)
+    assert (row["room"], row["metric"], row["n"]) == (1, "ttff_ms", 240)
+
+
+def test_bad_batch_is_rejected(collector):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(collector, {"events": []})
+    assert e.value.code == 400
+    assert collector.received == 0
@@ -0,0 +1,68 @@
+import queue
+import time
+
+import pytest
+
+from App3 import FileWatcher, rooms_to_rebuild
+
+
+@pytest.fixture
+def watcher():
+    made = []
+
+    def make(**kwargs):
+        w = FileWatcher(debounce=0.2, poll=0.05, **kwargs)
+        made.append(w)
+        return w
+    yield make
+    for w in made:
+        w.stop()
+
+
+def no_change(w, wait=0.5):
+    with pytest.raises(queue.Empty):
+        w.changes.get(timeout=wait)
+
+
+def test_polling_sees_changes_and_debounces_a_burst(watcher, tmp_path):
+    logo, video = tmp_path / "logo.png", tmp_path / "movie.mp4"
+    logo.write_bytes(b"1")
+    video.write_bytes(b"1")
+    w = watcher(poll_only=True)
+    assert w.backend == "polling"
+    w.watch({str(logo), str(video)})
+    w.start()
+    no_change(w, 0.3)
+    logo.write_bytes(b"22")
+    time.sleep(0.08)
+    video.write_bytes(b"333")
+    assert w.changes.get(timeout=5) == frozenset({str(logo), str(video)})
+    no_change(w)
+
+
+def test_file_under_a_missing_folder_is_polled_until_it_appears(watcher, tmp_path):
+    later = tmp_path / "fonts" / "face.woff2"
+    w = watcher()
+    w.watch({str(later)})
+    w.start()
+    no_change(w, 0.3)
+    later.parent.mkdir()
+    later.write_bytes(b"f")
+    assert w.changes.get(timeout=5) == frozenset({str(later)})
+
+
+def test_unwatched_files_are_ignored(watcher, tmp_path):
+    watched, other = tmp_path / "bg.png", tmp_path / "other.png"
+    watched.write_bytes(b"1")
+    w = watcher(poll_only=True)
+    w.watch({str(watched)})
+    w.start()
+    time.sleep(0.1)
+    other.write_bytes(b"x")
+    no_change(w)
+
+
+def test_rooms_to_rebuild():
+    room_paths = {1: {"/a/logo.png", "/a/movie.mp4"}, 2: {"/a/movie.mp4"}, 3: {"/b/bg.png"}}
+    assert rooms_to_rebuild(frozenset({"/a/movie.mp4"}), room_paths) == [1, 2]
+    assert rooms_to_rebuild(frozenset({"/c/x"}), room_paths) == []